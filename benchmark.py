@@ -0,0 +1,1164 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+"""
+Benchmarks for the sales database code. Each run builds synthetic data in a
+temporary folder so the real sales_db.sqlite is never touched.
+
+Before/after comparisons of one change:
+           python benchmark.py summary --rows 1000000
+           python benchmark.py load --rows 1000000
+           python benchmark.py records --rows 200000
+           python benchmark.py cache --rows 1000000
+           python benchmark.py instrument
+           python benchmark.py bootstrap --rows 1000000
+           python benchmark.py parse --rows 1000000
+           python benchmark.py upsert --rows 1000000
+           python benchmark.py updates --rows 1000000
+           python benchmark.py series --rows 1000000
+           python benchmark.py rankings --rows 1000000
+           python benchmark.py window --rows 1000000
+           python benchmark.py ui --rows 1000000      (needs a display, e.g. xvfb-run)
+           python benchmark.py table --rows 100000    (needs a display)
+
+The suite times load, filtered read, summary, import, update and export at
+a standard size and checks for regressions against a stored baseline:
+           python benchmark.py suite --size 10k --json results.json
+           python benchmark.py suite --size 10k --baseline benchmark_baseline.json
+           python benchmark.py suite --size 10k --save-baseline benchmark_baseline.json
+
+Check the entry points' import times and the CLI's time to first prompt
+against STARTUP_BUDGET_MS (exits 1 when over):
+           python benchmark.py startup
+
+Write the synthetic database and sales_qn_yyyy_r.csv files to a folder:
+           python benchmark.py generate --size 1m --out bench_data
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import db
+import instrument
+from business import DailySales, File, Region, DATE_FORMAT, read_sales_chunks
+
+REGION_CODES = ["w", "m", "c", "e"]
+
+# the standard data sizes for the suite and the generator
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# a suite measurement more than this much slower than the baseline fails
+REGRESSION_TOLERANCE = 0.25
+
+# startup budgets in milliseconds, checked by the startup command: the
+# cumulative -X importtime of each entry module, and the CLI run from
+# start to its first prompt and straight out again
+STARTUP_BUDGET_MS = {
+    "import db": 60,
+    "import ui": 60,
+    "import gui": 90,
+    "ui: start, first prompt, exit": 150,
+}
+
+# marks a result row where a bigger number is the improvement (e.g. rows/sec)
+HIGHER_IS_BETTER = True
+FIRST_DAY = date(2000, 1, 1)
+
+def generate_database(path, rows, seed=13):
+    """Create a sales database at path holding `rows` synthetic sales.
+
+    Rows cycle through the four regions one day at a time, so every
+    (date, region) pair is unique; amounts come from a seeded generator and
+    are the same on every run.
+    """
+    script_dir = Path(__file__).resolve().parent
+    schema = (script_dir / "sales_db.sql").read_text(encoding="utf-8")
+    rng = random.Random(seed)
+
+    with closing(sqlite3.connect(path)) as conn:
+        conn.executescript(schema)
+        with conn:
+            conn.execute("DELETE FROM Sales")
+            conn.execute("DELETE FROM ImportedFiles")
+            conn.executemany(
+                "INSERT INTO Sales (amount, salesDate, region) VALUES (?, ?, ?)",
+                ((round(rng.uniform(1000, 50000), 2),
+                  (FIRST_DAY + timedelta(days=i // len(REGION_CODES))).isoformat(),
+                  REGION_CODES[i % len(REGION_CODES)])
+                 for i in range(rows)))
+
+def generate_sales_files(folder, rows, files=8, seed=29):
+    """Write `rows` synthetic sales across `files` sales_qn_yyyy_r.csv files
+    in folder and return their paths.
+
+    Files rotate through the regions; within a region the dates carry on
+    from one file to the next, so no (date, region) pair repeats. The same
+    arguments always produce the same files.
+    """
+    rng = random.Random(seed)
+    next_day = dict.fromkeys(REGION_CODES, 0)
+    paths = []
+    for i in range(files):
+        region = REGION_CODES[i % len(REGION_CODES)]
+        quarter = i // len(REGION_CODES) % 4 + 1
+        year = 2000 + i // (4 * len(REGION_CODES))
+        count = rows // files + (1 if i < rows % files else 0)
+        path = os.path.join(folder, f"sales_q{quarter}_{year}_{region}.csv")
+        first_day = next_day[region]
+        with open(path, "w", newline="") as file:
+            csv.writer(file).writerows(
+                (f"{rng.uniform(1000, 50000):.2f}",
+                 (FIRST_DAY + timedelta(days=first_day + day)).isoformat())
+                for day in range(count))
+        next_day[region] += count
+        paths.append(path)
+    return paths
+
+def time_call(func, repeat=3):
+    """Return the best wall-clock time in seconds over `repeat` calls."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best
+
+def four_query_summary(start_date=None, end_date=None, region=None):
+    """The previous get_sales_summary: four queries over the same slice."""
+    where, params = db._build_filters(start_date, end_date, region)
+    base = f"FROM Sales {where}"
+    with closing(db.conn.cursor()) as c:
+        c.execute(f'''SELECT COUNT(*) AS count,
+                             COALESCE(SUM(amount), 0) AS total,
+                             AVG(amount) AS average
+                      {base}''', params)
+        totals = c.fetchone()
+        c.execute(f'''SELECT Region.code, Region.name,
+                             SUM(amount) AS total, COUNT(*) AS count
+                      FROM Sales
+                      JOIN Region ON Sales.region = Region.code
+                      {where}
+                      GROUP BY Region.code, Region.name
+                      ORDER BY Region.code''', params)
+        regions = c.fetchall()
+        c.execute(f'''SELECT CASE
+                             WHEN CAST(strftime('%m', salesDate) AS INTEGER) BETWEEN 1 AND 3 THEN 1
+                             WHEN CAST(strftime('%m', salesDate) AS INTEGER) BETWEEN 4 AND 6 THEN 2
+                             WHEN CAST(strftime('%m', salesDate) AS INTEGER) BETWEEN 7 AND 9 THEN 3
+                             ELSE 4 END AS quarter,
+                             SUM(amount) AS total
+                      {base}
+                      GROUP BY quarter
+                      ORDER BY quarter''', params)
+        quarters = c.fetchall()
+        c.execute(f'''SELECT salesDate, SUM(amount) AS total
+                      {base}
+                      GROUP BY salesDate
+                      ORDER BY total DESC
+                      LIMIT 1''', params)
+        top_day = c.fetchone()
+        return {"count": totals["count"], "total": totals["total"],
+                "average": totals["average"], "regions": regions,
+                "quarters": quarters, "top_day": top_day}
+
+def bench_summary(rows, repeat):
+    """Compare the single-pass summary against the four-query version (seconds)."""
+    def summary(*args):
+        # time the query, not a hit in the result cache
+        db.clear_cache()
+        return db.get_sales_summary(*args)
+
+    last_day = (FIRST_DAY + timedelta(days=rows // len(REGION_CODES))).isoformat()
+    filters = [
+        ("all rows", (None, None, None)),
+        ("one region", (None, None, "w")),
+        ("first half", (None, (FIRST_DAY + timedelta(days=rows // 8)).isoformat(), None)),
+        ("range + region", (FIRST_DAY.isoformat(), last_day, "e")),
+    ]
+    results = []
+    for label, args in filters:
+        old = time_call(lambda: four_query_summary(*args), repeat)
+        new = time_call(lambda: summary(*args), repeat)
+        results.append((f"summary: {label}", old, new))
+    return results
+
+def python_series(granularity):
+    """Time buckets the way a caller had to build them before
+    get_sales_series: read every sale and bucket it in Python."""
+    buckets = {}
+    with closing(db.conn.cursor()) as c:
+        c.row_factory = None
+        for sales_date, amount in c.execute("SELECT salesDate, amount FROM Sales"):
+            day = date.fromisoformat(sales_date)
+            if granularity == "day":
+                key = (day.year, day.timetuple().tm_yday)
+            elif granularity == "week":
+                key = day.isocalendar()[:2]
+            elif granularity == "month":
+                key = (day.year, day.month)
+            elif granularity == "quarter":
+                key = (day.year, (day.month + 2) // 3)
+            else:
+                key = (day.year, 1)
+            bucket = buckets.setdefault(key, [0.0, 0])
+            bucket[0] += amount
+            bucket[1] += 1
+    return sorted(buckets.items())
+
+def bench_series(rows, repeat):
+    """Seconds to total every sale per time bucket: reading the sales and
+    bucketing them in Python vs get_sales_series's grouped scan of the
+    daily rollup. The synthetic data has one sale per region per day, so the
+    rollup is no smaller than Sales here; real days with many sales gain more."""
+    def series(granularity):
+        db.clear_cache()
+        return db.get_sales_series(granularity)
+
+    results = []
+    for granularity in db.SERIES_GRANULARITIES:
+        before = time_call(lambda: python_series(granularity), repeat)
+        after = time_call(lambda: series(granularity), repeat)
+        results.append((f"series: per {granularity}", before, after))
+    return results
+
+def sorted_rankings(top=db.RANKING_TOP_DAYS, top_per_region=db.RANKING_TOP_REGION_DAYS,
+                    percentiles=db.RANKING_PERCENTILES):
+    """The rankings as separate queries, each sorting the slice: top days
+    and percentiles over the daily totals, and a window function for the
+    best days per region."""
+    days = "SELECT salesDate, SUM(total) AS total FROM SalesDaily GROUP BY salesDate"
+    with closing(db.conn.cursor()) as c:
+        c.row_factory = None
+        top_days = c.execute(f"{days} ORDER BY total DESC LIMIT ?", (top,)).fetchall()
+        top_by_region = c.execute('''SELECT region, salesDate, total
+                                     FROM (SELECT region, salesDate, total,
+                                                  ROW_NUMBER() OVER (PARTITION BY region
+                                                                     ORDER BY total DESC) AS rank
+                                           FROM SalesDaily)
+                                     WHERE rank <= ?''', (top_per_region,)).fetchall()
+        day_count = c.execute(f"SELECT COUNT(*) FROM ({days})").fetchone()[0]
+        values = {}
+        for percentile in percentiles:
+            rank = max(1, math.ceil(percentile / 100 * day_count))
+            row = c.execute(f"{days} ORDER BY total LIMIT 1 OFFSET ?", (rank - 1,)).fetchone()
+            values[percentile] = row and row[1]
+    return top_days, top_by_region, values
+
+def bench_rankings(rows, repeat):
+    """Seconds to find the top days overall and per region and the median
+    and p90 daily totals: a sorting query for each vs get_sales_rankings's
+    single pass with bounded heaps and a quantile sketch. Also prints how
+    far the sketch's percentiles are from the exact ones."""
+    def rankings(exact):
+        db.clear_cache()
+        return db.get_sales_rankings(exact=exact)
+
+    exact = sorted_rankings()[2]
+    sketched = rankings(False)["percentiles"]
+    for percentile, value in exact.items():
+        print(f"p{percentile}: exact {value:,.2f}, sketch {sketched[percentile]:,.2f}")
+    before = time_call(sorted_rankings, repeat)
+    return [("rankings: sketched percentiles", before, time_call(lambda: rankings(False), repeat)),
+            ("rankings: exact percentiles", before, time_call(lambda: rankings(True), repeat))]
+
+def bench_window(rows, repeat):
+    """Mean seconds per Run Analysis while an analyst nudges the dates by a
+    few days at a time: every summary computed in full (before) vs built
+    from the last one's partial sums (after). Slides a window over a
+    quarter of the days, widens one, and slides one with a region filter."""
+    days = rows // len(REGION_CODES)
+    width = max(days // 4, 30)
+    steps = 30
+    patterns = [
+        ("slide 3 days", None, lambda step: (3 * step, width + 3 * step)),
+        ("widen 3 days", None, lambda step: (0, width + 3 * step)),
+        ("slide 3 days, one region", "w", lambda step: (3 * step, width + 3 * step)),
+    ]
+
+    def clicks(region, window, cold):
+        # a distinct starting offset per run, so no summary is a plain cache hit
+        offset = next(runs) * 7
+        db.clear_cache()
+        for step in range(steps):
+            if cold:
+                db.clear_cache()
+            first, last = window(step)
+            db.get_sales_summary((FIRST_DAY + timedelta(days=offset + first)).isoformat(),
+                                 (FIRST_DAY + timedelta(days=offset + last)).isoformat(),
+                                 region)
+
+    runs = itertools.count()
+    results = []
+    for label, region, window in patterns:
+        before = time_call(lambda: clicks(region, window, True), repeat) / steps
+        after = time_call(lambda: clicks(region, window, False), repeat) / steps
+        results.append((f"{label}: s per summary", before, after))
+    return results
+
+def loaded_size(load):
+    """Return the bytes still allocated by the list that load() returns."""
+    tracemalloc.start()
+    try:
+        sales = load()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del sales
+    return size
+
+def bench_load(rows, repeat):
+    """Compare loading every sale as DailySales objects and as columns."""
+    old = time_call(db.get_all_sales, repeat)
+    new = time_call(lambda: db.get_all_sales(columnar=True), repeat)
+    megabyte = 1024 * 1024
+    old_size = loaded_size(db.get_all_sales) / megabyte
+    new_size = loaded_size(lambda: db.get_all_sales(columnar=True)) / megabyte
+    return [
+        ("load all sales (s)", old, new),
+        ("memory held by the list (MB)", old_size, new_size),
+        ("bytes per sale", old_size * megabyte / rows, new_size * megabyte / rows),
+    ]
+
+@dataclass
+class LegacyRegion:
+    code:str = ""
+    name:str = ""
+
+@dataclass
+class LegacyDailySales:
+    """The previous DailySales record: a plain dataclass with a __dict__."""
+    amount:float = 0.0
+    salesDate:date = None
+    region:LegacyRegion = None
+    quarter:int = 0
+    id:int = 0
+
+    def setQuarter(self):
+        if self.salesDate == "?":
+            self.quarter = 0
+        elif self.salesDate.month <= 3:
+            self.quarter = 1
+        elif self.salesDate.month <= 6:
+            self.quarter = 2
+        elif self.salesDate.month <= 9:
+            self.quarter = 3
+        else:
+            self.quarter = 4
+
+    def fromFile(self, row, region):
+        try:
+            self.amount = float(row[0])
+        except ValueError:
+            self.amount = "?"
+        try:
+            dt = datetime.strptime(row[1], DATE_FORMAT)
+            self.salesDate = date(dt.year, dt.month, dt.day)
+        except ValueError:
+            self.salesDate = "?"
+        self.region = region
+        self.setQuarter()
+
+    def fromDb(self, row):
+        self.amount = row["amount"]
+        self.region = LegacyRegion(row["code"], row["name"])
+        self.id = row["ID"]
+        self.salesDate = datetime.strptime(row["salesDate"], DATE_FORMAT)
+        self.setQuarter()
+
+def bench_records(rows, repeat):
+    """Rows per second decoded by fromDb and fromFile, old records vs new."""
+    with closing(db.conn.cursor()) as c:
+        c.execute('''SELECT ID, amount, salesDate, Region.code, Region.name
+                     FROM Sales
+                     JOIN Region ON Sales.region = Region.code''')
+        db_rows = c.fetchall()
+    file_rows = [[f"{row['amount']}", row["salesDate"]] for row in db_rows]
+    region = Region("w", "West")
+    legacy_region = LegacyRegion("w", "West")
+
+    def decode_db(record_type):
+        for row in db_rows:
+            record_type().fromDb(row)
+
+    def decode_file(record_type, region):
+        for row in file_rows:
+            record_type().fromFile(row, region)
+
+    old_db = time_call(lambda: decode_db(LegacyDailySales), repeat)
+    new_db = time_call(lambda: decode_db(DailySales), repeat)
+    old_file = time_call(lambda: decode_file(LegacyDailySales, legacy_region), repeat)
+    new_file = time_call(lambda: decode_file(DailySales, region), repeat)
+    return [
+        ("fromDb rows/sec", rows / old_db, rows / new_db, HIGHER_IS_BETTER),
+        ("fromFile rows/sec", rows / old_file, rows / new_file, HIGHER_IS_BETTER),
+        ("bytes per record", record_size(LegacyDailySales, LegacyRegion),
+         record_size(DailySales, Region.intern)),
+    ]
+
+def record_size(record_type, make_region):
+    """Return the bytes one record occupies, including any region object
+    make_region allocates for it."""
+    records = []
+    tracemalloc.start()
+    try:
+        for _ in range(1000):
+            records.append(record_type(1.0, date(2000, 1, 1), make_region("w", "West"), 1, 1))
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return size / len(records)
+
+def bench_cache(rows, repeat):
+    """Repeated Get Amount lookups and summaries with the result cache
+    cleared before every call (before) and left warm (after)."""
+    days = rows // len(REGION_CODES)
+    lookups = [((FIRST_DAY + timedelta(days=i * 7 % max(days, 1))).isoformat(),
+                REGION_CODES[i % len(REGION_CODES)]) for i in range(8)]
+    filters = [(None, None, None), (None, None, "w"),
+               (FIRST_DAY.isoformat(), (FIRST_DAY + timedelta(days=days // 2)).isoformat(), None)]
+
+    def run_lookups(cold):
+        for _ in range(50):
+            for dt, region in lookups:
+                if cold:
+                    db.clear_cache()
+                db.get_sales(dt, region)
+
+    def run_summaries(cold):
+        for _ in range(10):
+            for args in filters:
+                if cold:
+                    db.clear_cache()
+                db.get_sales_summary(*args)
+
+    results = [
+        ("400 repeated lookups (s)", time_call(lambda: run_lookups(True), repeat),
+         time_call(lambda: run_lookups(False), repeat)),
+        ("30 repeated summaries (s)", time_call(lambda: run_summaries(True), repeat),
+         time_call(lambda: run_summaries(False), repeat)),
+    ]
+    def hit_rate(cold):
+        db.clear_cache()
+        before = db.cache_stats()
+        run_lookups(cold)
+        run_summaries(cold)
+        after = db.cache_stats()
+        hits = after["hits"] - before["hits"]
+        return hits / (hits + after["misses"] - before["misses"])
+
+    results.append(("cache hit rate", hit_rate(True), hit_rate(False), HIGHER_IS_BETTER))
+    return results
+
+def bench_instrument(rows, repeat):
+    """Cost of the instrumentation wrapper on a cached get_sales call (the
+    cheapest db call, so the worst case): bare function vs wrapper with
+    instrumentation off, and vs on. A gain below 1x is the overhead."""
+    sales_date = FIRST_DAY.isoformat()
+    bare = db.get_sales.__wrapped__
+    calls = 10000
+
+    def run(func):
+        for _ in range(calls):
+            func(sales_date, "w")
+
+    db.get_sales(sales_date, "w")   # warm the result cache
+    results = [(f"{calls} calls, instrumentation off (s)",
+                time_call(lambda: run(bare), repeat), time_call(lambda: run(db.get_sales), repeat))]
+    instrument.enable(slow_seconds=float("inf"))
+    try:
+        results.append((f"{calls} calls, instrumentation on (s)",
+                        time_call(lambda: run(bare), repeat), time_call(lambda: run(db.get_sales), repeat)))
+    finally:
+        instrument.disable()
+        instrument.reset()
+    return results
+
+def bench_bootstrap(rows, repeat):
+    """First-startup time with no database file: the SQL dump run through
+    executescript (before) vs the bulk dump loader and a snapshot restore."""
+    folder = os.path.dirname(db._db_path)
+    dump_path = os.path.join(folder, "bench.sql")
+    snapshot_path = os.path.join(folder, "bench.snapshot")
+    with closing(sqlite3.connect(db._db_path)) as source, \
+            open(dump_path, "w", encoding="utf-8") as file:
+        for line in source.iterdump():
+            file.write(line + "\n")
+    db.export_snapshot(snapshot_path)
+    target = os.path.join(folder, "bootstrap.sqlite")
+
+    def fresh():
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(target + suffix):
+                os.remove(target + suffix)
+
+    def executescript():
+        fresh()
+        with closing(sqlite3.connect(target)) as connection:
+            with open(dump_path, encoding="utf-8") as file:
+                connection.executescript(file.read())
+
+    def bulk_load():
+        fresh()
+        with closing(sqlite3.connect(target)) as connection:
+            db._bootstrap(connection, dump_path)
+
+    def restore():
+        fresh()
+        db._restore_snapshot(Path(snapshot_path), Path(target))
+
+    old = time_call(executescript, repeat)
+    return [
+        ("load SQL dump (s)", old, time_call(bulk_load, repeat)),
+        ("restore snapshot (s)", old, time_call(restore, repeat)),
+        ("dump vs snapshot size (MB)", os.path.getsize(dump_path) / 1024 / 1024,
+         os.path.getsize(snapshot_path) / 1024 / 1024),
+    ]
+
+def legacy_validate_rows(rows, region_code, report):
+    """The previous import validation: float() and a date check per row."""
+    for number, row in rows:
+        errors = []
+        amount = sales_date = None
+        if len(row) < 2:
+            errors.append("expected an amount and a date")
+        else:
+            try:
+                amount = float(row[0])
+            except ValueError:
+                errors.append(f"amount '{row[0]}' is not a number")
+            sales_date = row[1]
+            if len(sales_date) != 10 or sales_date[4] != "-" or sales_date[7] != "-":
+                errors.append(f"date '{sales_date}' is not a valid YYYY-MM-DD date")
+            else:
+                try:
+                    date.fromisoformat(sales_date)
+                except ValueError:
+                    errors.append(f"date '{sales_date}' is not a valid YYYY-MM-DD date")
+        if errors:
+            report["bad_rows"] += 1
+            if len(report["errors"]) < db.MAX_REPORTED_ERRORS:
+                report["errors"].append((number, "; ".join(errors)))
+            continue
+        report["total"] += amount
+        yield amount, sales_date, region_code
+
+def legacy_import_rows(path, region_code):
+    report = {"bad_rows": 0, "errors": [], "total": 0.0}
+    with open(path, newline="") as file:
+        rows = enumerate(csv.reader(file), start=1)
+        return list(legacy_validate_rows(rows, region_code, report)), report
+
+def chunked_import_rows(path, region_code):
+    report = {"bad_rows": 0, "errors": [], "total": 0.0}
+    good = []
+    with open(path, newline="") as file:
+        for chunk in read_sales_chunks(csv.reader(file)):
+            good.extend(chunk.goodRows(region_code))
+            report["bad_rows"] += chunk.badCount
+            report["errors"].extend(chunk.errors[:db.MAX_REPORTED_ERRORS - len(report["errors"])])
+            report["total"] += chunk.goodTotal()
+    return good, report
+
+def bench_parse(rows, repeat):
+    """Rows per second read from a sales file, validated and converted for
+    import: row by row vs the column-at-a-time chunk parser, on a clean
+    file and on one with 1% bad rows."""
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        clean = generate_sales_files(folder, rows, files=1)[0]
+        dirty = os.path.join(folder, "dirty.csv")
+        with open(clean, newline="") as source, open(dirty, "w", newline="") as target:
+            writer = csv.writer(target)
+            for index, row in enumerate(csv.reader(source)):
+                if index % 100 == 0:
+                    row[0 if index % 200 else 1] = "bad"
+                writer.writerow(row)
+
+        for label, path in (("clean file", clean), ("1% bad rows", dirty)):
+            old = time_call(lambda: legacy_import_rows(path, "w"), repeat)
+            new = time_call(lambda: chunked_import_rows(path, "w"), repeat)
+            results.append((f"{label} rows/sec", rows / old, rows / new, HIGHER_IS_BETTER))
+    return results
+
+def legacy_insert_rows(chunks):
+    """The previous import write: plain INSERTs, every row a new sale."""
+    sql = "INSERT INTO Sales (amount, salesDate, region) VALUES (?, ?, ?)"
+    with db.writing() as writer:
+        with closing(writer.cursor()) as c:
+            deltas = {}
+            for chunk in chunks:
+                c.executemany(sql, chunk)
+                for amount, sales_date, region in chunk:
+                    delta = deltas.setdefault((sales_date, region), [0.0, 0])
+                    delta[0] += amount
+                    delta[1] += 1
+            db._update_rollup(c, deltas)
+
+def bench_upsert(rows, repeat):
+    """Rows per second written by an import: plain INSERTs of new sales
+    (before) vs the upsert import of new sales, and of sales that are
+    already stored in replace and accumulate mode (after)."""
+    count = rows // len(REGION_CODES)   # the region "w" sales in the database
+
+    def chunks(first_day):
+        chunk_rows = [(float(day % 997),
+                       (FIRST_DAY + timedelta(days=first_day + day)).isoformat(), "w")
+                      for day in range(count)]
+        return [chunk_rows[i:i + db.SAVE_CHUNK_SIZE]
+                for i in range(0, count, db.SAVE_CHUNK_SIZE)]
+
+    # new sales take spans of days after the database's, one per timed call
+    spans = iter([chunks(count * (call + 1)) for call in range(2 * repeat)])
+    existing = chunks(0)
+    names = (f"bench_{call}.csv" for call in itertools.count())
+
+    def upsert(chunk_list, mode):
+        db._write_import(chunk_list, next(names), db._new_import_report(), mode)
+
+    before = time_call(lambda: legacy_insert_rows(next(spans)), repeat)
+    results = []
+    for label, func in (
+            ("new sales", lambda: upsert(next(spans), "replace")),
+            ("stored sales, replace", lambda: upsert(existing, "replace")),
+            ("stored sales, accumulate", lambda: upsert(existing, "accumulate"))):
+        after = time_call(func, repeat)
+        results.append((f"{label} rows/sec", count / before, count / after,
+                        HIGHER_IS_BETTER))
+    return results
+
+def bench_updates(rows, repeat):
+    """Seconds to change 10,000 amounts: one update_sales_amount call (and
+    transaction) per sale vs one update_sales_amounts batch, for sales
+    spread over the whole table and for a run of consecutive sales, like a
+    month of corrections."""
+    count = min(10_000, rows)
+    step = rows // count
+    versions = itertools.count()
+
+    def amounts(ids):
+        version = next(versions)
+        return [(sales_id, float((sales_id + version) % 997 + 1)) for sales_id in ids]
+
+    def one_at_a_time(ids):
+        for sales_id, amount in amounts(ids):
+            data = DailySales()
+            data.id = sales_id
+            data.amount = amount
+            db.update_sales_amount(data)
+
+    def batch(ids):
+        db.update_sales_amounts(amounts(ids))
+
+    results = []
+    for label, ids in (("spread", range(1, count * step + 1, step)),
+                       ("consecutive", range(1, count + 1))):
+        before = time_call(lambda: one_at_a_time(ids), repeat)
+        after = time_call(lambda: batch(ids), repeat)
+        results.append((f"{count:,} {label} updates (s)", before, after))
+    return results
+
+def bench_ui(rows, repeat):
+    """Longest UI-thread stall while Run Analysis runs, with the query on the
+    Tk thread (before) and on the background executor (after).
+
+    Drives a real SalesApp with its window withdrawn; on a machine without a
+    display run it under xvfb-run.
+    """
+    import tkinter as tk
+    import gui
+
+    root = tk.Tk()
+    root.withdraw()
+    app = gui.SalesApp(root)
+
+    def stall(start, finished):
+        # a 5 ms heartbeat on the Tk thread; any longer gap between beats
+        # is time the event loop couldn't run
+        beat_ms = 5
+        state = {"last": time.perf_counter(), "worst": 0.0, "beats": 0}
+
+        def beat():
+            now = time.perf_counter()
+            state["worst"] = max(state["worst"], now - state["last"] - beat_ms / 1000)
+            state["last"] = now
+            state["beats"] += 1
+            root.after(beat_ms, beat)
+
+        root.after(beat_ms, beat)
+        root.after(20, start)
+        while not finished() or state["beats"] < 10:
+            root.update()
+            time.sleep(0.001)
+        return state["worst"]
+
+    def blocking_stall():
+        done = []
+        return stall(lambda: done.append(app._show_summary(db.get_sales_summary(),
+                                                           (None, None, None))),
+                     lambda: bool(done))
+
+    def executor_stall():
+        started = []
+        return stall(lambda: started.append(app.run_summary()),
+                     lambda: bool(started) and not app.queries.busy)
+
+    try:
+        old = max(blocking_stall() for _ in range(repeat))
+        new = max(executor_stall() for _ in range(repeat))
+    finally:
+        app.queries.shutdown()
+        root.destroy()
+    return [("max UI stall during Run Analysis (s)", old, new)]
+
+def bench_table(rows, repeat):
+    """Seconds to show every sale in a table and to sort it by amount: a
+    plain Treeview holding an item per row (before) vs the VirtualTable
+    (after). Needs a display, e.g. xvfb-run."""
+    import tkinter as tk
+    from tkinter import ttk
+    from widgets import VirtualTable
+
+    page, _ = db.get_sales_page(limit=rows)
+    sales = [(sale_id, sales_date, code, amount) for sale_id, amount, sales_date, code in page]
+    columns = ["ID", "Date", "Region", "Amount"]
+    root = tk.Tk()
+    root.withdraw()
+
+    def plain_show():
+        frame = ttk.Frame(root)
+        tree = ttk.Treeview(frame, columns=columns, show="headings", height=10)
+        tree.pack()
+        for row in sales:
+            tree.insert("", tk.END, values=row)
+        root.update()
+        return frame, tree
+
+    def plain_sort(tree):
+        # the usual Treeview recipe: read the column back and move each item
+        keyed = sorted((float(tree.set(item, "Amount")), item) for item in tree.get_children())
+        for index, (amount, item) in enumerate(keyed):
+            tree.move(item, "", index)
+        root.update()
+
+    def fetch(limit, done):
+        # serve pages straight from memory so only the widget is timed
+        start = table.loaded
+        done(sales[start:start + limit], start + limit < len(sales))
+
+    def virtual_show():
+        table.reset(total=len(sales))
+        root.update()
+
+    def virtual_sort():
+        table.sort_by(3)
+        root.update()
+
+    table = VirtualTable(root, [("ID", "q", None), ("Date", None, None),
+                                ("Region", None, None), ("Amount", "d", None)], fetch)
+    table.pack()
+    try:
+        frames = []
+        old_show = time_call(lambda: frames.append(plain_show()), repeat)
+        old_sort = time_call(lambda: plain_sort(frames[-1][1]), repeat)
+        new_show = time_call(virtual_show, repeat)
+        new_sort = time_call(lambda: (virtual_show(), virtual_sort()), repeat) - new_show
+    finally:
+        root.destroy()
+    return [(f"show {len(sales):,} sales (s)", old_show, new_show),
+            ("sort them by amount (s)", old_sort, new_sort)]
+
+class Suite:
+    """Shared state for the suite scenarios: the benchmark database, the
+    generated CSV files and a template of an empty database to import into."""
+    def __init__(self, folder, rows, repeat):
+        self.folder = folder
+        self.rows = rows
+        self.repeat = repeat
+        self.db_path = os.path.join(folder, "bench.sqlite")
+        self.empty_path = os.path.join(folder, "empty.sqlite")
+        self.csv_folder = os.path.join(folder, "csv")
+        self.__csv_paths = None
+
+    @property
+    def csv_paths(self):
+        if self.__csv_paths is None:
+            os.mkdir(self.csv_folder)
+            self.__csv_paths = generate_sales_files(self.csv_folder, self.rows)
+        return self.__csv_paths
+
+    def fresh_database(self):
+        """Return the path of a new empty database to import into."""
+        if not os.path.exists(self.empty_path):
+            generate_database(self.empty_path, 0)
+            db.connect(self.empty_path)   # run the migrations once
+            db.close()
+        path = os.path.join(self.folder, "import.sqlite")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        shutil.copyfile(self.empty_path, path)
+        return path
+
+    def time(self, func):
+        """Best time over the repeats, with the result cache cleared first."""
+        def cold():
+            db.clear_cache()
+            func()
+        return time_call(cold, self.repeat)
+
+def suite_load(suite):
+    rows = suite.rows
+    return [
+        ("load: all sales as objects", suite.time(db.get_all_sales), rows),
+        ("load: all sales as columns",
+         suite.time(lambda: db.get_all_sales(columnar=True)), rows),
+    ]
+
+def suite_filtered(suite):
+    days = suite.rows // len(REGION_CODES)
+    start = FIRST_DAY.isoformat()
+    end = (FIRST_DAY + timedelta(days=days // 4)).isoformat()
+    region_rows = db.get_sales_filtered(start, end, "w").count
+    lookups = [((FIRST_DAY + timedelta(days=i * 37 % max(days, 1))).isoformat(),
+                REGION_CODES[i % len(REGION_CODES)]) for i in range(1000)]
+
+    def page_region():
+        for batch in db.iter_sales_filtered(region="m"):
+            pass
+
+    def lookup():
+        for sales_date, region in lookups:
+            db.clear_cache()
+            db.get_sales(sales_date, region)
+
+    return [
+        ("filtered: quarter of the range, one region",
+         suite.time(lambda: db.get_sales_filtered(start, end, "w")), region_rows),
+        ("filtered: page through one region", suite.time(page_region),
+         suite.rows // len(REGION_CODES)),
+        ("filtered: 1000 single-day lookups", suite.time(lookup), len(lookups)),
+    ]
+
+def suite_summary(suite):
+    days = suite.rows // len(REGION_CODES)
+    end = (FIRST_DAY + timedelta(days=days // 2)).isoformat()
+    rows = suite.rows
+
+    def nudge(clicks):
+        for click in range(clicks):
+            db.get_sales_summary((FIRST_DAY + timedelta(days=3 * click)).isoformat(),
+                                 (FIRST_DAY + timedelta(days=days // 4 + 3 * click)).isoformat())
+
+    return [
+        ("summary: all rows", suite.time(db.get_sales_summary), rows),
+        ("summary: all rows from Sales",
+         suite.time(lambda: db.get_sales_summary(use_rollup=False)), rows),
+        ("summary: half the range, one region",
+         suite.time(lambda: db.get_sales_summary(None, end, "e")), rows // 8),
+        ("series: weekly totals by region",
+         suite.time(lambda: db.get_sales_series("week", by_region=True)), rows),
+        ("rankings: best days and percentiles", suite.time(db.get_sales_rankings), rows),
+        ("summary: a range nudged 3 days, 10 times", suite.time(lambda: nudge(10)), rows // 4),
+    ]
+
+def suite_import(suite):
+    paths = suite.csv_paths
+    db.close()
+
+    def run(import_files):
+        best = None
+        for _ in range(suite.repeat):
+            db.connect(suite.fresh_database())
+            try:
+                start = time.perf_counter()
+                import_files(db.get_regions())
+                seconds = time.perf_counter() - start
+            finally:
+                db.close()
+            best = seconds if best is None else min(best, seconds)
+        return best
+
+    def streaming(regions):
+        # import_sales_streaming opens the file by name from the working folder
+        cwd = os.getcwd()
+        os.chdir(suite.csv_folder)
+        try:
+            for path in paths:
+                filename = File(os.path.basename(path))
+                filename.region = regions.get(filename.getRegionCode())
+                db.import_sales_streaming(filename, regions)
+        finally:
+            os.chdir(cwd)
+
+    try:
+        return [
+            ("import: files one at a time", run(streaming), suite.rows),
+            ("import: batch with worker processes",
+             run(lambda regions: db.import_sales_batch(paths, regions)), suite.rows),
+        ]
+    finally:
+        db.connect(suite.db_path)
+
+def suite_update(suite):
+    updates = 1000
+    step = max(suite.rows // updates, 1)
+    ids = range(1, min(suite.rows, updates * step) + 1, step)
+
+    def update():
+        for sales_id in ids:
+            data = DailySales()
+            data.id = sales_id
+            data.amount = float(sales_id % 997)
+            db.update_sales_amount(data)
+
+    def update_batch():
+        db.update_sales_amounts((sales_id, float(sales_id % 997)) for sales_id in ids)
+
+    return [("update: 1000 amounts, one at a time", suite.time(update), len(ids)),
+            ("update: 1000 amounts in one batch", suite.time(update_batch), len(ids))]
+
+def suite_export(suite):
+    path = os.path.join(suite.folder, "export.csv")
+    return [
+        ("export: all rows to CSV", suite.time(lambda: db.export_sales_csv(path)), suite.rows),
+        ("export: one region to gzip",
+         suite.time(lambda: db.export_sales_csv(path + ".gz", region="c", compress=True)),
+         suite.rows // len(REGION_CODES)),
+    ]
+
+# suite scenarios in the order they run; update runs late because it edits rows
+SUITE = {
+    "load": suite_load,
+    "filtered": suite_filtered,
+    "summary": suite_summary,
+    "export": suite_export,
+    "update": suite_update,
+    "import": suite_import,
+}
+
+def run_suite(rows, repeat, only=None):
+    """Run the suite scenarios and return the results as a JSON-ready dict."""
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        suite = Suite(folder, rows, repeat)
+        generate_database(suite.db_path, rows)
+        db.connect(suite.db_path)
+        try:
+            for name, scenario in SUITE.items():
+                if only and name not in only:
+                    continue
+                for label, seconds, count in scenario(suite):
+                    results[label] = {"seconds": seconds, "rows": count,
+                                      "rows_per_sec": count / seconds if seconds else 0.0}
+        finally:
+            db.close()
+    return {
+        "rows": rows,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+def compare_to_baseline(report, baseline, tolerance=REGRESSION_TOLERANCE):
+    """Print each measurement next to the baseline and return the labels
+    that got slower by more than tolerance."""
+    regressions = []
+    print(f"{'Measurement':46}{'Baseline':>11}{'Now':>11}{'Change':>10}")
+    print("-" * 78)
+    for label, result in report["results"].items():
+        before = baseline["results"].get(label)
+        if before is None:
+            print(f"{label:46}{'-':>11}{result['seconds']:11.4f}{'new':>10}")
+            continue
+        change = result["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0
+        flag = ""
+        if change > tolerance:
+            regressions.append(label)
+            flag = "  SLOWER"
+        print(f"{label:46}{before['seconds']:11.4f}{result['seconds']:11.4f}"
+              f"{change:+9.0%}{flag}")
+    return regressions
+
+def print_report(report):
+    print(f"{report['rows']:,} rows, Python {report['python']}, SQLite {report['sqlite']}")
+    print(f"{'Measurement':46}{'Seconds':>11}{'Rows/sec':>14}")
+    print("-" * 71)
+    for label, result in report["results"].items():
+        print(f"{label:46}{result['seconds']:11.4f}{result['rows_per_sec']:14,.0f}")
+
+def import_time_ms(module, repeat=3):
+    """Return the best cumulative import time of module, in milliseconds,
+    measured with -X importtime in a fresh interpreter."""
+    script_dir = Path(__file__).resolve().parent
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                cwd=script_dir, capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            # "import time:  self [us] | cumulative | imported package"
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                ms = int(parts[1]) / 1000
+                best = ms if best is None else min(best, ms)
+    return best
+
+def cli_start_ms(db_path, repeat=3):
+    """Return the best wall time, in milliseconds, for ui.py to start on
+    db_path, show its first prompt and exit."""
+    script_dir = Path(__file__).resolve().parent
+    code = ("import sys, db; connect = db.connect; "
+            "db.connect = lambda: connect(sys.argv[1]); "
+            "import ui; ui.main()")
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code, db_path], cwd=script_dir,
+                       input="exit\n", capture_output=True, text=True, check=True)
+        ms = (time.perf_counter() - start) * 1000
+        best = ms if best is None else min(best, ms)
+    return best
+
+def check_startup(rows, repeat):
+    """Measure startup against STARTUP_BUDGET_MS; return the measurements
+    as (label, budget, milliseconds) and whether all are within budget."""
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "bench.sqlite")
+        generate_database(path, rows)
+        db.connect(path)   # migrate now so the timed starts don't
+        db.close()
+        measurements = [(f"import {module}", import_time_ms(module, repeat))
+                        for module in ("db", "ui", "gui")]
+        measurements.append(("ui: start, first prompt, exit", cli_start_ms(path, repeat)))
+    results = [(label, STARTUP_BUDGET_MS[label], ms) for label, ms in measurements]
+    return results, all(ms <= budget for label, budget, ms in results)
+
+SCENARIOS = {
+    "summary": bench_summary,
+    "load": bench_load,
+    "records": bench_records,
+    "cache": bench_cache,
+    "instrument": bench_instrument,
+    "bootstrap": bench_bootstrap,
+    "parse": bench_parse,
+    "upsert": bench_upsert,
+    "updates": bench_updates,
+    "series": bench_series,
+    "rankings": bench_rankings,
+    "window": bench_window,
+    "ui": bench_ui,
+    "table": bench_table,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Sales database benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name, scenario in SCENARIOS.items():
+        command = commands.add_parser(name, help=scenario.__doc__.split("\n")[0])
+        command.add_argument("--rows", type=int, default=100_000,
+                             help="number of synthetic sales rows (default 100000)")
+        command.add_argument("--repeat", type=int, default=3,
+                             help="timed runs per measurement; the best is kept")
+
+    suite = commands.add_parser("suite", help="time every scenario at a standard size")
+    suite.add_argument("--size", choices=SIZES, default="10k")
+    suite.add_argument("--rows", type=int, help="use this many rows instead of --size")
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.add_argument("--only", help="comma-separated scenarios: " + ", ".join(SUITE))
+    suite.add_argument("--json", help="write the results to this file")
+    suite.add_argument("--baseline", help="compare with results saved earlier")
+    suite.add_argument("--save-baseline", help="save the results as the new baseline")
+    suite.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                       help="allowed slowdown before failing (default 0.25 = 25%%)")
+
+    startup = commands.add_parser("startup", help="check import and CLI start times against budgets")
+    startup.add_argument("--rows", type=int, default=1_000_000,
+                         help="sales in the database the CLI starts on (default 1000000)")
+    startup.add_argument("--repeat", type=int, default=3)
+
+    generate = commands.add_parser("generate", help="write the synthetic data to a folder")
+    generate.add_argument("--size", choices=SIZES, default="10k")
+    generate.add_argument("--rows", type=int, help="use this many rows instead of --size")
+    generate.add_argument("--files", type=int, default=8, help="number of CSV files")
+    generate.add_argument("--out", required=True, help="folder to write into")
+    args = parser.parse_args()
+
+    if args.command == "startup":
+        results, within_budget = check_startup(args.rows, args.repeat)
+        print(f"{'Measurement':40}{'Budget ms':>12}{'Now ms':>12}")
+        print("-" * 64)
+        for label, budget, ms in results:
+            flag = "" if ms <= budget else "  OVER BUDGET"
+            print(f"{label:40}{budget:12.0f}{ms:12.1f}{flag}")
+        if not within_budget:
+            sys.exit(1)
+    elif args.command == "generate":
+        rows = args.rows or SIZES[args.size]
+        os.makedirs(args.out, exist_ok=True)
+        generate_database(os.path.join(args.out, "sales_bench.sqlite"), rows)
+        paths = generate_sales_files(args.out, rows, args.files)
+        print(f"Wrote {rows:,} rows to sales_bench.sqlite and {len(paths)} CSV files.")
+    elif args.command == "suite":
+        only = set(args.only.split(",")) if args.only else None
+        report = run_suite(args.rows or SIZES[args.size], args.repeat, only)
+        print_report(report)
+        text = json.dumps(report, indent=2)
+        for path in (args.json, args.save_baseline):
+            if path:
+                with open(path, "w", encoding="utf-8") as file:
+                    file.write(text + "\n")
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as file:
+                baseline = json.load(file)
+            print()
+            if baseline["rows"] != report["rows"]:
+                sys.exit(f"Baseline has {baseline['rows']:,} rows; rerun with --rows {baseline['rows']}.")
+            regressions = compare_to_baseline(report, baseline, args.tolerance)
+            if regressions:
+                print(f"\n{len(regressions)} measurements regressed by more than {args.tolerance:.0%}.")
+                sys.exit(1)
+            print("\nNo regressions.")
+    else:
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "bench.sqlite")
+            generate_database(path, args.rows)
+            db.connect(path)
+            try:
+                results = SCENARIOS[args.command](args.rows, args.repeat)
+            finally:
+                db.close()
+
+        print(f"{'Measurement':40}{'Before':>12}{'After':>12}{'Gain':>10}")
+        print("-" * 74)
+        for label, before, after, *higher_is_better in results:
+            if higher_is_better:
+                gain = after / before if before else float("inf")
+            else:
+                gain = before / after if after else float("inf")
+            print(f"{label:40}{before:12.4f}{after:12.4f}{gain:9.1f}x")
+
+# if started as the main module, call the main function
+if __name__ == "__main__":
+    main()
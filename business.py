@@ -2,8 +2,13 @@
 #12/02/2025
 #Project12
 
+import re
+from array import array
 from datetime import datetime, date
 from dataclasses import dataclass
+from collections import deque
+from itertools import islice, repeat
+from operator import itemgetter
 
 # constant for working with dates
 DATE_FORMAT = "%Y-%m-%d"
@@ -11,29 +16,61 @@ DATE_FORMAT = "%Y-%m-%d"
 class FileImportError(OSError):
     pass
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Region:
     code:str = ""
     name:str = ""
 
+    @classmethod
+    def intern(cls, code, name):
+        """Return the shared Region for code, creating it on first use."""
+        region = _REGION_REGISTRY.get(code)
+        if region is None or region.name != name:
+            region = cls(code, name)
+            _REGION_REGISTRY[code] = region
+        return region
+
+# one Region instance per region code, shared by every sale
+_REGION_REGISTRY = {}
+
+def parse_date(text):
+    """Return a date object for YYYY-MM-DD text.
+
+    The fixed format is decoded with date.fromisoformat, which is much
+    faster than strptime; anything else falls back to strptime so the
+    accepted inputs don't change. Raises ValueError for invalid dates.
+    """
+    if len(text) == 10 and text[4] == "-" and text[7] == "-":
+        return date.fromisoformat(text)
+    dt = datetime.strptime(text, DATE_FORMAT)
+    return date(dt.year, dt.month, dt.day)
+
 class Regions:
+    """The valid regions, looked up by code in a dict."""
     def __init__(self):
-        self.__VALID_REGIONS = []
+        self.__regions = {}   # region code -> Region
 
     def __str__(self):
-        regions = []
-        for region in self.__VALID_REGIONS:
-            regions.append(region.code)
-        return str(regions)
+        return str(list(self.__regions))
+
+    def __iter__(self):
+        return iter(self.__regions.values())
+
+    def __len__(self):
+        return len(self.__regions)
+
+    def __contains__(self, code):
+        return code in self.__regions
+
+    @property
+    def codes(self):
+        return sorted(self.__regions)
 
     def get(self, code):
-        for region in self.__VALID_REGIONS:
-            if code == region.code:
-                return region
-        return None
+        return self.__regions.get(code)
 
     def add(self, region):
-        self.__VALID_REGIONS.append(region)
+        self.__regions[region.code] = region
 
 @dataclass
 class File:
@@ -60,7 +97,7 @@ class File:
         # region code is 5th from last character in file name
         return self.name[-5]          
 
-@dataclass
+@dataclass(slots=True)
 class DailySales:
     amount:float = 0.0
     salesDate:date = None
@@ -98,9 +135,7 @@ class DailySales:
 
         # date
         try:
-            dt = datetime.strptime(row[1], DATE_FORMAT)
-            # convert to a date object rather than a datetime object
-            self.salesDate = date(dt.year, dt.month, dt.day)
+            self.salesDate = parse_date(row[1])
         except ValueError:
             self.salesDate = "?"
 
@@ -112,13 +147,12 @@ class DailySales:
         
     def fromDb(self, row):
         self.amount = row["amount"]
-        self.region = Region(row["code"], row["name"])
+        self.region = Region.intern(row["code"], row["name"])
         self.id = row["ID"]
 
         # no validation bc only good data is stored in db
-        self.salesDate = datetime.strptime(row["salesDate"], DATE_FORMAT)
-        
-        self.setQuarter()
+        self.salesDate = parse_date(row["salesDate"])
+        self.quarter = (self.salesDate.month + 2) // 3
         
     def toList(self):
         if self.hasBadData:
@@ -130,19 +164,13 @@ class DailySales:
         if self.hasBadSalesDate == True:
             self.quarter = 0
         else:
-            if self.salesDate.month >=1 and self.salesDate.month <= 3:
-                self.quarter = 1
-            elif self.salesDate.month >= 4 and self.salesDate.month <=6:
-                self.quarter = 2
-            elif self.salesDate.month >= 7 and self.salesDate.month <=9:
-                self.quarter = 3
-            elif self.salesDate.month >= 10 and self.salesDate.month <=12:
-                self.quarter = 4       
+            self.quarter = (self.salesDate.month + 2) // 3
 
 class SalesList:
     def __init__(self):
         self.__sales = []
         self.hasBadData = False
+        self.errors = []    # (row, column, reason) for file rows left out
 
     @property
     def count(self):
@@ -157,6 +185,9 @@ class SalesList:
     def add(self, data):
         self.__sales.append(data)
 
+    def set(self, index, data):
+        self.__sales[index] = data
+
     def concat(self, sales_list):
         for i in range(sales_list.count):
             self.add(sales_list.get(i))
@@ -165,6 +196,243 @@ class SalesList:
         for data in self.__sales:
             yield data
 
+class ColumnarSalesList:
+    """A SalesList that keeps each field in a typed array instead of
+    holding a DailySales object per sale.
+
+    Amounts, date ordinals, region indexes, quarters and IDs each live in
+    their own array, and every region is stored once and referred to by
+    index. DailySales objects are only built when a sale is read through
+    get() or iteration, so changes to them must be written back with set().
+    Only good data can be stored; use SalesList for rows with bad data.
+    """
+    def __init__(self):
+        self.__amounts = array("d")
+        self.__dates = array("l")     # date.toordinal()
+        self.__regionIndexes = array("B")
+        self.__quarters = array("B")
+        self.__ids = array("q")
+        self.__regions = []
+        self.__regionIndex = {}       # region code -> index in __regions
+        self.hasBadData = False
+
+    @property
+    def count(self):
+        return len(self.__ids)
+
+    def get(self, index):
+        if index >= self.count:
+            return None
+        else:
+            return self.__build(index)
+
+    def add(self, data):
+        if data.hasBadData:
+            raise ValueError("ColumnarSalesList can't store sales with bad data")
+        self.__amounts.append(data.amount)
+        self.__dates.append(data.salesDate.toordinal())
+        self.__regionIndexes.append(self.__intern(data.region))
+        self.__quarters.append(data.quarter)
+        self.__ids.append(data.id)
+
+    def addRow(self, id, amount, salesDate, code, name):
+        """Add a sale straight from database columns without building a
+        DailySales object; salesDate is YYYY-MM-DD text."""
+        year, month, day = int(salesDate[:4]), int(salesDate[5:7]), int(salesDate[8:10])
+        index = self.__regionIndex.get(code)
+        if index is None:
+            index = self.__intern(Region.intern(code, name))
+        self.__amounts.append(amount)
+        self.__dates.append(date(year, month, day).toordinal())
+        self.__regionIndexes.append(index)
+        self.__quarters.append((month + 2) // 3)
+        self.__ids.append(id)
+
+    def set(self, index, data):
+        self.__amounts[index] = data.amount
+        self.__dates[index] = data.salesDate.toordinal()
+        self.__regionIndexes[index] = self.__intern(data.region)
+        self.__quarters[index] = data.quarter
+        self.__ids[index] = data.id
+
+    def concat(self, sales_list):
+        for i in range(sales_list.count):
+            self.add(sales_list.get(i))
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self.__build(index)
+
+    def __intern(self, region):
+        index = self.__regionIndex.get(region.code)
+        if index is None:
+            index = len(self.__regions)
+            self.__regions.append(region)
+            self.__regionIndex[region.code] = index
+        return index
+
+    def __build(self, index):
+        return DailySales(amount=self.__amounts[index],
+                          salesDate=date.fromordinal(self.__dates[index]),
+                          region=self.__regions[self.__regionIndexes[index]],
+                          quarter=self.__quarters[index],
+                          id=self.__ids[index])
+
+# column names used in parse errors
+AMOUNT_COLUMN = "amount"
+DATE_COLUMN = "date"
+
+# rows parsed at a time by read_sales_chunks
+PARSE_CHUNK_SIZE = 5000
+
+# a run of YYYY-MM-DD lines; one match checks a whole date column
+_DATE_LINES = re.compile(r"(?:[0-9]{4}-[0-9]{2}-[0-9]{2}\n)*")
+_FIRST = itemgetter(0)
+_SECOND = itemgetter(1)
+_DATE_TEXT = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+class SalesChunk:
+    """Rows of a sales file parsed into typed columns.
+
+    amounts (an array of floats) and dates (YYYY-MM-DD text) have a value
+    for every row; bad[i] is 1 when row i has a bad value, and the values
+    in bad rows mean nothing. errors lists (row, column, reason) for each
+    bad value, with row numbers counted from 1 at the top of the file and
+    column None when the row is missing a value.
+    """
+    __slots__ = ("firstRow", "amounts", "dates", "bad", "errors")
+
+    def __init__(self, firstRow, amounts, dates, bad, errors):
+        self.firstRow = firstRow
+        self.amounts = amounts
+        self.dates = dates
+        self.bad = bad
+        self.errors = errors
+
+    @property
+    def count(self):
+        return len(self.dates)
+
+    @property
+    def badCount(self):
+        return self.bad.count(1)
+
+    def goodRows(self, regionCode):
+        """Return (amount, salesDate, regionCode) tuples for the good rows."""
+        if not self.errors:
+            return list(zip(self.amounts, self.dates, repeat(regionCode)))
+        return [(amount, salesDate, regionCode)
+                for amount, salesDate, isBad in zip(self.amounts, self.dates, self.bad)
+                if not isBad]
+
+    def goodTotal(self):
+        if not self.errors:
+            return sum(self.amounts)
+        return sum(amount for amount, isBad in zip(self.amounts, self.bad) if not isBad)
+
+def parse_sales_chunk(rows, first_row=1):
+    """Parse a list of CSV rows (amount, date, ...) into a SalesChunk.
+
+    Each column is converted in one pass in C: amounts with map(float) into
+    an array, dates by matching the whole column against one regular
+    expression and then map(date.fromisoformat) to reject impossible days.
+    A bad amount stops its pass; it is recorded and the pass resumes after
+    it. If the date check fails the dates are checked one by one, and
+    dates in another layout parse_date accepts are stored as YYYY-MM-DD.
+    """
+    count = len(rows)
+    bad = bytearray(count)
+    errors = []
+    if count == 0:
+        return SalesChunk(first_row, array("d"), [], bad, errors)
+
+    if min(map(len, rows)) >= 2:
+        # not zip(*rows): that makes an iterator per row for the garbage
+        # collector to track
+        amount_text = list(map(_FIRST, rows))
+        date_text = list(map(_SECOND, rows))
+    else:
+        # give short rows placeholder values so the passes below can run
+        amount_text = []
+        date_text = []
+        for index, row in enumerate(rows):
+            if len(row) < 2:
+                bad[index] = 1
+                errors.append((first_row + index, None, "expected an amount and a date"))
+                row = ("0", "2000-01-01")
+            amount_text.append(row[0])
+            date_text.append(row[1])
+
+    amounts = array("d")
+    values = iter(amount_text)
+    while True:
+        try:
+            amounts.extend(map(float, values))
+            break
+        except ValueError:
+            # extend kept every amount before the bad one
+            index = len(amounts)
+            bad[index] = 1
+            errors.append((first_row + index, AMOUNT_COLUMN,
+                           f"'{amount_text[index]}' is not a number"))
+            amounts.append(0.0)
+
+    if not _dates_are_valid(date_text):
+        _check_dates(date_text, first_row, bad, errors)
+
+    if errors:
+        # amount errors were found before date errors; list them by row
+        errors.sort(key=lambda error: error[0])
+    return SalesChunk(first_row, amounts, date_text, bad, errors)
+
+def _dates_are_valid(date_text):
+    if _DATE_LINES.fullmatch("\n".join(date_text) + "\n") is None:
+        return False
+    try:
+        # fromisoformat catches days that don't exist, like 2021-02-30
+        deque(map(date.fromisoformat, date_text), maxlen=0)
+    except ValueError:
+        return False
+    return True
+
+def _check_dates(date_text, first_row, bad, errors):
+    # only runs for a chunk with a bad date or one in another layout; dates
+    # parse_date accepts that aren't YYYY-MM-DD (like 2021-1-5) are stored
+    # as ISO text, as the per-row import did
+    for index, text in enumerate(date_text):
+        try:
+            if len(text) == 10 and text[4] == "-" and text[7] == "-":
+                date.fromisoformat(text)
+            else:
+                date_text[index] = parse_date(text).isoformat()
+        except ValueError:
+            bad[index] = 1
+            if _DATE_TEXT.fullmatch(text):
+                reason = f"'{text}' is not a real date"
+            else:
+                reason = f"'{text}' is not in YYYY-MM-DD format"
+            errors.append((first_row + index, DATE_COLUMN, reason))
+
+def read_sales_chunks(rows, chunk_size=PARSE_CHUNK_SIZE):
+    """Parse an iterable of CSV rows (e.g. a csv.reader) chunk by chunk,
+    yielding a SalesChunk for every chunk_size rows."""
+    # keep only (amount, date) pairs: the reader's row lists are freed at
+    # once instead of piling up for the garbage collector to scan
+    pairs = map(itemgetter(0, 1), rows)
+    first_row = 1
+    while True:
+        batch = []
+        while True:
+            try:
+                batch.extend(islice(pairs, chunk_size - len(batch)))
+                break
+            except IndexError:
+                batch.append(())   # a short row; parse_sales_chunk reports it
+        if not batch:
+            return
+        yield parse_sales_chunk(batch, first_row)
+        first_row += len(batch)
+
 def main():
     pass
 
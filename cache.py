@@ -0,0 +1,107 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+"""
+This module holds the result cache db uses for repeated lookups.
+"""
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+
+class ResultCache:
+    """An LRU cache of query results with a time-to-live.
+
+    Each entry records the slice of sales it was computed from, as a
+    (start_date, end_date, region) scope where None means unbounded or every
+    region. invalidate() drops only the entries whose scope covers a changed
+    (salesDate, region) pair. Safe to use from several threads.
+    """
+    def __init__(self, max_size=256, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.__entries = OrderedDict()   # key -> (expires, scope, value)
+        self.__lock = threading.Lock()
+        self.__generation = 0            # bumped by every invalidation
+        self.__stats = {"hits": 0, "misses": 0, "evictions": 0,
+                        "expired": 0, "invalidated": 0}
+
+    @property
+    def generation(self):
+        """Read before running a query and pass to put(), so a result
+        computed before a write commits is never stored after it."""
+        return self.__generation
+
+    def get(self, key):
+        """Return (True, value) for a live entry, else (False, None)."""
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__stats["misses"] += 1
+                return False, None
+            expires, scope, value = entry
+            if expires < time.monotonic():
+                del self.__entries[key]
+                self.__stats["expired"] += 1
+                self.__stats["misses"] += 1
+                return False, None
+            self.__entries.move_to_end(key)
+            self.__stats["hits"] += 1
+            return True, value
+
+    def put(self, key, value, scope, generation):
+        with self.__lock:
+            if generation != self.__generation:
+                return
+            self.__entries[key] = (time.monotonic() + self.ttl, scope, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.__stats["evictions"] += 1
+
+    def invalidate(self, changes):
+        """Drop the entries affected by changed (salesDate, region) pairs."""
+        dates_by_region = {}
+        for sales_date, region in changes:
+            dates_by_region.setdefault(region, []).append(sales_date)
+        for dates in dates_by_region.values():
+            dates.sort()
+
+        with self.__lock:
+            self.__generation += 1
+            stale = [key for key, (expires, scope, value) in self.__entries.items()
+                     if _touches(scope, dates_by_region)]
+            for key in stale:
+                del self.__entries[key]
+            self.__stats["invalidated"] += len(stale)
+
+    def clear(self):
+        with self.__lock:
+            self.__generation += 1
+            self.__stats["invalidated"] += len(self.__entries)
+            self.__entries.clear()
+
+    def stats(self):
+        """Return the hit/miss counters, hit rate and current size."""
+        with self.__lock:
+            stats = dict(self.__stats)
+            stats["size"] = len(self.__entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+def _touches(scope, dates_by_region):
+    """Return True if any changed date for a region in scope falls in its range."""
+    start_date, end_date, region = scope
+    if region is not None:
+        dates = dates_by_region.get(region)
+        return dates is not None and _any_between(dates, start_date, end_date)
+    return any(_any_between(dates, start_date, end_date)
+               for dates in dates_by_region.values())
+
+def _any_between(dates, start_date, end_date):
+    # dates is sorted YYYY-MM-DD text, so bisect finds the first one in range
+    index = 0 if start_date is None else bisect.bisect_left(dates, start_date)
+    return index < len(dates) and (end_date is None or dates[index] <= end_date)
@@ -2,59 +2,583 @@
 #12/02/2025
 #Project12
 
+import copy
 import csv
+import itertools
 import os
+import re
+import threading
+import time
+import weakref
+from datetime import date, datetime, timedelta
+from operator import itemgetter
 from pathlib import Path
-from business import Region, Regions, DailySales, SalesList, FileImportError
+from business import (Region, Regions, File, DailySales, SalesList, ColumnarSalesList,
+                      FileImportError, DATE_FORMAT, read_sales_chunks)
+from cache import ResultCache
+from ranking import QuantileSketch, TopN
+import instrument
+from instrument import instrumented
 
 import sqlite3
-from contextlib import closing
+from contextlib import closing, contextmanager, suppress
 
+# argparse, gzip, zlib and concurrent.futures are imported by the
+# functions that need them: together they would add ~40 ms to every start
+
+# the single writer connection; every write goes through writing()
 conn = None
+_db_path = None
+
+# per-thread state: a connection bound with use_connection() and the
+# thread's read connection
+_thread = threading.local()
+
+# serializes writers; reentrant so a write helper can run inside writing()
+_write_lock = threading.RLock()
+
+# every open read connection, so close() can close them all (a thread's
+# own is also released when the thread exits); the generation changes on
+# close() so threads open fresh ones next time
+_readers = []
+_readers_lock = threading.Lock()
+_generation = 0
+
+# applied to every connection; WAL lets readers keep reading while the
+# writer commits, and NORMAL sync is durable enough in WAL mode
+PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -32000),           # KiB when negative: 32 MB per connection
+    ("mmap_size", 256 * 1024 * 1024),
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),           # ms to wait for another process's lock
+]
+
+# the Regions registry shared by the CLI and GUI, and the writer's
+# data_version when it was loaded; see get_regions() and check_regions()
+_regions = None
+_regions_version = None
+
+# number of rows sent to executemany at a time when saving sales
+SAVE_CHUNK_SIZE = 5000
+
+# (salesDate, region) pairs looked up per query, well under SQLite's limit
+# on bound parameters
+LOOKUP_CHUNK_SIZE = 1000
+
+# sales per batch when paging through results
+PAGE_SIZE = 500
+
+# rows per fetch, and bytes of write buffer, when exporting to CSV
+EXPORT_CHUNK_SIZE = 10000
+EXPORT_BUFFER_SIZE = 1024 * 1024
+
+# most bad rows listed in a streaming import report
+MAX_REPORTED_ERRORS = 50
+
+# how a saved or imported sale is applied when its (salesDate, region)
+# already has one: "replace" the stored amount or "accumulate" onto it
+IMPORT_MODES = ("replace", "accumulate")
+
+# entries kept, and seconds each stays fresh, in the lookup/summary cache;
+# the TTL bounds how stale a result can get after another process writes
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_TTL = 300.0
+
+_results = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
 
-def connect(db_file="sales_db.sqlite", sql_dump="sales_db.sql"):
-    """Connect to SQLite; if the DB file is missing but a SQL dump exists, bootstrap it."""
-    global conn
+def connect(db_file="sales_db.sqlite", sql_dump="sales_db.sql", snapshot="sales_db.snapshot"):
+    """Connect to SQLite; if the DB file is missing, restore it from a snapshot
+    written by export-snapshot or, failing that, bootstrap it from the SQL dump.
+
+    The connection returned is the writer. Reads on each thread use that
+    thread's own connection, opened on first use.
+    """
+    global conn, _db_path
     if conn:
         return conn
 
     script_dir = Path(__file__).resolve().parent
     db_path = script_dir / db_file
     sql_path = script_dir / sql_dump
+    snapshot_path = script_dir / snapshot
 
-    needs_bootstrap = (not db_path.exists()) and sql_path.exists()
+    needs_bootstrap = False
+    if not db_path.exists():
+        # a -wal file left from a deleted database would be replayed into
+        # the new one
+        _remove_wal_files(db_path)
+        if snapshot_path.exists() and (not sql_path.exists() or
+                _snapshot_matches(snapshot_path, sql_path)):
+            _restore_snapshot(snapshot_path, db_path)
+        else:
+            needs_bootstrap = sql_path.exists()
 
-    conn_obj = sqlite3.connect(db_path)
+    # used by whichever thread holds _write_lock, not only this one
+    conn_obj = sqlite3.connect(db_path, check_same_thread=False)
     conn_obj.row_factory = sqlite3.Row
 
     if needs_bootstrap:
-        sql = sql_path.read_text(encoding='utf-8')
-        with conn_obj:
-            conn_obj.executescript(sql)
+        try:
+            _bootstrap(conn_obj, sql_path)
+        except BaseException:
+            # don't leave a half-loaded file that the next start would trust
+            conn_obj.close()
+            db_path.unlink(missing_ok=True)
+            raise
+    _configure(conn_obj)
+    migrate(conn_obj)
     conn = conn_obj
+    _db_path = db_path
     return conn
 
+# an INSERT line written by the sqlite3 shell's .dump or by iterdump(); the
+# VALUES list may swallow more statements, see _split_statements()
+_DUMP_INSERT = re.compile(r'INSERT INTO ("?\w+"?) VALUES(\(.*\));\s*$')
+
+# dump rows sent to SQLite per multi-row INSERT when bootstrapping
+BOOTSTRAP_ROWS_PER_INSERT = 500
+
+def _bootstrap(connection, sql_path):
+    """Load a SQL dump into a new, empty database in one transaction.
+
+    Runs of single-row INSERT lines for the same table are merged into
+    multi-row INSERTs, so SQLite compiles one statement per
+    BOOTSTRAP_ROWS_PER_INSERT rows instead of one per row; everything else,
+    including a line holding more than one statement, is executed as
+    written. Journaling and syncing are off during the load, and CREATE
+    INDEX statements run after the rows are in.
+    """
+    indexes = []
+    pending = []     # lines of a statement that isn't complete yet
+    table = None     # the table the rows in values belong to
+    values = []      # "(...)" VALUES lists waiting to be inserted
+
+    def flush():
+        if values:
+            c.execute(f"INSERT INTO {table} VALUES " + ",".join(values))
+            values.clear()
+
+    with closing(connection.cursor()) as c:
+        c.execute("PRAGMA journal_mode = MEMORY")
+        c.execute("PRAGMA synchronous = OFF")
+        c.execute("BEGIN")
+        with open(sql_path, encoding="utf-8") as file:
+            for line in file:
+                match = None if pending else _DUMP_INSERT.match(line)
+                # complete_statement rejects a line whose string literal
+                # carries on to the next line
+                if match and sqlite3.complete_statement(line) and _is_one_statement(line):
+                    if match.group(1) != table or len(values) >= BOOTSTRAP_ROWS_PER_INSERT:
+                        flush()
+                        table = match.group(1)
+                    values.append(match.group(2))
+                    continue
+
+                pending.append(line)
+                text = "".join(pending)
+                if not sqlite3.complete_statement(text):
+                    continue
+                pending.clear()
+                flush()
+                for statement in _split_statements(text):
+                    keyword = " ".join(statement.split(None, 3)[:3]).upper()
+                    if keyword.startswith(("BEGIN", "COMMIT", "END")):
+                        continue   # the whole load is already one transaction
+                    if keyword.startswith(("CREATE INDEX", "CREATE UNIQUE INDEX")):
+                        indexes.append(statement)
+                        continue
+                    c.execute(statement)
+        flush()
+        for statement in indexes:
+            c.execute(statement)
+        connection.commit()
+
+def _split_statements(text):
+    """Yield each statement in complete SQL text, e.g. both INSERTs of
+    "INSERT ...(1);INSERT ...(2);"."""
+    start = 0
+    end = text.find(";")
+    while end != -1:
+        # a semicolon in a string literal or trigger body doesn't end one
+        if sqlite3.complete_statement(text[start:end + 1]):
+            yield text[start:end + 1]
+            start = end + 1
+        end = text.find(";", end + 1)
+    if text[start:].strip():
+        yield text[start:]
+
+def _is_one_statement(line):
+    return line.count(";") == 1 or len(list(_split_statements(line))) == 1
+
+# marks a file written by export_snapshot(); the next line records the SQL
+# dump the snapshot was taken with, as "<size> <sha256>"
+SNAPSHOT_MAGIC = b"SALESDB-SNAPSHOT-2\n"
+
+def export_snapshot(path, sql_dump="sales_db.sql"):
+    """Write a zlib-compressed image of the whole database to path and return
+    (database bytes, snapshot bytes). connect() restores from the snapshot
+    much faster than it can load the SQL dump, for as long as the dump is
+    the one the snapshot was taken with."""
+    import zlib
+    sql_path = Path(__file__).resolve().parent / sql_dump
+    with _write_lock:   # no write can land half way through the image
+        image = conn.serialize()
+    header = _dump_signature(sql_path).encode("ascii") + b"\n"
+    data = SNAPSHOT_MAGIC + header + zlib.compress(image, 6)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+    return len(image), len(data)
+
+def _dump_signature(sql_path):
+    """Return "<size> <sha256>" for the SQL dump, or "none" without one."""
+    import hashlib
+    if not sql_path.exists():
+        return "none"
+    data = sql_path.read_bytes()
+    return f"{len(data)} {hashlib.sha256(data).hexdigest()}"
+
+def _snapshot_matches(snapshot_path, sql_path):
+    """Return True if the snapshot was taken with the SQL dump as it is now.
+
+    File times can't tell: a git checkout gives every file a new one.
+    """
+    with open(snapshot_path, "rb") as file:
+        if file.readline() != SNAPSHOT_MAGIC:
+            return False
+        header = file.readline().decode("ascii", "replace").split()
+    # sizes first, so a changed dump is usually caught without hashing it
+    if not header or header[0] != str(sql_path.stat().st_size):
+        return False
+    return " ".join(header) == _dump_signature(sql_path)
+
+def _restore_snapshot(snapshot_path, db_path):
+    import zlib
+    data = snapshot_path.read_bytes()
+    if not data.startswith(SNAPSHOT_MAGIC):
+        raise ValueError(f"'{snapshot_path.name}' is not a sales database snapshot.")
+    # the image is the database file itself; write it whole, then rename,
+    # so a failed restore never leaves a partial database behind
+    header_end = data.index(b"\n", len(SNAPSHOT_MAGIC))
+    image = zlib.decompress(data[header_end + 1:])
+    temp_path = db_path.with_name(db_path.name + ".restoring")
+    temp_path.write_bytes(image)
+    os.replace(temp_path, db_path)
+
+def _remove_wal_files(db_path):
+    for suffix in ("-wal", "-shm"):
+        db_path.with_name(db_path.name + suffix).unlink(missing_ok=True)
+
+def _configure(connection):
+    with closing(connection.cursor()) as c:
+        for name, value in PRAGMAS:
+            c.execute(f"PRAGMA {name} = {value}")
+    if instrument.enabled():
+        connection.set_trace_callback(instrument.trace)
+
+def _set_tracing(enabled):
+    """Add or remove the instrumentation trace on the writer and readers."""
+    callback = instrument.trace if enabled else None
+    with _readers_lock:
+        connections = [conn] + _readers
+    for connection in connections:
+        if connection is not None:
+            connection.set_trace_callback(callback)
+
+def _explain_plan(sql):
+    """Return the EXPLAIN QUERY PLAN lines for sql, for the slow-query log."""
+    try:
+        with closing(_connection().cursor()) as c:
+            c.execute("EXPLAIN QUERY PLAN " + sql)
+            return [row["detail"] for row in c.fetchall()]
+    except sqlite3.Error as e:
+        return [f"EXPLAIN failed: {e}"]
+
+instrument.on_toggle(_set_tracing)
+instrument.set_explain(_explain_plan)
+
+def _connection():
+    """Return the calling thread's connection: the one bound with
+    use_connection() or writing(), otherwise the thread's read connection."""
+    return getattr(_thread, "conn", None) or _reader()
+
+def use_connection(connection):
+    """Make every db function called on this thread use connection (None
+    goes back to the thread's read connection). A sqlite3 connection can
+    only be used by the thread that opened it."""
+    _thread.conn = connection
+
+def open_connection():
+    """Open a separate connection to the database connect() opened, for
+    work done on another thread."""
+    conn_obj = sqlite3.connect(_require_db_path())
+    conn_obj.row_factory = sqlite3.Row
+    _configure(conn_obj)
+    return conn_obj
+
+class _ReaderHandle:
+    """A thread's read connection, kept in the thread-local. The thread's
+    locals are dropped when it exits, so the handle is collected then and
+    its finalizer releases the connection."""
+    __slots__ = ("connection", "generation", "__weakref__")
+
+    def __init__(self, connection, generation):
+        self.connection = connection
+        self.generation = generation
+
+def _reader():
+    """Return this thread's read connection, opening it on first use."""
+    handle = getattr(_thread, "reader", None)
+    if handle is None or handle.generation != _generation:
+        # check_same_thread=False only so close() or the finalizer may close
+        # it from another thread; it is never used by another thread
+        reader = sqlite3.connect(_require_db_path(), check_same_thread=False)
+        reader.row_factory = sqlite3.Row
+        _configure(reader)
+        with _readers_lock:
+            _readers.append(reader)
+        handle = _ReaderHandle(reader, _generation)
+        weakref.finalize(handle, _release_reader, reader)
+        _thread.reader = handle
+    return handle.connection
+
+def _release_reader(reader):
+    with _readers_lock:
+        if reader in _readers:   # close() may have got to it first
+            _readers.remove(reader)
+    reader.close()
+
+def _require_db_path():
+    if _db_path is None:
+        raise RuntimeError("The database isn't open: call db.connect() first.")
+    return _db_path
+
+@contextmanager
+def writing():
+    """Hold the writer connection for one transaction and yield it.
+
+    Only one thread writes at a time. db functions called inside the block
+    use the writer, so they see its uncommitted changes and join its
+    transaction; the block commits on success and rolls back on error.
+    """
+    with _write_lock:
+        if getattr(_thread, "writing", False):
+            # nested: the outer block owns the transaction
+            yield conn
+            return
+        previous = getattr(_thread, "conn", None)
+        _thread.conn = conn
+        _thread.writing = True
+        _thread.changes = set()   # (salesDate, region) pairs, see _update_rollup
+        try:
+            with conn:
+                # take the write lock up front rather than upgrading from a
+                # read lock part way through
+                conn.execute("BEGIN IMMEDIATE")
+                yield conn
+            # committed: drop the cached results the write made stale
+            _results.invalidate(_thread.changes)
+        finally:
+            _thread.writing = False
+            _thread.conn = previous
+
+def _migrate_v1(c):
+    """Store dates as plain YYYY-MM-DD text and index the date/region filters."""
+    # date() returns NULL for text it can't parse; leave those rows alone
+    c.execute('''UPDATE Sales
+                 SET salesDate = date(salesDate)
+                 WHERE date(salesDate) IS NOT NULL
+                   AND salesDate <> date(salesDate)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_sales_date_region
+                 ON Sales (salesDate, region)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_sales_region_date
+                 ON Sales (region, salesDate)''')
+
+def _migrate_v2(c):
+    """Add the SalesDaily rollup of per-(date, region) sums and counts."""
+    c.execute('''CREATE TABLE IF NOT EXISTS SalesDaily (
+                     salesDate TEXT NOT NULL,
+                     region TEXT NOT NULL,
+                     total REAL NOT NULL DEFAULT 0.0,
+                     count INTEGER NOT NULL DEFAULT 0,
+                     PRIMARY KEY (salesDate, region)
+                 ) WITHOUT ROWID''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_salesdaily_region_date
+                 ON SalesDaily (region, salesDate)''')
+    _fill_rollup(c)
+
+def _migrate_v3(c):
+    """Allow one sale per (salesDate, region), merging duplicates."""
+    # earlier versions stored every added or imported sale as its own row
+    # and counted each in the totals, so a duplicated pair's amounts are
+    # added up onto its lowest ID, the row get_sales returned
+    c.execute('''UPDATE Sales
+                 SET amount = (SELECT SUM(amount)
+                               FROM Sales AS duplicate
+                               WHERE duplicate.salesDate = Sales.salesDate
+                                 AND duplicate.region = Sales.region)
+                 WHERE ID IN (SELECT MIN(ID)
+                              FROM Sales
+                              GROUP BY salesDate, region
+                              HAVING COUNT(*) > 1)''')
+    c.execute('''DELETE FROM Sales
+                 WHERE ID NOT IN (SELECT MIN(ID)
+                                  FROM Sales
+                                  GROUP BY salesDate, region)''')
+    c.execute("DROP INDEX IF EXISTS idx_sales_date_region")
+    c.execute('''CREATE UNIQUE INDEX idx_sales_date_region
+                 ON Sales (salesDate, region)''')
+    _fill_rollup(c)
+
+# schema migrations in order; PRAGMA user_version records how many have run
+MIGRATIONS = [_migrate_v1, _migrate_v2, _migrate_v3]
+
+def migrate(connection):
+    """Run any schema migrations the database hasn't seen yet."""
+    with closing(connection.cursor()) as c:
+        c.execute("PRAGMA user_version")
+        version = c.fetchone()[0]
+        for number, step in enumerate(MIGRATIONS[version:], start=version + 1):
+            with connection:  # each migration commits or rolls back as a unit
+                # sqlite3 only opens transactions implicitly before DML, so
+                # begin explicitly to keep CREATE statements in the unit
+                c.execute("BEGIN")
+                step(c)
+                c.execute(f"PRAGMA user_version = {number}")
+
+def _fill_rollup(c):
+    c.execute("DELETE FROM SalesDaily")
+    c.execute('''INSERT INTO SalesDaily (salesDate, region, total, count)
+                 SELECT salesDate, region, SUM(amount), COUNT(*)
+                 FROM Sales
+                 GROUP BY salesDate, region''')
+
+def _update_rollup(c, deltas):
+    """Add {(salesDate, region): [amount, count]} deltas to SalesDaily."""
+    sql = '''INSERT INTO SalesDaily (salesDate, region, total, count)
+             VALUES (?, ?, ?, ?)
+             ON CONFLICT (salesDate, region) DO UPDATE
+             SET total = total + excluded.total,
+                 count = count + excluded.count'''
+    c.executemany(sql, [(sales_date, region, amount, count)
+                        for (sales_date, region), (amount, count) in deltas.items()])
+    # every write path goes through here, so this is where writing()
+    # learns which cached results to invalidate
+    changes = getattr(_thread, "changes", None)
+    if changes is not None:
+        changes.update(deltas)
+
+@instrumented
+def rebuild_rollup():
+    """Recompute SalesDaily from the raw Sales rows."""
+    with writing() as writer:
+        with closing(writer.cursor()) as c:
+            _fill_rollup(c)
+    clear_cache()
+
+@instrumented
+def verify_rollup(tolerance=0.005):
+    """Return the (salesDate, region) keys where SalesDaily disagrees with Sales.
+
+    Each mismatch is a dict with the raw and rollup total/count; an empty
+    list means the rollup is current.
+    """
+    query = '''SELECT raw.salesDate, raw.region,
+                      raw.total AS raw_total, raw.count AS raw_count,
+                      SalesDaily.total AS rollup_total, SalesDaily.count AS rollup_count
+               FROM (SELECT salesDate, region, SUM(amount) AS total, COUNT(*) AS count
+                     FROM Sales
+                     GROUP BY salesDate, region) AS raw
+               LEFT JOIN SalesDaily
+                    ON SalesDaily.salesDate = raw.salesDate
+                   AND SalesDaily.region = raw.region
+               WHERE SalesDaily.count IS NULL
+                  OR SalesDaily.count <> raw.count
+                  OR abs(SalesDaily.total - raw.total) > ?
+               UNION ALL
+               SELECT salesDate, region, NULL, NULL, total, count
+               FROM SalesDaily
+               WHERE count <> 0
+                 AND NOT EXISTS (SELECT 1 FROM Sales
+                                 WHERE Sales.salesDate = SalesDaily.salesDate
+                                   AND Sales.region = SalesDaily.region)'''
+    with closing(_connection().cursor()) as c:
+        c.execute(query, (tolerance,))
+        return [dict(row) for row in c.fetchall()]
+
+@instrumented
 def get_regions():
-    query = '''SELECT code, name
-               FROM Region'''
-    with closing(conn.cursor()) as c:
-        c.execute(query)
-        rows = c.fetchall()
+    """Return the shared Regions registry, loading it from the database the
+    first time and again only after invalidate_regions() or check_regions()
+    has dropped it."""
+    global _regions, _regions_version
+    if _regions is None:
+        # read before loading, so a commit made meanwhile is caught later
+        version = _data_version()
+        query = '''SELECT code, name
+                   FROM Region'''
+        with closing(_connection().cursor()) as c:
+            c.execute(query)
+            rows = c.fetchall()
 
         regions = Regions()
         for row in rows:
-            region = Region(row["code"], row["name"])
+            region = Region.intern(row["code"], row["name"])
             regions.add(region)
-        return regions
+        _regions = regions
+        _regions_version = version
+    return _regions
+
+def invalidate_regions():
+    """Drop the cached regions; call it after committing a write to Region."""
+    global _regions
+    _regions = None
+
+def check_regions():
+    """Drop the cached regions if another process has committed to the
+    database since they were loaded.
+
+    This costs a query, so call it at a coarse point such as Run Analysis
+    rather than on every get_regions().
+    """
+    if _regions is not None and _data_version() != _regions_version:
+        invalidate_regions()
+
+def _data_version():
+    # asked of the writer: data_version only moves for commits made by other
+    # connections, and in this process every write goes through the writer;
+    # the lock keeps it off the writer while another thread is writing
+    with _write_lock, closing(conn.cursor()) as c:
+        c.execute("PRAGMA data_version")
+        return c.fetchone()[0]
+
+def _measure_sales(sales):
+    """(rows, materialized) for a SalesList or ColumnarSalesList result;
+    the columnar list holds no per-sale objects."""
+    if sales is None:
+        return 0, 0
+    rows = sales.count
+    return rows, 0 if isinstance(sales, ColumnarSalesList) else rows
 
-def get_all_sales():
+@instrumented(measure=_measure_sales)
+def get_all_sales(columnar=False):
+    """Return every sale as a SalesList, or as a compact ColumnarSalesList
+    when columnar is True."""
     try:
         query = '''SELECT ID, amount, salesDate,
                        Region.code, Region.name
                    FROM Sales
                    JOIN Region ON Sales.region = Region.code
-                   ORDER BY date(salesDate), region'''
-        with closing(conn.cursor()) as c:
+                   ORDER BY salesDate, region'''
+        with closing(_connection().cursor()) as c:
+            if columnar:
+                c.row_factory = None
+                c.execute(query)
+                return _load_columnar(c)
+
             c.execute(query)
             rows = c.fetchall()
 
@@ -67,17 +591,27 @@ def get_all_sales():
     except sqlite3.OperationalError:
         return None
 
+def _load_columnar(rows):
+    """Build a ColumnarSalesList from (ID, amount, salesDate, code, name) tuples."""
+    sales = ColumnarSalesList()
+    add_row = sales.addRow
+    for row in rows:
+        add_row(*row)
+    return sales
+
 def _build_filters(start_date=None, end_date=None, region=None):
     """Return a WHERE clause and params for date/region filters."""
     clauses = []
     params = []
 
+    # plain comparisons on the stored YYYY-MM-DD text can use the indexes;
+    # wrapping the column in date() would force a full table scan
     if start_date:
-        clauses.append("date(salesDate) >= date(?)")
-        params.append(start_date)
+        clauses.append("salesDate >= ?")
+        params.append(_date_param(start_date))
     if end_date:
-        clauses.append("date(salesDate) <= date(?)")
-        params.append(end_date)
+        clauses.append("salesDate <= ?")
+        params.append(_date_param(end_date))
     if region:
         clauses.append("region = ?")
         params.append(region)
@@ -87,16 +621,25 @@ def _build_filters(start_date=None, end_date=None, region=None):
         where = " WHERE " + " AND ".join(clauses)
     return where, params
 
-def get_sales_filtered(start_date=None, end_date=None, region=None):
+def _filtered_sales_query(where):
+    return f'''SELECT ID, amount, salesDate,
+                   Region.code, Region.name
+            FROM Sales
+            JOIN Region ON Sales.region = Region.code
+            {where}
+            ORDER BY salesDate, region'''
+
+@instrumented(measure=_measure_sales)
+def get_sales_filtered(start_date=None, end_date=None, region=None, columnar=False):
     """Return sales data filtered by optional date range and region."""
     where, params = _build_filters(start_date, end_date, region)
-    query = f'''SELECT ID, amount, salesDate,
-                       Region.code, Region.name
-                FROM Sales
-                JOIN Region ON Sales.region = Region.code
-                {where}
-                ORDER BY date(salesDate), region'''
-    with closing(conn.cursor()) as c:
+    query = _filtered_sales_query(where)
+    with closing(_connection().cursor()) as c:
+        if columnar:
+            c.row_factory = None
+            c.execute(query, params)
+            return _load_columnar(c)
+
         c.execute(query, params)
         rows = c.fetchall()
 
@@ -107,113 +650,807 @@ def get_sales_filtered(start_date=None, end_date=None, region=None):
             sales.add(data)
         return sales
 
-def save_all_sales(sales_list):
-    sql = '''INSERT INTO Sales
-                (amount, salesDate, region)
-             VALUES
-                (?, ?, ?)'''
-    
-    for data in sales_list:
-        if data.id == 0:  # if id is zero, it's added sales data
-            with closing(conn.cursor()) as c:
-                c.execute(sql, (data.amount, data.salesDate, data.region.code))
-                conn.commit()
+@instrumented(measure=_measure_sales)
+def iter_sales_filtered(start_date=None, end_date=None, region=None,
+                        batch_size=PAGE_SIZE, columnar=False):
+    """Yield filtered sales in batches of up to batch_size, ordered by date,
+    region and ID.
+
+    Each batch is fetched with keyset pagination: the next query starts just
+    after the last (salesDate, region, ID) seen, so it can seek straight to
+    its place in the index and only one batch is in memory at a time.
+    """
+    last_key = None
+    while True:
+        query, params = _sales_page_query(start_date, end_date, region, last_key, batch_size)
+        with closing(_connection().cursor()) as c:
+            c.execute(query, params)
+            rows = c.fetchall()
+        if not rows:
+            return
+
+        if columnar:
+            sales = _load_columnar(rows)
+        else:
+            sales = SalesList()
+            for row in rows:
+                data = DailySales()
+                data.fromDb(row)
+                sales.add(data)
+        yield sales
+
+        if len(rows) < batch_size:
+            return
+        last = rows[-1]
+        last_key = (last["salesDate"], last["code"], last["ID"])
+
+def _sales_page_query(start_date, end_date, region, last_key, limit):
+    """Return (query, params) for up to limit filtered sales after the
+    (salesDate, region, ID) last_key, or from the start if it is None."""
+    where, params = _build_filters(start_date, end_date, region)
+    if last_key is not None:
+        where += " AND " if where else " WHERE "
+        where += "(salesDate, region, ID) > (?, ?, ?)"
+        params.extend(last_key)
+    params.append(limit)
+    return _filtered_sales_query(where) + ", ID LIMIT ?", params
+
+@instrumented
+def get_sales_page(start_date=None, end_date=None, region=None, after=None,
+                   limit=PAGE_SIZE):
+    """Return one page of filtered sales as (rows, next_key).
+
+    rows are plain (ID, amount, salesDate, region code) tuples in date,
+    region and ID order. Pass next_key back as after to get the following
+    page; it is None once the slice is exhausted.
+    """
+    query, params = _sales_page_query(start_date, end_date, region, after, limit)
+    with closing(_connection().cursor()) as c:
+        c.row_factory = None
+        c.execute(query, params)
+        rows = [row[:4] for row in c.fetchall()]
+    if len(rows) < limit:
+        return rows, None
+    last = rows[-1]
+    return rows, (last[2], last[3], last[0])
+
+def iter_all_sales(batch_size=PAGE_SIZE, columnar=False):
+    """Yield every sale in batches; see iter_sales_filtered."""
+    return iter_sales_filtered(batch_size=batch_size, columnar=columnar)
+
+@instrumented
+def export_sales_csv(path, start_date=None, end_date=None, region=None,
+                     compress=False, progress=None, cancel=None,
+                     chunk_size=EXPORT_CHUNK_SIZE, connection=None):
+    """Write the filtered sales to a CSV file and return the row count.
+
+    Rows go straight from the cursor to a buffered csv writer in chunks of
+    chunk_size, with the date, amount and quarter already formatted by
+    SQLite, so no DailySales objects are built. compress=True writes gzip.
+    progress(rows_written) is called after every chunk. If cancel (e.g. a
+    threading.Event) gets set, the partial file is removed and None is
+    returned; on an error it is removed before the error is raised. Pass
+    connection when calling from another thread.
+    """
+    where, params = _build_filters(start_date, end_date, region)
+    query = f'''SELECT ID, salesDate, Region.code, Region.name,
+                       printf('%.2f', amount),
+                       (CAST(substr(salesDate, 6, 2) AS INTEGER) + 2) / 3
+                FROM Sales
+                JOIN Region ON Sales.region = Region.code
+                {where}
+                ORDER BY salesDate, region, ID'''
+
+    if compress:
+        import gzip
+        file = gzip.open(path, "wt", newline="")
+    else:
+        file = open(path, "w", newline="", buffering=EXPORT_BUFFER_SIZE)
+
+    written = 0
+    cancelled = False
+    try:
+        with file, closing((connection or _connection()).cursor()) as c:
+            c.row_factory = None
+            writer = csv.writer(file)
+            writer.writerow(["ID", "Date", "Region Code", "Region Name", "Amount", "Quarter"])
+            c.execute(query, params)
+            while True:
+                if cancel is not None and cancel.is_set():
+                    cancelled = True
+                    break
+                rows = c.fetchmany(chunk_size)
+                if not rows:
+                    break
+                writer.writerows(rows)
+                written += len(rows)
+                if progress is not None:
+                    progress(written)
+    except BaseException:
+        # don't leave a partial file that looks like a finished export
+        with suppress(OSError):
+            os.remove(path)
+        raise
+
+    if cancelled:
+        os.remove(path)
+        return None
+    return written
+
+@instrumented
+def check_query_plans():
+    """Return the filter shapes whose queries would scan Sales without an index.
+
+    Every combination of start date, end date and region is run through
+    EXPLAIN QUERY PLAN; an empty list means every shape is index-backed.
+    """
+    problems = []
+    for start_date, end_date, region in itertools.product(
+            (None, "2000-01-01"), (None, "2000-12-31"), (None, "w")):
+        where, params = _build_filters(start_date, end_date, region)
+        shape = {"start_date": start_date is not None,
+                 "end_date": end_date is not None,
+                 "region": region is not None}
+        queries = [_filtered_sales_query(where)]
+        if where:
+            # an unfiltered aggregate reads every row by definition
+            queries.append(f"SELECT COUNT(*), SUM(amount) FROM Sales {where}")
+            queries.append(f"SELECT SUM(count), SUM(total) FROM SalesDaily {where}")
+        for query in queries:
+            with closing(_connection().cursor()) as c:
+                c.execute("EXPLAIN QUERY PLAN " + query, params)
+                details = [row["detail"] for row in c.fetchall()]
+            for detail in details:
+                if detail.startswith("SCAN ") and "INDEX" not in detail:
+                    problems.append((shape, detail))
+    return problems
 
+@instrumented
+def save_all_sales(sales_list, chunk_size=SAVE_CHUNK_SIZE, mode="replace"):
+    """Write every unsaved sale (id == 0) in one transaction and return write stats.
+
+    Rows are upserted with executemany in chunks of chunk_size so memory
+    stays bounded; a sale for a (salesDate, region) that is already stored
+    replaces or accumulates onto it, as mode says. Once the transaction
+    commits, the IDs are copied back onto the DailySales objects so the
+    same rows are never written twice; after a rollback every sale keeps
+    id 0 and can be saved again.
+    """
+    _check_mode(mode)
+    start = time.perf_counter()
+    inserted = updated = 0
+    chunk = []
+    deltas = {}
+    saved_ids = []   # (index, DailySales, ID) to apply after the commit
+    with writing() as writer:  # one transaction: commit on success, roll back on error
+        with closing(writer.cursor()) as c:
+            for index, data in enumerate(sales_list):
+                if data.id == 0:  # if id is zero, it's added sales data
+                    chunk.append((index, data))
+                    if len(chunk) >= chunk_size:
+                        counts = _save_chunk(c, chunk, mode, deltas, saved_ids)
+                        inserted += counts[0]
+                        updated += counts[1]
+                        chunk = []
+            if chunk:
+                counts = _save_chunk(c, chunk, mode, deltas, saved_ids)
+                inserted += counts[0]
+                updated += counts[1]
+            _update_rollup(c, deltas)
+
+    for index, data, sales_id in saved_ids:
+        data.id = sales_id
+        # a columnar list hands out copies, so store the ID back
+        sales_list.set(index, data)
+
+    seconds = time.perf_counter() - start
+    saved = inserted + updated
+    return {
+        "rows": saved,
+        "inserted": inserted,
+        "updated": updated,
+        "seconds": seconds,
+        "rows_per_sec": saved / seconds if seconds > 0 else 0.0
+    }
+
+def _save_chunk(c, chunk, mode, deltas, saved_ids):
+    """Upsert one chunk of (index, DailySales) and add (index, DailySales,
+    ID) for each to saved_ids. Returns (inserted, updated)."""
+    rows = [(data.amount, _date_text(data.salesDate), data.region.code)
+            for index, data in chunk]
+    inserted, updated = _upsert_rows(c, rows, mode, deltas)
+    if updated == 0:
+        # inside one write transaction AUTOINCREMENT hands out consecutive
+        # IDs, so the chunk's IDs end at the last inserted rowid
+        c.execute("SELECT last_insert_rowid()")
+        last_id = c.fetchone()[0]
+        ids = range(last_id - len(chunk) + 1, last_id + 1)
+    else:
+        # an update uses up an ID without storing it; look the IDs up
+        stored = _stored_values(c, rows, "ID")
+        ids = [stored[(sales_date, region)] for amount, sales_date, region in rows]
+    saved_ids.extend((index, data, sales_id) for (index, data), sales_id in zip(chunk, ids))
+    return inserted, updated
+
+def _check_mode(mode):
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"mode must be one of {IMPORT_MODES}, not {mode!r}")
+
+def _upsert_rows(c, rows, mode, deltas):
+    """Upsert a list of (amount, salesDate, region) rows and add their
+    effect on each day's total and count to the rollup deltas.
+
+    The stored amounts for the rows' (salesDate, region) pairs are read
+    first, so the deltas and the inserted/updated counts are exact, even when a pair
+    repeats within rows. Returns (inserted, updated).
+    """
+    if mode == "replace":
+        set_amount = "excluded.amount"
+    else:
+        set_amount = "amount + excluded.amount"
+    sql = f'''INSERT INTO Sales
+                 (amount, salesDate, region)
+              VALUES
+                 (?, ?, ?)
+              ON CONFLICT (salesDate, region) DO UPDATE
+              SET amount = {set_amount}'''
+
+    stored = _stored_values(c, rows, "amount")
+    c.executemany(sql, rows)
+    inserted = 0
+    replace = mode == "replace"
+    for amount, sales_date, region in rows:
+        key = (sales_date, region)
+        delta = deltas.setdefault(key, [0.0, 0])
+        old = stored.get(key)
+        if old is None:
+            inserted += 1
+            delta[0] += amount
+            delta[1] += 1
+            stored[key] = amount
+        else:
+            new = amount if replace else old + amount
+            delta[0] += new - old
+            stored[key] = new
+    return inserted, len(rows) - inserted
+
+def _stored_values(c, rows, column):
+    """Return {(salesDate, region): column} for the stored sales with the
+    (salesDate, region) of a row in rows of (amount, salesDate, region)."""
+    keys = list({(sales_date, region) for amount, sales_date, region in rows})
+    stored = {}
+    # look up exactly these pairs on the unique (salesDate, region) index,
+    # however sparse they are
+    for first in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        chunk = keys[first:first + LOOKUP_CHUNK_SIZE]
+        wanted = ", ".join(["(?, ?)"] * len(chunk))
+        c.execute(f'''WITH wanted (salesDate, region) AS (VALUES {wanted})
+                      SELECT Sales.salesDate, Sales.region, Sales.{column}
+                      FROM wanted
+                      JOIN Sales ON Sales.salesDate = wanted.salesDate
+                                AND Sales.region = wanted.region''',
+                  list(itertools.chain.from_iterable(chunk)))
+        stored.update(((sales_date, region), value) for sales_date, region, value in c)
+    return stored
+
+def _date_text(value):
+    """Return a date/datetime as YYYY-MM-DD text for storage."""
+    if hasattr(value, "strftime"):
+        return value.strftime(DATE_FORMAT)
+    return value
+
+def _date_param(value):
+    """Normalize a date filter value to the stored YYYY-MM-DD text."""
+    if hasattr(value, "strftime"):
+        return value.strftime(DATE_FORMAT)
+    # accept 'YYYY-MM-DD HH:MM:SS' and similar, as date(?) used to
+    return datetime.strptime(value.strip()[:10], DATE_FORMAT).strftime(DATE_FORMAT)
+
+def cache_stats():
+    """Return hit/miss statistics for the get_sales/get_sales_summary cache."""
+    return _results.stats()
+
+def clear_cache():
+    _results.clear()
+
+def _cached(key):
+    # inside writing() a read can see uncommitted rows, so skip the cache
+    if getattr(_thread, "writing", False):
+        return False, None
+    return _results.get(key)
+
+def _cache(key, value, scope, generation):
+    if not getattr(_thread, "writing", False):
+        _results.put(key, value, scope, generation)
+
+@instrumented
 def get_sales(dt, region):
+    sales_date = _date_param(dt)
+    key = ("sales", sales_date, region)
+    hit, data = _cached(key)
+    if hit:
+        # callers edit the amount on what they get back
+        return copy.copy(data)
+    generation = _results.generation
+
     query = '''SELECT ID, amount, salesDate,
                    Region.code, Region.name
                FROM Sales
                JOIN Region ON Sales.region = Region.code
                WHERE salesDate = ? AND region = ?'''
-    with closing(conn.cursor()) as c:
-        c.execute(query, (dt, region))
+    with closing(_connection().cursor()) as c:
+        c.execute(query, (sales_date, region))
         row = c.fetchone()
 
-        if row:
-            data = DailySales()
-            data.fromDb(row)
-            return data
-        else:
-            return None
+    data = None
+    if row:
+        data = DailySales()
+        data.fromDb(row)
+    _cache(key, data, (sales_date, sales_date, region), generation)
+    return copy.copy(data)
 
+@instrumented
 def update_sales_amount(data):
+    query = '''SELECT amount, salesDate, region
+               FROM Sales
+               WHERE ID = ?'''
     sql = '''UPDATE Sales
              SET amount = ?
              WHERE ID = ?'''
-    
-    with closing(conn.cursor()) as c:
-        c.execute(sql, (data.amount, data.id))
-        conn.commit()
 
-def get_sales_summary(start_date=None, end_date=None, region=None):
-    """Return aggregate metrics for a date/region slice."""
+    with writing() as writer:
+        with closing(writer.cursor()) as c:
+            c.execute(query, (data.id,))
+            old = c.fetchone()
+            if old is None:
+                return
+            c.execute(sql, (data.amount, data.id))
+            # adjust the day's rollup by the change in amount
+            delta = data.amount - old["amount"]
+            _update_rollup(c, {(old["salesDate"], old["region"]): [delta, 0]})
+
+@instrumented
+def update_sales_amounts(batch, chunk_size=SAVE_CHUNK_SIZE):
+    """Set the amounts of many sales in one transaction and return write stats.
+
+    batch is an iterable of (id, amount) pairs; when an ID repeats, its last
+    amount wins. The stored rows are read and updated chunk_size IDs at a
+    time with executemany, and the rollup is adjusted by the change in each
+    day's total. IDs that aren't stored are skipped and returned as
+    "missing".
+    """
+    amounts = {int(sales_id): float(amount) for sales_id, amount in batch}
+    ids = list(amounts)
+    sql = '''UPDATE Sales
+             SET amount = ?
+             WHERE ID = ?'''
+
+    start = time.perf_counter()
+    updated = 0
+    missing = []
+    deltas = {}
+    with writing() as writer:
+        with closing(writer.cursor()) as c:
+            for first in range(0, len(ids), chunk_size):
+                chunk = ids[first:first + chunk_size]
+                placeholders = ", ".join("?" * len(chunk))
+                c.execute(f'''SELECT ID, amount, salesDate, region
+                              FROM Sales
+                              WHERE ID IN ({placeholders})''', chunk)
+                stored = {row["ID"]: row for row in c.fetchall()}
+                changes = []
+                for sales_id in chunk:
+                    old = stored.get(sales_id)
+                    if old is None:
+                        missing.append(sales_id)
+                        continue
+                    amount = amounts[sales_id]
+                    changes.append((amount, sales_id))
+                    delta = deltas.setdefault((old["salesDate"], old["region"]), [0.0, 0])
+                    delta[0] += amount - old["amount"]
+                c.executemany(sql, changes)
+                updated += len(changes)
+            _update_rollup(c, deltas)
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": updated,
+        "missing": missing,
+        "seconds": seconds,
+        "rows_per_sec": updated / seconds if seconds > 0 else 0.0
+    }
+
+@instrumented
+def get_sales_summary(start_date=None, end_date=None, region=None, use_rollup=True):
+    """Return aggregate metrics for a date/region slice.
+
+    Everything comes from one statement in a single pass over the slice:
+    the inner query groups by day (in index order, so without a sort) and
+    splits each day by region with conditional sums; the outer query folds
+    the days into quarters, keyed by year and quarter, each with its best
+    day, and the quarters are added up for the totals. Every filter is on
+    date and region, so the pass reads the SalesDaily rollup unless
+    use_rollup is False. Results are cached until a write touches the
+    slice.
+
+    The partial sums behind the last summary for each region filter (and
+    choice of open-ended dates) are kept as well. When the next date range
+    overlaps that one, as when Run Analysis is repeated with the dates
+    nudged, only the days added or dropped are read and combined with them.
+    A write to the last range drops its partial sums, so the next summary
+    is computed in full, as it is when the change would read more days than
+    the new range holds or drops the last range's best day.
+    """
+    scope = (_date_param(start_date) if start_date else None,
+             _date_param(end_date) if end_date else None,
+             region or None)
+    key = ("summary",) + scope + (use_rollup,)
+    hit, summary = _cached(key)
+    if hit:
+        return copy.deepcopy(summary)
+    generation = _results.generation
+
+    start, end, region = scope
+    partial_key = ("summary partial", region, use_rollup, start is None, end is None)
+    partial = _moved_partial(partial_key, start, end, region, use_rollup)
+    if partial is None:
+        partial = _summary_partial(start, end, region, use_rollup)
+    _cache(partial_key, (start, end, partial), scope, generation)
+
+    summary = _summary_from_partial(partial)
+    _cache(key, summary, scope, generation)
+    return copy.deepcopy(summary)
+
+def _summary_partial(start_date, end_date, region, use_rollup):
+    """Return the partial sums a summary is built from for one slice:
+    count, total, {code: [total, count]} per region, {(year, quarter):
+    [total, count]} and the best day as (salesDate, total) or None."""
     where, params = _build_filters(start_date, end_date, region)
+    regions = get_regions()
+    region_list = [regions.get(code) for code in regions.codes]
 
-    base = f"FROM Sales {where}"
-    totals_sql = f'''SELECT COUNT(*) AS count,
-                            COALESCE(SUM(amount), 0) AS total,
-                            AVG(amount) AS average
-                     {base}'''
+    if use_rollup:
+        table, amount, count = "SalesDaily", "total", "count"
+    else:
+        table, amount, count = "Sales", "amount", "1"
 
-    region_sql = f'''SELECT Region.code, Region.name,
-                            SUM(amount) AS total,
-                            COUNT(*) AS count
-                     FROM Sales
-                     JOIN Region ON Sales.region = Region.code
-                     {where}
-                     GROUP BY Region.code, Region.name
-                     ORDER BY Region.code'''
-
-    quarter_sql = f'''SELECT CASE
-                            WHEN CAST(strftime('%m', salesDate) AS INTEGER) BETWEEN 1 AND 3 THEN 1
-                            WHEN CAST(strftime('%m', salesDate) AS INTEGER) BETWEEN 4 AND 6 THEN 2
-                            WHEN CAST(strftime('%m', salesDate) AS INTEGER) BETWEEN 7 AND 9 THEN 3
-                            ELSE 4 END AS quarter,
-                            SUM(amount) AS total
-                     {base}
-                     GROUP BY quarter
-                     ORDER BY quarter'''
-
-    top_day_sql = f'''SELECT salesDate, SUM(amount) AS total
-                      {base}
-                      GROUP BY salesDate
-                      ORDER BY total DESC
-                      LIMIT 1'''
-
-    with closing(conn.cursor()) as c:
-        # totals
-        c.execute(totals_sql, params)
-        totals = c.fetchone()
-
-        # by region
-        c.execute(region_sql, params)
-        regions = c.fetchall()
-
-        # by quarter
-        c.execute(quarter_sql, params)
-        quarters = c.fetchall()
-
-        # top day
-        c.execute(top_day_sql, params)
-        top_day = c.fetchone()
-
-        return {
-            "count": totals["count"] if totals else 0,
-            "total": totals["total"] if totals else 0,
-            "average": totals["average"] if totals else 0,
-            "regions": regions,
-            "quarters": quarters,
-            "top_day": top_day
-        }
-    
+    region_columns = "".join(
+        f""",
+                       SUM(CASE WHEN region = ? THEN {amount} END) AS total_{i},
+                       SUM(CASE WHEN region = ? THEN {count} END) AS count_{i}"""
+        for i in range(len(region_list)))
+    region_sums = "".join(
+        f", SUM(total_{i}), SUM(count_{i})" for i in range(len(region_list)))
+
+    # a bare column next to MAX() takes its value from the row holding
+    # the maximum, so salesDate is each quarter's best day
+    query = f'''SELECT CAST(substr(salesDate, 1, 4) AS INTEGER) AS year,
+                       (CAST(substr(salesDate, 6, 2) AS INTEGER) + 2) / 3 AS quarter,
+                       SUM(count) AS count,
+                       SUM(total) AS total,
+                       salesDate, MAX(total) AS top_total
+                       {region_sums}
+                FROM (SELECT salesDate,
+                             SUM({count}) AS count,
+                             SUM({amount}) AS total{region_columns}
+                      FROM {table}
+                      {where}
+                      GROUP BY salesDate)
+                GROUP BY 1, 2
+                ORDER BY 1, 2'''
+    region_params = []
+    for sales_region in region_list:
+        region_params.extend((sales_region.code, sales_region.code))
 
+    with closing(_connection().cursor()) as c:
+        c.row_factory = None
+        c.execute(query, region_params + params)
+        rows = c.fetchall()
+
+    partial = {"count": 0, "total": 0, "regions": {}, "quarters": {}, "top_day": None}
+    for row in rows:
+        year, quarter, count, total, top_date, top_total = row[:6]
+        partial["count"] += count
+        partial["total"] += total
+        partial["quarters"][year, quarter] = [total, count]
+        # quarters come in date order, so a tie keeps the earlier day
+        if partial["top_day"] is None or top_total > partial["top_day"][1]:
+            partial["top_day"] = (top_date, top_total)
+        for i, sales_region in enumerate(region_list):
+            region_total, region_count = row[6 + 2 * i], row[7 + 2 * i]
+            if region_count:
+                entry = partial["regions"].setdefault(sales_region.code, [0, 0])
+                entry[0] += region_total
+                entry[1] += region_count
+    return partial
+
+def _moved_partial(partial_key, start_date, end_date, region, use_rollup):
+    """Return the partial sums for a slice built from the last ones kept
+    under partial_key, or None when it has to be computed in full."""
+    hit, last = _cached(partial_key)
+    if not hit:
+        return None
+    last_start, last_end, last_partial = last
+    changes = _range_changes(last_start, last_end, start_date, end_date)
+    if changes is None:
+        return None
+    top_day = last_partial["top_day"]
+    if top_day and ((start_date and top_day[0] < start_date) or
+                    (end_date and top_day[0] > end_date)):
+        return None   # the best of the days kept is unknown
+
+    partial = copy.deepcopy(last_partial)
+    for sign, first, last in changes:
+        _add_partial(partial, _summary_partial(first, last, region, use_rollup), sign)
+    return partial
+
+def _range_changes(last_start, last_end, start_date, end_date):
+    """Return the (sign, first, last) day ranges that turn the last date
+    range into the new one, with sign 1 to add the days and -1 to drop
+    them; None when the ranges don't overlap, a bound changes between set
+    and unbounded, or the changes cover as many days as the new range."""
+    if (start_date is None) != (last_start is None) or (end_date is None) != (last_end is None):
+        return None
+    if (start_date and last_end and start_date > last_end) or \
+            (end_date and last_start and end_date < last_start):
+        return None
+
+    one_day = timedelta(days=1)
+    changes = []
+    if start_date != last_start:
+        new, old = date.fromisoformat(start_date), date.fromisoformat(last_start)
+        if new < old:
+            changes.append((1, start_date, (old - one_day).isoformat()))
+        else:
+            changes.append((-1, last_start, (new - one_day).isoformat()))
+    if end_date != last_end:
+        new, old = date.fromisoformat(end_date), date.fromisoformat(last_end)
+        if new > old:
+            changes.append((1, (old + one_day).isoformat(), end_date))
+        else:
+            changes.append((-1, (new + one_day).isoformat(), last_end))
+
+    if start_date and end_date:
+        changed_days = sum((date.fromisoformat(last) - date.fromisoformat(first)).days + 1
+                           for sign, first, last in changes)
+        if changed_days >= (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days + 1:
+            return None
+    return changes
+
+def _add_partial(partial, other, sign):
+    """Add (sign 1) or take away (sign -1) other's sums from partial."""
+    partial["count"] += sign * other["count"]
+    partial["total"] += sign * other["total"]
+    if not partial["count"]:
+        partial["total"] = 0   # no rounding left over from the subtraction
+    for name in ("regions", "quarters"):
+        sums = partial[name]
+        for group, (total, count) in other[name].items():
+            entry = sums.setdefault(group, [0, 0])
+            entry[0] += sign * total
+            entry[1] += sign * count
+            if not entry[1]:
+                del sums[group]
+
+    # only added days can change the best day; _moved_partial recomputes
+    # when the best day is dropped
+    top_day, other_top = partial["top_day"], other["top_day"]
+    if sign > 0 and other_top and (
+            top_day is None or other_top[1] > top_day[1] or
+            (other_top[1] == top_day[1] and other_top[0] < top_day[0])):
+        partial["top_day"] = other_top
+
+def _summary_from_partial(partial):
+    regions = get_regions()
+    region_totals = []
+    for code in regions.codes:
+        if code in partial["regions"]:
+            region_total, region_count = partial["regions"][code]
+            region_totals.append({"code": code, "name": regions.get(code).name,
+                                  "total": region_total, "count": region_count})
+
+    quarters = [{"year": year, "quarter": quarter, "total": total}
+                for (year, quarter), (total, count) in sorted(partial["quarters"].items())]
+
+    count, total = partial["count"], partial["total"]
+    top_day = None
+    if partial["top_day"]:
+        top_day = {"salesDate": partial["top_day"][0], "total": partial["top_day"][1]}
+    return {
+        "count": count,
+        "total": total,
+        "average": total / count if count else None,
+        "regions": region_totals,
+        "quarters": quarters,
+        "top_day": top_day
+    }
+
+# the time buckets get_sales_series can group by
+SERIES_GRANULARITIES = ("day", "week", "month", "quarter", "year")
+
+# per granularity, SQL for the first day of the bucket holding salesDate;
+# weeks are ISO weeks, which start on a Monday
+_SERIES_STARTS = {
+    "day": "salesDate",
+    "week": "date(salesDate, '-6 days', 'weekday 1')",
+    "month": "substr(salesDate, 1, 8) || '01'",
+    "quarter": "substr(salesDate, 1, 5) || "
+               "printf('%02d-01', (CAST(substr(salesDate, 6, 2) AS INTEGER) - 1) / 3 * 3 + 1)",
+    "year": "substr(salesDate, 1, 5) || '01-01'",
+}
+
+def _series_bucket(granularity, start):
+    """Return (year, bucket, label) for the bucket beginning on start."""
+    first_day = date.fromisoformat(start)
+    if granularity == "day":
+        return first_day.year, first_day.timetuple().tm_yday, start
+    if granularity == "week":
+        # a Monday's ISO year and week are its week's, even at New Year
+        year, week, weekday = first_day.isocalendar()
+        return year, week, f"{year}-W{week:02d}"
+    if granularity == "month":
+        return first_day.year, first_day.month, start[:7]
+    if granularity == "quarter":
+        quarter = (first_day.month + 2) // 3
+        return first_day.year, quarter, f"{first_day.year} Q{quarter}"
+    return first_day.year, 1, str(first_day.year)
+
+@instrumented
+def get_sales_series(granularity="month", start_date=None, end_date=None, region=None,
+                     by_region=False, use_rollup=True):
+    """Return sales totals per time bucket for a date/region slice.
+
+    granularity is one of SERIES_GRANULARITIES; weeks are ISO weeks, so a
+    week's year can differ from its days' at New Year. Each bucket is a dict
+    with its year, bucket number within the year (day of year, week, month,
+    quarter, or 1 for a year), first day ("start"), a label such as
+    "2021-W05" or "2021 Q1", and the total and count, in time order. With
+    by_region each bucket is split into one dict per region, which also
+    holds the region code.
+
+    One grouped pass totals the slice per day, in index order and read from
+    the SalesDaily rollup unless use_rollup is False; the days are then
+    folded into buckets. The rows are cached like get_sales_summary results.
+    """
+    if granularity not in _SERIES_STARTS:
+        raise ValueError(f"granularity must be one of {SERIES_GRANULARITIES}, "
+                         f"not {granularity!r}")
+    where, params = _build_filters(start_date, end_date, region)
+    scope = (_date_param(start_date) if start_date else None,
+             _date_param(end_date) if end_date else None,
+             region or None)
+    key = ("series", granularity, by_region, use_rollup) + scope
+    hit, rows = _cached(key)
+    if not hit:
+        generation = _results.generation
+        if use_rollup:
+            table, amount, count = "SalesDaily", "total", "count"
+        else:
+            table, amount, count = "Sales", "amount", "1"
+        region_column = ", region" if by_region else ""
+        query = f'''SELECT {_SERIES_STARTS[granularity]} AS start{region_column},
+                           SUM(total), SUM(count)
+                    FROM (SELECT salesDate{region_column},
+                                 SUM({amount}) AS total, SUM({count}) AS count
+                          FROM {table}
+                          {where}
+                          GROUP BY salesDate{region_column})
+                    GROUP BY 1{region_column}
+                    ORDER BY 1{region_column}'''
+        with closing(_connection().cursor()) as c:
+            c.row_factory = None
+            c.execute(query, params)
+            rows = c.fetchall()
+        _cache(key, rows, scope, generation)
+
+    # the cached rows are tuples, so each call builds its own dicts
+    series = []
+    for row in rows:
+        year, bucket, label = _series_bucket(granularity, row[0])
+        point = {"year": year, "bucket": bucket, "start": row[0], "label": label,
+                 "total": row[-2], "count": row[-1]}
+        if by_region:
+            point["region"] = row[1]
+        series.append(point)
+    return series
+
+# days listed by get_sales_rankings, overall and per region, and the
+# percentiles of the daily totals it reports
+RANKING_TOP_DAYS = 10
+RANKING_TOP_REGION_DAYS = 3
+RANKING_PERCENTILES = (50, 90)
+
+# values the quantile sketch keeps per level; bigger is more accurate
+QUANTILE_SKETCH_SIZE = 200
+
+@instrumented
+def get_sales_rankings(start_date=None, end_date=None, region=None,
+                       top=RANKING_TOP_DAYS, top_per_region=RANKING_TOP_REGION_DAYS,
+                       percentiles=RANKING_PERCENTILES, exact=False, use_rollup=True):
+    """Return the best days and the spread of daily totals for a slice.
+
+    The result holds "days", the number of days with sales; "top_days", the
+    `top` days with the highest totals, best first, as {salesDate, total};
+    "top_by_region", each region's `top_per_region` best days the same way;
+    "percentiles", {percentile: daily total} for each of `percentiles`
+    (nearest rank); and "exact", whether those are exact.
+
+    Everything comes from one pass over the slice's (day, region) totals in
+    index order, read from the SalesDaily rollup unless use_rollup is False.
+    The best days are kept in bounded heaps and the daily totals go into a
+    QuantileSketch, so nothing is sorted and memory does not grow with the
+    slice. The percentiles are approximate once a slice has more than
+    QUANTILE_SKETCH_SIZE days, unless exact is True, which keeps every
+    daily total. Days with equal totals rank earlier day first, as the
+    summary's top_day does. Results are cached like get_sales_summary
+    results.
+    """
+    if top < 0 or top_per_region < 0:
+        raise ValueError(f"top and top_per_region must be 0 or more, not {top} and {top_per_region}")
+    where, params = _build_filters(start_date, end_date, region)
+    scope = (_date_param(start_date) if start_date else None,
+             _date_param(end_date) if end_date else None,
+             region or None)
+    key = ("rankings", top, top_per_region, tuple(percentiles), exact, use_rollup) + scope
+    hit, rankings = _cached(key)
+    if hit:
+        return copy.deepcopy(rankings)
+    generation = _results.generation
+
+    if use_rollup:
+        table, amount = "SalesDaily", "total"
+    else:
+        table, amount = "Sales", "amount"
+    query = f'''SELECT salesDate, region, SUM({amount})
+                FROM {table}
+                {where}
+                GROUP BY salesDate, region'''
+
+    top_days = TopN(top)
+    region_days = {}
+    sketch = QuantileSketch(None if exact else QUANTILE_SKETCH_SIZE)
+    day, day_total = None, 0.0
+    with closing(_connection().cursor()) as c:
+        c.row_factory = None
+        c.execute(query, params)
+        # rows come grouped by day, so a day is complete when the next starts
+        for sales_date, code, total in c:
+            if sales_date != day:
+                if day is not None:
+                    top_days.add(day_total, day)
+                    sketch.add(day_total)
+                day, day_total = sales_date, 0.0
+            day_total += total
+            best = region_days.get(code)
+            if best is None:
+                best = region_days[code] = TopN(top_per_region)
+            best.add(total, sales_date)
+    if day is not None:
+        top_days.add(day_total, day)
+        sketch.add(day_total)
+
+    rankings = {
+        "days": sketch.count,
+        "top_days": [{"salesDate": sales_date, "total": total}
+                     for total, sales_date in top_days.items()],
+        "top_by_region": {code: [{"salesDate": sales_date, "total": total}
+                                 for total, sales_date in region_days[code].items()]
+                          for code in sorted(region_days)},
+        "percentiles": dict(zip(percentiles,
+                                sketch.quantiles([p / 100 for p in percentiles]))),
+        "exact": sketch.exact,
+    }
+    _cache(key, rankings, scope, generation)
+    return copy.deepcopy(rankings)
+
+@instrumented
 def already_imported(filename):
     try:
         query = '''SELECT fileName
                    FROM ImportedFiles
                    WHERE fileName = ?
                    '''
-        with closing(conn.cursor()) as c:
+        with closing(_connection().cursor()) as c:
             c.execute(query, (filename.name,))
             row = c.fetchone()
             
@@ -224,7 +1461,7 @@ def already_imported(filename):
     except sqlite3.OperationalError:
         return False
 
-def import_sales(filename, regions):
+def _check_import_file(filename, regions):
     if not filename.isValidName:
         msg = f"File name '{filename.name}' doesn't follow the expected " + \
               f"format of '{filename.validFormat}'.\n"
@@ -236,30 +1473,294 @@ def import_sales(filename, regions):
     elif already_imported(filename):
         msg = f"File '{filename.name}' has already been imported.\n"
         raise FileImportError(msg)
+
+@instrumented
+def import_sales(filename, regions):
+    """Read a sales file into a SalesList of its good rows. Bad rows are
+    left out and described in the list's errors as (row, column, reason)."""
+    _check_import_file(filename, regions)
     try:
         sales_list = SalesList()
         with open(filename.name, newline="") as file:
-            reader = csv.reader(file)
-            for row in reader:
-                daily_sales = DailySales()
-                daily_sales.fromFile(row, filename.region)
-                sales_list.add(daily_sales)
+            for chunk in read_sales_chunks(csv.reader(file)):
+                for amount, sales_date, region in chunk.goodRows(filename.region.code):
+                    sales_date = date.fromisoformat(sales_date)
+                    sales_list.add(DailySales(amount, sales_date, filename.region,
+                                              (sales_date.month + 2) // 3))
+                sales_list.errors.extend(chunk.errors)
+        sales_list.hasBadData = bool(sales_list.errors)
         return sales_list
     except FileNotFoundError:
         msg = f"File '{filename.name}' not found.\n"
         raise FileImportError(msg)
     
+class _BadImport(Exception):
+    """Raised inside the import transaction to roll it back."""
+
+@instrumented
+def import_sales_streaming(filename, regions, chunk_size=SAVE_CHUNK_SIZE, mode="replace"):
+    """Import a sales file straight into the database in one transaction.
+
+    Rows flow through a generator pipeline (read, validate, chunk) and are
+    upserted with executemany as they arrive, so memory use doesn't grow
+    with the file. A row for a (salesDate, region) that is already stored
+    replaces its amount or accumulates onto it, as mode says. If any row is
+    bad the whole import is rolled back. Returns a dict with the row count,
+    how many rows were inserted and how many updated, the amount total, the
+    number of bad rows and up to MAX_REPORTED_ERRORS (row, column, reason)
+    errors.
+    """
+    _check_mode(mode)
+    _check_import_file(filename, regions)
+    try:
+        file = open(filename.name, newline="")
+    except FileNotFoundError:
+        msg = f"File '{filename.name}' not found.\n"
+        raise FileImportError(msg)
+
+    report = _new_import_report()
+    start = time.perf_counter()
+    with file:
+        chunks = _parse_chunks(csv.reader(file), filename.region.code, report, chunk_size)
+        try:
+            _write_import(chunks, filename.name, report, mode)
+        except ValueError as e:
+            # e.g. a UnicodeDecodeError; the write has been rolled back
+            raise FileImportError(f"File '{filename.name}' could not be read: {e}.\n")
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+def _new_import_report():
+    return {"rows": 0, "inserted": 0, "updated": 0, "total": 0.0,
+            "bad_rows": 0, "errors": []}
+
+def _write_import(chunks, file_name, report, mode="replace"):
+    """Upsert lists of validated rows and write the ImportedFiles entry in
+    one transaction.
+
+    chunks may be a generator that fills in report["bad_rows"] as it goes;
+    once a bad row is seen nothing more is written, and when the generator
+    is exhausted everything is rolled back. Raises FileImportError, after
+    rolling back, when a row or the ImportedFiles entry breaks a constraint,
+    e.g. because another process imported the file in the meantime.
+    """
+    try:
+        with writing() as writer:
+            with closing(writer.cursor()) as c:
+                deltas = {}
+                for chunk in chunks:
+                    if report["bad_rows"]:
+                        continue   # keep reading only to report every bad row
+                    inserted, updated = _upsert_rows(c, chunk, mode, deltas)
+                    report["inserted"] += inserted
+                    report["updated"] += updated
+                    report["rows"] += len(chunk)
+                if report["bad_rows"]:
+                    raise _BadImport()
+                _update_rollup(c, deltas)
+                if report["rows"] > 0:
+                    c.execute('''INSERT INTO ImportedFiles (fileName)
+                                 VALUES (?)''', (file_name,))
+    except _BadImport:
+        # the with block has rolled back; nothing from the file was kept
+        report["rows"] = report["inserted"] = report["updated"] = 0
+        report["total"] = 0.0
+    except sqlite3.IntegrityError as e:
+        report["rows"] = report["inserted"] = report["updated"] = 0
+        report["total"] = 0.0
+        raise FileImportError(f"File '{file_name}' could not be saved: {e}.\n")
+
+@instrumented
+def import_sales_batch(paths, regions, workers=None, chunk_size=SAVE_CHUNK_SIZE,
+                       mode="replace"):
+    """Import many sales files, parsing them in parallel worker processes.
+
+    Each path must have a sales_qn_yyyy_r.csv file name. Workers read and
+    validate whole files; this process is the single writer and commits each
+    valid file's rows with its ImportedFiles entry as one transaction, in
+    the given mode (see import_sales_streaming). Returns a list with one
+    report per file (as import_sales_streaming, plus "file" and "error" for
+    files that were skipped) and a totals dict.
+    """
+    _check_mode(mode)
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    start = time.perf_counter()
+    reports = []
+    jobs = {}
+    names = set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path in paths:
+            filename = File(os.path.basename(path))
+            filename.region = regions.get(filename.getRegionCode())
+            try:
+                _check_import_file(filename, regions)
+                if filename.name in names:
+                    msg = f"File '{filename.name}' appears more than once in this batch."
+                    raise FileImportError(msg)
+                names.add(filename.name)
+            except FileImportError as e:
+                report = _new_import_report()
+                report.update(file=filename.name, error=str(e).strip(), seconds=0.0)
+                reports.append(report)
+                continue
+            future = pool.submit(_parse_sales_file, path, filename.region.code, chunk_size)
+            jobs[future] = filename
+
+        for future in as_completed(jobs):
+            filename = jobs[future]
+            parsed = future.result()
+            report = parsed["report"]
+            report["file"] = filename.name
+            if parsed["error"]:
+                report["error"] = parsed["error"]
+            elif report["bad_rows"] == 0:
+                write_start = time.perf_counter()
+                try:
+                    _write_import(parsed["chunks"], filename.name, report, mode)
+                except FileImportError as e:
+                    report["error"] = str(e).strip()
+                report["seconds"] += time.perf_counter() - write_start
+            reports.append(report)
+
+    seconds = time.perf_counter() - start
+    rows = sum(report["rows"] for report in reports)
+    totals = {
+        "files": len(reports),
+        "rows": rows,
+        "inserted": sum(report["inserted"] for report in reports),
+        "updated": sum(report["updated"] for report in reports),
+        "bad_rows": sum(report["bad_rows"] for report in reports),
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds if seconds > 0 else 0.0
+    }
+    return reports, totals
+
+def _parse_sales_file(path, region_code, chunk_size=SAVE_CHUNK_SIZE):
+    """Worker process: read and validate one sales file."""
+    start = time.perf_counter()
+    report = _new_import_report()
+    try:
+        with open(path, newline="") as file:
+            chunks = list(_parse_chunks(csv.reader(file), region_code, report, chunk_size))
+        error = None
+        if report["bad_rows"]:
+            # the file won't be written, so don't ship its rows back
+            chunks = []
+            report["total"] = 0.0
+    except OSError as e:
+        chunks = []
+        error = f"File '{os.path.basename(path)}' could not be read: {e.strerror}."
+    except ValueError as e:
+        # e.g. a UnicodeDecodeError from a file that isn't UTF-8 text
+        chunks = []
+        error = f"File '{os.path.basename(path)}' could not be read: {e}."
+    report["seconds"] = time.perf_counter() - start
+    return {"chunks": chunks, "report": report, "error": error}
+
+def _parse_chunks(rows, region_code, report, chunk_size=SAVE_CHUNK_SIZE):
+    """Parse CSV rows a chunk at a time and yield a list of (amount,
+    salesDate, region) for each chunk's good rows; bad rows are counted in
+    report along with their (row, column, reason) errors."""
+    for chunk in read_sales_chunks(rows, chunk_size):
+        if chunk.errors:
+            report["bad_rows"] += chunk.badCount
+            room = MAX_REPORTED_ERRORS - len(report["errors"])
+            report["errors"].extend(chunk.errors[:max(room, 0)])
+        report["total"] += chunk.goodTotal()
+        good_rows = chunk.goodRows(region_code)
+        if good_rows:
+            yield good_rows
+
+@instrumented
 def add_imported_file(filename):
     sql = '''INSERT INTO ImportedFiles (fileName)
              VALUES (?)'''
     
-    with closing(conn.cursor()) as c:
-        c.execute(sql, (filename.name,))
-        conn.commit()
+    with writing() as writer:
+        with closing(writer.cursor()) as c:
+            c.execute(sql, (filename.name,))
 
 def close():
+    """Close the writer and every thread's read connection."""
+    global conn, _generation
+    with _readers_lock:
+        for reader in _readers:
+            reader.close()
+        _readers.clear()
+        _generation += 1
     if conn:
         conn.close()
+        conn = None
+    invalidate_regions()
+    clear_cache()
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Sales database maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("check-plans",
+                        help="verify every date/region filter uses an index")
+    commands.add_parser("verify-rollup",
+                        help="compare the SalesDaily rollup with the Sales table")
+    commands.add_parser("rebuild-rollup",
+                        help="recompute the SalesDaily rollup from the Sales table")
+    snapshot = commands.add_parser("export-snapshot",
+                                   help="write a compressed snapshot for fast first startup")
+    snapshot.add_argument("--out", help="snapshot file (default sales_db.snapshot "
+                                        "next to db.py, where connect() looks for it)")
+    importer = commands.add_parser("import", help="import sales_qn_yyyy_r.csv files")
+    importer.add_argument("paths", nargs="+", help="sales files to import")
+    importer.add_argument("--mode", choices=IMPORT_MODES, default="replace",
+                          help="what a sale does to one already saved for its date "
+                               "and region (default replace)")
+    args = parser.parse_args()
+
+    connect()
+    try:
+        if args.command == "check-plans":
+            problems = check_query_plans()
+            for shape, detail in problems:
+                print(f"No index for {shape}: {detail}")
+            if problems:
+                raise SystemExit(1)
+            print("All filter shapes use an index.")
+        elif args.command == "verify-rollup":
+            mismatches = verify_rollup()
+            for row in mismatches:
+                print(f"{row['salesDate']} {row['region']}: "
+                      f"sales {row['raw_total']} ({row['raw_count']} rows), "
+                      f"rollup {row['rollup_total']} ({row['rollup_count']} rows)")
+            if mismatches:
+                print(f"{len(mismatches)} mismatches; run 'rebuild-rollup' to fix.")
+                raise SystemExit(1)
+            print("Rollup matches the Sales table.")
+        elif args.command == "rebuild-rollup":
+            rebuild_rollup()
+            print("Rollup rebuilt.")
+        elif args.command == "export-snapshot":
+            path = args.out or Path(__file__).resolve().parent / "sales_db.snapshot"
+            size, compressed = export_snapshot(path)
+            print(f"Wrote {path}: {size:,} bytes of database in {compressed:,} bytes.")
+        elif args.command == "import":
+            reports, totals = import_sales_batch(args.paths, get_regions(), mode=args.mode)
+            for report in sorted(reports, key=lambda report: report["file"]):
+                if "error" in report:
+                    status = report["error"]
+                elif report["bad_rows"]:
+                    status = f"{report['bad_rows']} bad rows, not imported"
+                else:
+                    status = (f"{report['rows']} rows: {report['inserted']} inserted, "
+                              f"{report['updated']} updated")
+                print(f"{report['file']}: {status} ({report['seconds']:.2f} seconds)")
+            print(f"{totals['rows']:,} rows imported ({totals['inserted']:,} inserted, "
+                  f"{totals['updated']:,} updated) in {totals['seconds']:.2f} seconds "
+                  f"({totals['rows_per_sec']:,.0f} rows/sec).")
+    finally:
+        close()
+
+# if started as the main module, call the main function
+if __name__ == "__main__":
+    main()
 
 
 
@@ -0,0 +1,140 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+"""
+This module runs database calls for the GUI on a background thread so the
+Tk event loop never waits on SQLite.
+"""
+
+import itertools
+import queue
+import sqlite3
+import threading
+
+import db
+
+class QueryExecutor:
+    """Runs db functions on one worker thread with its own SQLite connection.
+
+    Results come back to the Tk thread through master.after polling, so the
+    on_done/on_error callbacks can safely touch widgets. Requests submitted
+    with the same key supersede each other: an older request that hasn't
+    started is skipped, one that is running is interrupted, and only the
+    newest result is delivered. If the worker can't open its connection,
+    the constructor raises the error.
+    """
+    def __init__(self, master, poll_ms=20):
+        self.master = master
+        self.poll_ms = poll_ms
+        self.__requests = queue.Queue()
+        self.__results = queue.Queue()
+        self.__tickets = itertools.count(1)
+        self.__latest = {}        # key -> newest ticket for that key
+        self.__outstanding = 0    # submitted requests not yet handled here
+        self.__running = None     # (key, ticket) the worker is executing
+        self.__running_lock = threading.Lock()
+        self.__connection = None
+        self.__startup_error = None
+        self.__poll_id = None
+        self.__ready = threading.Event()
+        self.__thread = threading.Thread(target=self.__work, daemon=True)
+        self.__thread.start()
+        self.__ready.wait()
+        if self.__startup_error is not None:
+            self.__thread.join()
+            raise self.__startup_error
+
+    def submit(self, key, func, *args, on_done=None, on_error=None):
+        """Queue func(*args) on the worker thread and return its ticket.
+
+        Use key=None for requests that must never be superseded, such as
+        saving changes.
+        """
+        ticket = next(self.__tickets)
+        if key is not None:
+            self.__latest[key] = ticket
+            with self.__running_lock:
+                if self.__running is not None and self.__running[0] == key:
+                    # stop the superseded query instead of waiting for it
+                    self.__connection.interrupt()
+        self.__outstanding += 1
+        self.__requests.put((key, ticket, func, args, on_done, on_error))
+        if self.__poll_id is None:
+            self.__poll_id = self.master.after(self.poll_ms, self.__poll)
+        return ticket
+
+    @property
+    def busy(self):
+        return self.__outstanding > 0
+
+    def shutdown(self):
+        if self.__poll_id is not None:
+            self.master.after_cancel(self.__poll_id)
+            self.__poll_id = None
+        self.__requests.put(None)
+        self.__thread.join(timeout=5)
+
+    def __is_current(self, key, ticket):
+        return key is None or self.__latest.get(key) == ticket
+
+    def __work(self):
+        try:
+            self.__connection = db.open_connection()
+            db.use_connection(self.__connection)
+        except Exception as e:
+            # nothing can run without a connection; the constructor raises this
+            self.__startup_error = e
+            db.use_connection(None)
+            if self.__connection is not None:
+                self.__connection.close()
+            return
+        finally:
+            self.__ready.set()
+        try:
+            while True:
+                request = self.__requests.get()
+                if request is None:
+                    break
+                key, ticket, func, args, on_done, on_error = request
+                if not self.__is_current(key, ticket):
+                    self.__results.put((key, ticket, None, None, None, None))
+                    continue
+
+                with self.__running_lock:
+                    self.__running = (key, ticket)
+                result = error = None
+                try:
+                    result = func(*args)
+                except sqlite3.OperationalError as e:
+                    # an interrupted query was superseded; nobody wants it
+                    if self.__is_current(key, ticket):
+                        error = e
+                except Exception as e:
+                    error = e
+                finally:
+                    with self.__running_lock:
+                        self.__running = None
+                self.__results.put((key, ticket, result, error, on_done, on_error))
+        finally:
+            db.use_connection(None)
+            self.__connection.close()
+
+    def __poll(self):
+        self.__poll_id = None
+        while True:
+            try:
+                key, ticket, result, error, on_done, on_error = self.__results.get_nowait()
+            except queue.Empty:
+                break
+            self.__outstanding -= 1
+            if not self.__is_current(key, ticket):
+                continue
+            if error is not None:
+                if on_error is not None:
+                    on_error(error)
+            elif on_done is not None:
+                on_done(result)
+
+        if self.__outstanding > 0:
+            self.__poll_id = self.master.after(self.poll_ms, self.__poll)
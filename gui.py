@@ -2,28 +2,30 @@
 #12/02/2025
 #Project12
 import os
-import csv
 import locale
+import threading
 import tkinter as tk
 from tkinter import messagebox, filedialog, ttk
-from datetime import datetime
+from datetime import date, datetime
 
 import db
-from business import DailySales, DATE_FORMAT
+from executor import QueryExecutor
+from widgets import SeriesChart, VirtualTable
+from business import DailySales, Regions, SalesList, DATE_FORMAT
 
-# Locale for currency formatting with a safe fallback.
-try:
-    locale.setlocale(locale.LC_ALL, "en_US.UTF-8")
-except locale.Error:
-    locale.setlocale(locale.LC_ALL, "")
+# how often the UI checks on a running export, in milliseconds
+EXPORT_POLL_MS = 100
+
+# most sales loaded into the batch edit grid at once
+EDIT_GRID_MAX_ROWS = 5000
 
 
 class SalesApp:
     def __init__(self, master):
         self.master = master
         self.master.title("Sales Data Studio")
-        self.master.geometry("840x640")
-        self.master.minsize(720, 560)
+        self.master.geometry("900x780")
+        self.master.minsize(760, 680)
 
         self._configure_style()
 
@@ -40,8 +42,23 @@ class SalesApp:
         self.avg_var = tk.StringVar(value="$0.00")
         self.count_var = tk.StringVar(value="0")
         self.top_day_var = tk.StringVar(value="—")
+        self.median_day_var = tk.StringVar(value="—")
+        self.p90_day_var = tk.StringVar(value="—")
+        self.slice_filters = (None, None, None)   # the slice the sales table shows
+        self.slice_after = None                   # where its next page starts
+        self.granularity_var = tk.StringVar(value="month")
+        self.split_regions_var = tk.BooleanVar(value=False)
+
+        self.edit_start_var = tk.StringVar()
+        self.edit_end_var = tk.StringVar()
+        self.edit_region_var = tk.StringVar(value="All regions")
+        self.edit_status_var = tk.StringVar(value="Load a date range to edit its sales.")
+        self.grid_amounts = {}     # sale ID -> amount as loaded or last saved
+        self.grid_changes = {}     # sale ID -> edited amount not saved yet
+        self.grid_editor = None
 
         self.regions = self._load_regions()
+        self.queries = QueryExecutor(self.master)
         self._build_layout()
 
     def _configure_style(self):
@@ -60,12 +77,15 @@ class SalesApp:
         notebook.pack(fill=tk.BOTH, expand=True, padx=14, pady=14)
 
         self.lookup_frame = ttk.Frame(notebook, padding=18)
+        self.edit_frame = ttk.Frame(notebook, padding=18)
         self.analytics_frame = ttk.Frame(notebook, padding=18)
 
         notebook.add(self.lookup_frame, text="Lookup & Update")
+        notebook.add(self.edit_frame, text="Batch Edit")
         notebook.add(self.analytics_frame, text="Analytics & Export")
 
         self._build_lookup_tab()
+        self._build_edit_tab()
         self._build_analytics_tab()
 
     def _build_lookup_tab(self):
@@ -95,6 +115,38 @@ class SalesApp:
         exit_btn = ttk.Button(actions, text="Exit", command=self.on_close)
         exit_btn.pack(side=tk.LEFT)
 
+    def _build_edit_tab(self):
+        header = ttk.Label(self.edit_frame, text="Correct many sales at once", style="Header.TLabel")
+        header.grid(row=0, column=0, columnspan=4, sticky="w", pady=(0, 12))
+
+        self._add_labeled_entry(self.edit_frame, "Start date:", self.edit_start_var, 1)
+        self._add_labeled_entry(self.edit_frame, "End date:", self.edit_end_var, 2)
+
+        ttk.Label(self.edit_frame, text="Region filter:").grid(row=3, column=0, sticky="e", pady=4, padx=(0, 10))
+        region_codes = ["All regions"] + self.regions.codes
+        ttk.Combobox(self.edit_frame, textvariable=self.edit_region_var,
+                     values=region_codes, state="readonly", width=22).grid(row=3, column=1, sticky="w", pady=4)
+
+        load_btn = ttk.Button(self.edit_frame, text="Load Sales", command=self.load_edit_grid)
+        load_btn.grid(row=1, column=3, rowspan=2, padx=(12, 0), sticky="ew")
+
+        grid_frame, self.grid_tree = self._build_tree(self.edit_frame, ["ID", "Date", "Region", "Amount"])
+        grid_frame.grid(row=4, column=0, columnspan=4, sticky="nsew", pady=(12, 6))
+        self.grid_tree.tag_configure("changed", background="#fff4c2")
+        self.grid_tree.bind("<Double-1>", self._edit_grid_amount)
+
+        ttk.Label(self.edit_frame, textvariable=self.edit_status_var).grid(
+            row=5, column=0, columnspan=4, sticky="w")
+
+        actions = ttk.Frame(self.edit_frame, padding=(0, 12))
+        actions.grid(row=6, column=0, columnspan=4, sticky="w")
+        ttk.Button(actions, text="Save All Changes", style="Accent.TButton",
+                   command=self.save_edit_grid).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Button(actions, text="Discard Changes", command=self.discard_grid_changes).pack(side=tk.LEFT)
+
+        self.edit_frame.rowconfigure(4, weight=1)
+        self.edit_frame.columnconfigure(2, weight=1)
+
     def _build_analytics_tab(self):
         header = ttk.Label(self.analytics_frame, text="Explore trends, filter data, and export snapshots", style="Header.TLabel")
         header.grid(row=0, column=0, columnspan=4, sticky="w", pady=(0, 12))
@@ -103,7 +155,7 @@ class SalesApp:
         self._add_labeled_entry(self.analytics_frame, "End date:", self.end_date_var, 2)
 
         ttk.Label(self.analytics_frame, text="Region filter:").grid(row=3, column=0, sticky="e", pady=4, padx=(0, 10))
-        region_codes = ["All regions"] + sorted(self.regions.keys())
+        region_codes = ["All regions"] + self.regions.codes
         self.region_dropdown = ttk.Combobox(self.analytics_frame, textvariable=self.filter_region_var,
                                             values=region_codes, state="readonly", width=22)
         self.region_dropdown.grid(row=3, column=1, sticky="w", pady=4)
@@ -125,32 +177,92 @@ class SalesApp:
             ("Average amount", self.avg_var),
             ("Records", self.count_var),
             ("Best day", self.top_day_var),
+            ("Median day", self.median_day_var),
+            ("90th percentile day", self.p90_day_var),
         ]):
             card = ttk.Frame(cards, relief="ridge", padding=10)
-            card.grid(row=0, column=idx, padx=6, sticky="ew")
+            card.grid(row=idx // 3, column=idx % 3, padx=6, pady=3, sticky="ew")
             ttk.Label(card, text=label, font=("Helvetica", 10, "bold")).pack(anchor="w")
             ttk.Label(card, textvariable=var, font=("Helvetica", 14)).pack(anchor="w", pady=(4, 0))
-            cards.columnconfigure(idx, weight=1)
+            cards.columnconfigure(idx % 3, weight=1)
+
+        views = ttk.Notebook(self.analytics_frame)
+        views.grid(row=5, column=0, columnspan=4, sticky="nsew", pady=(6, 10))
+        breakdown_frame = ttk.Frame(views, padding=10)
+        rankings_frame = ttk.Frame(views, padding=10)
+        trend_frame = ttk.Frame(views, padding=10)
+        sales_frame = ttk.Frame(views, padding=10)
+        views.add(breakdown_frame, text="Breakdown")
+        views.add(rankings_frame, text="Best days")
+        views.add(trend_frame, text="Trend")
+        views.add(sales_frame, text="Sales")
 
         # Region breakdown
-        ttk.Label(self.analytics_frame, text="Totals by region", font=("Helvetica", 12, "bold")).grid(
-            row=5, column=0, columnspan=2, sticky="w", pady=(6, 4))
-        region_frame, self.region_tree = self._build_tree(self.analytics_frame, ["Code", "Region", "Total", "Count"])
-        region_frame.grid(row=6, column=0, columnspan=2, sticky="nsew", pady=(0, 10))
+        ttk.Label(breakdown_frame, text="Totals by region", font=("Helvetica", 12, "bold")).grid(
+            row=0, column=0, sticky="w", pady=(0, 4))
+        region_frame, self.region_tree = self._build_tree(breakdown_frame, ["Code", "Region", "Total", "Count"])
+        region_frame.grid(row=1, column=0, sticky="nsew", padx=(0, 10))
 
         # Quarter breakdown
-        ttk.Label(self.analytics_frame, text="Totals by quarter", font=("Helvetica", 12, "bold")).grid(
-            row=5, column=2, columnspan=2, sticky="w", pady=(6, 4))
-        quarter_frame, self.quarter_tree = self._build_tree(self.analytics_frame, ["Quarter", "Total"])
-        quarter_frame.grid(row=6, column=2, columnspan=2, sticky="nsew", pady=(0, 10))
-
-        self.analytics_frame.rowconfigure(6, weight=1)
+        ttk.Label(breakdown_frame, text="Totals by quarter", font=("Helvetica", 12, "bold")).grid(
+            row=0, column=1, sticky="w", pady=(0, 4))
+        quarter_frame, self.quarter_tree = self._build_tree(breakdown_frame, ["Quarter", "Total"])
+        quarter_frame.grid(row=1, column=1, sticky="nsew")
+
+        breakdown_frame.rowconfigure(1, weight=1)
+        breakdown_frame.columnconfigure(0, weight=1)
+        breakdown_frame.columnconfigure(1, weight=1)
+
+        # Best days overall and per region
+        ttk.Label(rankings_frame, text=f"Top {db.RANKING_TOP_DAYS} days", font=("Helvetica", 12, "bold")).grid(
+            row=0, column=0, sticky="w", pady=(0, 4))
+        top_frame, self.top_days_tree = self._build_tree(rankings_frame, ["Rank", "Date", "Total"])
+        top_frame.grid(row=1, column=0, sticky="nsew", padx=(0, 10))
+
+        ttk.Label(rankings_frame, text="Best days per region", font=("Helvetica", 12, "bold")).grid(
+            row=0, column=1, sticky="w", pady=(0, 4))
+        region_days_frame, self.region_days_tree = self._build_tree(rankings_frame, ["Region", "Date", "Total"])
+        region_days_frame.grid(row=1, column=1, sticky="nsew")
+
+        rankings_frame.rowconfigure(1, weight=1)
+        rankings_frame.columnconfigure(0, weight=1)
+        rankings_frame.columnconfigure(1, weight=1)
+
+        # Totals over time for the slice
+        ttk.Label(trend_frame, text="Totals per:").grid(row=0, column=0, sticky="w", padx=(0, 6))
+        granularity_dropdown = ttk.Combobox(trend_frame, textvariable=self.granularity_var,
+                                            values=db.SERIES_GRANULARITIES, state="readonly", width=10)
+        granularity_dropdown.grid(row=0, column=1, sticky="w")
+        granularity_dropdown.bind("<<ComboboxSelected>>", lambda event: self.load_series())
+        ttk.Checkbutton(trend_frame, text="Split by region", variable=self.split_regions_var,
+                        command=self.load_series).grid(row=0, column=2, sticky="w", padx=(12, 0))
+        self.series_chart = SeriesChart(trend_frame, format_value=self._format_currency, height=240)
+        self.series_chart.grid(row=1, column=0, columnspan=4, sticky="nsew", pady=(8, 0))
+        self.series_chart.show_message("Run an analysis to chart the slice.")
+        trend_frame.rowconfigure(1, weight=1)
+        trend_frame.columnconfigure(3, weight=1)
+
+        # Every sale in the slice; only the rows in view are built, and
+        # more are fetched as the table scrolls
+        ttk.Label(sales_frame, text="Sales in the slice (click a heading to sort)",
+                  font=("Helvetica", 12, "bold")).grid(row=0, column=0, sticky="w", pady=(0, 4))
+        self.slice_table = VirtualTable(sales_frame, [
+            ("ID", "q", None),
+            ("Date", "l", _format_ordinal),
+            ("Region", None, None),
+            ("Amount", "d", self._format_currency),
+        ], self._fetch_slice_rows, height=10)
+        self.slice_table.grid(row=1, column=0, sticky="nsew")
+        sales_frame.rowconfigure(1, weight=1)
+        sales_frame.columnconfigure(0, weight=1)
+
+        self.analytics_frame.rowconfigure(5, weight=1)
         self.analytics_frame.columnconfigure(1, weight=1)
         self.analytics_frame.columnconfigure(2, weight=1)
         self.analytics_frame.columnconfigure(3, weight=1)
 
         ttk.Label(self.analytics_frame, text="Use the filters above to slice the data. Export produces a CSV with ID, date, region, and amount for the current slice.").grid(
-            row=7, column=0, columnspan=4, sticky="w", pady=(6, 0))
+            row=6, column=0, columnspan=4, sticky="w", pady=(6, 0))
 
     def _build_tree(self, parent, columns):
         frame = ttk.Frame(parent)
@@ -175,14 +287,10 @@ class SalesApp:
 
     def _load_regions(self):
         try:
-            regions = db.get_regions()
-            region_list = []
-            if hasattr(regions, "_Regions__VALID_REGIONS"):
-                region_list = getattr(regions, "_Regions__VALID_REGIONS")
-            return {region.code: region for region in region_list}
+            return db.get_regions()
         except Exception:
             messagebox.showerror("Database error", "Unable to load regions from the database.")
-            return {}
+            return Regions()
 
     def _set_id_value(self, value):
         self.id_entry.config(state="normal")
@@ -215,16 +323,16 @@ class SalesApp:
             return
 
         if self.regions and region_code not in self.regions:
-            valid_codes = ", ".join(sorted(self.regions.keys()))
+            valid_codes = ", ".join(self.regions.codes)
             messagebox.showerror("Invalid region", f"Region must be one of: {valid_codes}.")
             return
 
-        try:
-            data = db.get_sales(date_value, region_code)
-        except Exception:
-            messagebox.showerror("Database error", "Unable to retrieve sales data.")
-            return
+        self.queries.submit("lookup", db.get_sales, date_value, region_code,
+                            on_done=lambda data: self._show_sale(data, date_value),
+                            on_error=lambda e: messagebox.showerror(
+                                "Database error", "Unable to retrieve sales data."))
 
+    def _show_sale(self, data, date_value):
         if data is None:
             self._clear_loaded_sale()
             messagebox.showinfo("Not found", "No sales amount for the date and region entered.")
@@ -256,13 +364,131 @@ class SalesApp:
         data.id = int(sale_id)
         data.amount = amount
 
+        # saves are never superseded, so they get no key
+        self.queries.submit(None, db.update_sales_amount, data,
+                            on_done=lambda result: messagebox.showinfo(
+                                "Updated", "Sales amount updated successfully."),
+                            on_error=lambda e: messagebox.showerror(
+                                "Database error", "Unable to update the sales amount."))
+
+    def load_edit_grid(self):
+        start = self._parse_date_text(self.edit_start_var.get(), allow_blank=True, label="Start date")
+        end = self._parse_date_text(self.edit_end_var.get(), allow_blank=True, label="End date")
+        if start is False or end is False:
+            return
+        if self.grid_changes and not messagebox.askyesno(
+                "Unsaved changes", "Discard the changes that haven't been saved?"):
+            return
+
+        region_choice = self.edit_region_var.get().strip()
+        region_filter = None if region_choice in ("", "All regions") else region_choice
+
+        self.edit_status_var.set("Loading sales...")
+        self.queries.submit("grid", _first_sales, start, end, region_filter, EDIT_GRID_MAX_ROWS + 1,
+                            on_done=self._show_edit_grid,
+                            on_error=lambda e: messagebox.showerror(
+                                "Database error", "Unable to load sales for editing."))
+
+    def _show_edit_grid(self, sales):
+        self._close_grid_editor()
+        self._clear_tree(self.grid_tree)
+        self.grid_amounts = {}
+        self.grid_changes = {}
+        for number, data in enumerate(sales):
+            if number == EDIT_GRID_MAX_ROWS:
+                break
+            self.grid_amounts[data.id] = data.amount
+            self.grid_tree.insert("", tk.END, iid=str(data.id), values=(
+                data.id, f"{data.salesDate:{DATE_FORMAT}}", data.region.code, f"{data.amount:.2f}"))
+        self._show_grid_status(truncated=sales.count > EDIT_GRID_MAX_ROWS)
+
+    def _show_grid_status(self, truncated=False):
+        text = f"{len(self.grid_amounts):,} sales loaded, {len(self.grid_changes):,} changed."
+        if truncated:
+            text += f" Only the first {EDIT_GRID_MAX_ROWS:,} are shown; narrow the filters to see the rest."
+        self.edit_status_var.set(text)
+
+    def _edit_grid_amount(self, event):
+        item = self.grid_tree.identify_row(event.y)
+        column = self.grid_tree.identify_column(event.x)
+        if not item or column != "#4":   # only the Amount column is editable
+            return
+        self._close_grid_editor()
+        x, y, width, height = self.grid_tree.bbox(item, column)
+        editor = ttk.Entry(self.grid_tree)
+        editor.place(x=x, y=y, width=width, height=height)
+        editor.insert(0, self.grid_tree.set(item, "Amount"))
+        editor.select_range(0, tk.END)
+        editor.focus_set()
+        editor.bind("<Return>", lambda e: self._finish_grid_edit(item, save=True))
+        editor.bind("<FocusOut>", lambda e: self._finish_grid_edit(item, save=True))
+        editor.bind("<Escape>", lambda e: self._finish_grid_edit(item, save=False))
+        self.grid_editor = editor
+
+    def _close_grid_editor(self):
+        editor, self.grid_editor = self.grid_editor, None
+        if editor is not None:
+            editor.destroy()
+        return editor
+
+    def _finish_grid_edit(self, item, save):
+        if self.grid_editor is None:   # already closed by Return or Escape
+            return
+        text = self._close_grid_editor().get()
+        if not save:
+            return
         try:
-            db.update_sales_amount(data)
-        except Exception:
-            messagebox.showerror("Database error", "Unable to update the sales amount.")
+            amount = float(text)
+        except ValueError:
+            messagebox.showerror("Invalid amount", "Enter a numeric sales amount.")
+            return
+        if amount <= 0:
+            messagebox.showerror("Invalid amount", "Amount must be greater than zero.")
             return
+        self._set_grid_amount(int(item), amount)
+        self._show_grid_status()
+
+    def _set_grid_amount(self, sale_id, amount):
+        item = str(sale_id)
+        self.grid_tree.set(item, "Amount", f"{amount:.2f}")
+        if amount == self.grid_amounts[sale_id]:
+            self.grid_changes.pop(sale_id, None)
+            self.grid_tree.item(item, tags=())
+        else:
+            self.grid_changes[sale_id] = amount
+            self.grid_tree.item(item, tags=("changed",))
 
-        messagebox.showinfo("Updated", "Sales amount updated successfully.")
+    def save_edit_grid(self):
+        self._close_grid_editor()
+        if not self.grid_changes:
+            messagebox.showinfo("No changes", "Edit some amounts before saving.")
+            return
+        changes = dict(self.grid_changes)
+        # saves are never superseded, so they get no key; every changed
+        # row goes to the database in one transaction
+        self.queries.submit(None, db.update_sales_amounts, changes.items(),
+                            on_done=lambda result: self._grid_saved(changes, result),
+                            on_error=lambda e: messagebox.showerror(
+                                "Database error", "Unable to save the changed amounts."))
+
+    def _grid_saved(self, changes, result):
+        for sale_id, amount in changes.items():
+            if sale_id not in self.grid_amounts:
+                continue   # a newer load replaced the grid
+            self.grid_amounts[sale_id] = amount
+            # leave rows edited again while the save ran marked as changed
+            self._set_grid_amount(sale_id, self.grid_changes.get(sale_id, amount))
+        self._show_grid_status()
+        message = f"Saved {result['rows']:,} changed amounts."
+        if result["missing"]:
+            message += f"\n{len(result['missing']):,} sales no longer exist and were skipped."
+        messagebox.showinfo("Saved", message)
+
+    def discard_grid_changes(self):
+        self._close_grid_editor()
+        for sale_id in list(self.grid_changes):
+            self._set_grid_amount(sale_id, self.grid_amounts[sale_id])
+        self._show_grid_status()
 
     def _clear_tree(self, tree):
         for child in tree.get_children():
@@ -291,12 +517,20 @@ class SalesApp:
         region_choice = self.filter_region_var.get().strip()
         region_filter = None if region_choice in ("", "All regions") else region_choice
 
-        try:
-            summary = db.get_sales_summary(start, end, region_filter)
-        except Exception:
-            messagebox.showerror("Database error", "Unable to build the summary with the current filters.")
-            return
+        def summary():
+            # another process may have edited Region since the last run
+            db.check_regions()
+            return db.get_sales_summary(start, end, region_filter)
+
+        # a newer Run Analysis supersedes this one, so only the latest
+        # result is ever shown
+        self.queries.submit("summary", summary,
+                            on_done=lambda summary: self._show_summary(
+                                summary, (start, end, region_filter)),
+                            on_error=lambda e: messagebox.showerror(
+                                "Database error", "Unable to build the summary with the current filters."))
 
+    def _show_summary(self, summary, filters):
         total = summary.get("total") or 0
         avg = summary.get("average") or 0
         count = summary.get("count") or 0
@@ -322,10 +556,84 @@ class SalesApp:
         self._clear_tree(self.quarter_tree)
         for row in summary.get("quarters", []):
             self.quarter_tree.insert("", tk.END, values=(
-                int(row["quarter"]),
+                f"{row['year']} Q{row['quarter']}",
                 self._format_currency(row["total"])
             ))
 
+        self.slice_filters = filters
+        self.slice_after = None
+        self.slice_table.reset(total=count)
+        self.load_rankings()
+        self.load_series()
+
+    def load_rankings(self):
+        """Fill the percentile cards and best-day tables for the analysed slice."""
+        start, end, region_filter = self.slice_filters
+        self.queries.submit("rankings", db.get_sales_rankings, start, end, region_filter,
+                            on_done=self._show_rankings,
+                            on_error=lambda e: messagebox.showerror(
+                                "Database error", "Unable to rank the days in the current slice."))
+
+    def _show_rankings(self, rankings):
+        for percentile, var in ((50, self.median_day_var), (90, self.p90_day_var)):
+            value = rankings["percentiles"].get(percentile)
+            if value is None:
+                var.set("—")
+            else:
+                var.set(("" if rankings["exact"] else "≈ ") + self._format_currency(value))
+
+        self._clear_tree(self.top_days_tree)
+        for rank, day in enumerate(rankings["top_days"], start=1):
+            self.top_days_tree.insert("", tk.END, values=(
+                rank, day["salesDate"], self._format_currency(day["total"])))
+
+        self._clear_tree(self.region_days_tree)
+        for code, days in rankings["top_by_region"].items():
+            for day in days:
+                self.region_days_tree.insert("", tk.END, values=(
+                    code, day["salesDate"], self._format_currency(day["total"])))
+
+    def load_series(self):
+        """Chart the analysed slice at the chosen granularity."""
+        start, end, region_filter = self.slice_filters
+        granularity = self.granularity_var.get()
+        by_region = self.split_regions_var.get()
+        self.queries.submit("series", db.get_sales_series, granularity, start, end,
+                            region_filter, by_region,
+                            on_done=lambda series: self._show_series(series, by_region),
+                            on_error=lambda e: self.series_chart.show_message(
+                                "Unable to chart the current slice."))
+
+    def _show_series(self, series, by_region):
+        labels = []
+        columns = {}     # (year, bucket) -> x position
+        for point in series:
+            key = (point["year"], point["bucket"])
+            if key not in columns:
+                columns[key] = len(labels)
+                labels.append(point["label"])
+
+        # with a line per region, a bucket without sales in a region is 0
+        lines = {}
+        for point in series:
+            name = point["region"] if by_region else "Total"
+            values = lines.setdefault(name, [0.0] * len(labels))
+            values[columns[point["year"], point["bucket"]]] = point["total"]
+        self.series_chart.show(labels, sorted(lines.items()))
+
+    def _fetch_slice_rows(self, limit, done):
+        """Fetch the next page of the sales table on the query executor."""
+        start, end, region_filter = self.slice_filters
+
+        def page_done(page):
+            rows, self.slice_after = page
+            done(rows, self.slice_after is not None)
+
+        self.queries.submit("slice rows", _slice_page, start, end, region_filter,
+                            self.slice_after, limit,
+                            on_done=page_done,
+                            on_error=lambda e: done([], False))
+
     def export_filtered_csv(self):
         start = self._parse_date_text(self.start_date_var.get(), allow_blank=True, label="Start date")
         end = self._parse_date_text(self.end_date_var.get(), allow_blank=True, label="End date")
@@ -335,54 +643,127 @@ class SalesApp:
         region_choice = self.filter_region_var.get().strip()
         region_filter = None if region_choice in ("", "All regions") else region_choice
 
-        try:
-            data = db.get_sales_filtered(start, end, region_filter)
-        except Exception:
-            messagebox.showerror("Database error", "Unable to retrieve filtered data for export.")
-            return
+        self.queries.submit("export", db.get_sales_summary, start, end, region_filter,
+                            on_done=lambda summary: self._choose_export_file(
+                                start, end, region_filter, summary["count"]),
+                            on_error=lambda e: messagebox.showerror(
+                                "Database error", "Unable to retrieve filtered data for export."))
 
-        if data.count == 0:
+    def _choose_export_file(self, start, end, region_filter, count):
+        if count == 0:
             messagebox.showinfo("No data", "No sales match the current filters.")
             return
 
         filepath = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("CSV Files", "*.csv")],
+            filetypes=[("CSV Files", "*.csv"), ("Compressed CSV Files", "*.csv.gz")],
             title="Save filtered sales as CSV"
         )
         if not filepath:
             return
 
-        try:
-            with open(filepath, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["ID", "Date", "Region Code", "Region Name", "Amount", "Quarter"])
-                for sale in data:
-                    sales_date = sale.salesDate.strftime(DATE_FORMAT) if hasattr(sale.salesDate, "strftime") else sale.salesDate
-                    writer.writerow([
-                        sale.id,
-                        sales_date,
-                        sale.region.code,
-                        sale.region.name,
-                        f"{sale.amount:.2f}",
-                        sale.quarter,
-                    ])
-        except OSError:
-            messagebox.showerror("File error", "Unable to write to the chosen file path.")
+        self._start_export(filepath, start, end, region_filter, count)
+
+    def _start_export(self, filepath, start, end, region_filter, count):
+        """Run the export on a worker thread behind a progress dialog."""
+        dialog = tk.Toplevel(self.master)
+        dialog.title("Exporting")
+        dialog.transient(self.master)
+        dialog.resizable(False, False)
+        frame = ttk.Frame(dialog, padding=18)
+        frame.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(frame, text=f"Exporting {count:,} rows to\n{filepath}").pack(anchor="w")
+        progress_bar = ttk.Progressbar(frame, maximum=count, length=320)
+        progress_bar.pack(fill=tk.X, pady=(10, 10))
+        cancel = threading.Event()
+        cancel_btn = ttk.Button(frame, text="Cancel", command=cancel.set)
+        cancel_btn.pack(anchor="e")
+        dialog.protocol("WM_DELETE_WINDOW", cancel.set)
+        dialog.grab_set()
+
+        # the worker only touches these; the Tk widgets are updated from
+        # the main thread by _poll_export
+        state = {"written": 0, "done": False, "result": None, "error": None}
+
+        def work():
+            connection = None
+            try:
+                connection = db.open_connection()
+                state["result"] = db.export_sales_csv(
+                    filepath, start, end, region_filter,
+                    compress=filepath.endswith(".gz"),
+                    progress=lambda written: state.update(written=written),
+                    cancel=cancel, connection=connection)
+            except OSError:
+                state["error"] = ("File error", "Unable to write to the chosen file path.")
+            except Exception:
+                state["error"] = ("Database error", "Unable to retrieve filtered data for export.")
+            finally:
+                if connection is not None:
+                    connection.close()
+                state["done"] = True
+
+        threading.Thread(target=work, daemon=True).start()
+        self._poll_export(dialog, progress_bar, state, filepath)
+
+    def _poll_export(self, dialog, progress_bar, state, filepath):
+        progress_bar["value"] = state["written"]
+        if not state["done"]:
+            self.master.after(EXPORT_POLL_MS, self._poll_export, dialog, progress_bar, state, filepath)
             return
 
-        messagebox.showinfo("Export complete", f"Saved {data.count} rows to\n{filepath}")
+        dialog.grab_release()
+        dialog.destroy()
+        if state["error"]:
+            messagebox.showerror(*state["error"])
+        elif state["result"] is None:
+            messagebox.showinfo("Export cancelled", "The export was cancelled and no file was saved.")
+        else:
+            messagebox.showinfo("Export complete", f"Saved {state['result']} rows to\n{filepath}")
 
     def on_close(self):
+        if self.grid_changes and not messagebox.askyesno(
+                "Unsaved changes", "Quit without saving the changed amounts?"):
+            return
+        self.queries.shutdown()
         db.close()
         self.master.destroy()
 
 
+def _slice_page(start, end, region_filter, after, limit):
+    """Return (rows, next_key) for the sales table: (ID, date, region,
+    amount) rows with each date as an ordinal so the table can store it in
+    an array. Runs on the executor's worker thread."""
+    rows, next_key = db.get_sales_page(start, end, region_filter, after, limit)
+    return [(sale_id, date.fromisoformat(sales_date).toordinal(), code, amount)
+            for sale_id, amount, sales_date, code in rows], next_key
+
+
+def _format_ordinal(ordinal):
+    return date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+
+def _first_sales(start, end, region_filter, limit):
+    """Return up to limit filtered sales as a SalesList; runs on the
+    executor's worker thread."""
+    pages = db.iter_sales_filtered(start, end, region_filter, batch_size=limit)
+    try:
+        return next(pages, SalesList())
+    finally:
+        pages.close()
+
+
 def main():
     # ensure the SQLite file is found when running from other directories
     script_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(script_dir)
 
+    # Locale for currency formatting with a safe fallback.
+    try:
+        locale.setlocale(locale.LC_ALL, "en_US.UTF-8")
+    except locale.Error:
+        locale.setlocale(locale.LC_ALL, "")
+
     db.connect()
 
     root = tk.Tk()
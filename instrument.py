@@ -0,0 +1,289 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+"""
+This module provides opt-in instrumentation for the db functions: call
+counts, latency histograms, rows returned and objects materialized, plus a
+log of slow calls with the SQL they ran and its query plan.
+
+Turn it on with enable(), or by setting SALES_INSTRUMENT to a file path
+before starting the app; the statistics are then written there as JSON
+when the program exits. While it is off, an instrumented function costs
+one extra check per call.
+"""
+
+import atexit
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import deque
+
+# calls slower than this (seconds) go to the slow-query log
+SLOW_CALL_SECONDS = 0.1
+
+# slow calls kept, and statements kept / explained per slow call
+SLOW_LOG_SIZE = 100
+MAX_STATEMENTS = 50
+MAX_EXPLAINED = 5
+
+# upper bounds (seconds) of the latency histogram buckets
+BUCKETS = [0.001, 0.01, 0.1, 1.0, 10.0]
+
+_enabled = False
+_slow_seconds = SLOW_CALL_SECONDS
+_lock = threading.Lock()
+_stats = {}                            # function name -> counters
+_slow_log = deque(maxlen=SLOW_LOG_SIZE)
+_thread = threading.local()            # stack of statement lists for active calls,
+                                       # and slow calls waiting to be explained
+_toggle_hooks = []
+_explain = None
+
+def enabled():
+    return _enabled
+
+def enable(slow_seconds=None):
+    """Start recording; calls slower than slow_seconds are logged."""
+    global _enabled, _slow_seconds
+    if slow_seconds is not None:
+        _slow_seconds = slow_seconds
+    _enabled = True
+    for hook in _toggle_hooks:
+        hook(True)
+
+def disable():
+    global _enabled
+    _enabled = False
+    for hook in _toggle_hooks:
+        hook(False)
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _slow_log.clear()
+
+def on_toggle(hook):
+    """Register hook(enabled), called by enable() and disable(); db uses it
+    to add and remove the SQL trace callback on its open connections."""
+    _toggle_hooks.append(hook)
+
+def set_explain(explain):
+    """Register explain(sql), returning the query plan lines for sql."""
+    global _explain
+    _explain = explain
+
+def trace(sql):
+    """sqlite3 trace callback: remember the statement for every active
+    instrumented call on this thread."""
+    for statements in getattr(_thread, "stack", ()):
+        statements[1] += 1
+        if len(statements[0]) < MAX_STATEMENTS:
+            statements[0].append(sql)
+
+def instrumented(func=None, *, measure=None):
+    """Decorator recording calls to func while instrumentation is on.
+
+    measure(result) returns (rows, materialized) for a result; the default
+    understands the counts, reports and lists the db functions return.
+    Generator functions are timed across every batch they produce.
+    """
+    if func is None:
+        return lambda func: instrumented(func, measure=measure)
+    measure = measure or _measure
+
+    if inspect.isgeneratorfunction(func):
+        @functools.wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            return _record_generator(func, args, kwargs, measure)
+        return generator_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        statements = _push()
+        start = time.perf_counter()
+        error = True
+        try:
+            result = func(*args, **kwargs)
+            error = False
+            return result
+        finally:
+            seconds = time.perf_counter() - start
+            _pop()
+            rows, materialized = (0, 0) if error else measure(result)
+            _record(func.__name__, args, kwargs, seconds, rows, materialized,
+                    error, statements)
+    return wrapper
+
+def _record_generator(func, args, kwargs, measure):
+    # time only the work done inside the generator, not the caller's
+    # handling of each batch
+    rows = materialized = 0
+    seconds = 0.0
+    statements = [[], 0]
+    error = True
+    generator = func(*args, **kwargs)
+    try:
+        while True:
+            _push(statements)
+            start = time.perf_counter()
+            try:
+                batch = next(generator)
+            except StopIteration:
+                error = False
+                return
+            finally:
+                seconds += time.perf_counter() - start
+                _pop()
+            batch_rows, batch_materialized = measure(batch)
+            rows += batch_rows
+            materialized += batch_materialized
+            try:
+                yield batch
+            except GeneratorExit:
+                # the caller stopped early, e.g. the user quit paging
+                error = False
+                raise
+    finally:
+        generator.close()
+        _record(func.__name__, args, kwargs, seconds, rows, materialized,
+                error, statements)
+
+def _push(statements=None):
+    if statements is None:
+        statements = [[], 0]   # statements kept, statements run
+    _thread.stack = getattr(_thread, "stack", []) + [statements]
+    return statements
+
+def _pop():
+    _thread.stack = _thread.stack[:-1]
+
+def _measure(result):
+    """Return (rows, materialized) for a db function's result."""
+    if result is None or isinstance(result, bool):
+        return 0, 0
+    if isinstance(result, int):
+        return result, 0
+    if isinstance(result, tuple) and result:
+        return _measure(result[-1])
+    if isinstance(result, dict):
+        return result.get("rows", 1), 0
+    count = getattr(result, "count", None)   # SalesList.count
+    if isinstance(count, int):
+        return count, count
+    if hasattr(result, "__len__"):
+        return len(result), len(result)
+    return 1, 1
+
+def _record(name, args, kwargs, seconds, rows, materialized, error, statements):
+    with _lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0,
+                     "histogram": [0] * (len(BUCKETS) + 1),
+                     "rows": 0, "materialized": 0, "statements": 0}
+            _stats[name] = stats
+        stats["calls"] += 1
+        stats["errors"] += error
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        bucket = 0
+        while bucket < len(BUCKETS) and seconds > BUCKETS[bucket]:
+            bucket += 1
+        stats["histogram"][bucket] += 1
+        stats["rows"] += rows
+        stats["materialized"] += materialized
+        stats["statements"] += statements[1]
+
+    if seconds >= _slow_seconds:
+        entry = {"function": name,
+                 "args": _describe(args, kwargs),
+                 "seconds": seconds,
+                 "at": time.time(),
+                 "error": bool(error),
+                 "statements": statements[1],
+                 "queries": statements[0]}
+        pending = getattr(_thread, "pending", None)
+        if pending is None:
+            pending = _thread.pending = []
+        pending.append(entry)
+    if getattr(_thread, "pending", None) and not getattr(_thread, "stack", None):
+        _log_pending()
+
+def _log_pending():
+    # EXPLAIN runs only once no instrumented call is active on this thread,
+    # so its statements and time are never charged to a caller of the slow
+    # call; a nested slow call waits here for the outermost one to finish
+    pending = _thread.pending
+    _thread.pending = []
+    for entry in pending:
+        entry["queries"] = _explain_statements(entry["queries"])
+    with _lock:
+        _slow_log.extend(pending)
+
+def _describe(args, kwargs):
+    parts = [_short(arg) for arg in args]
+    parts.extend(f"{key}={_short(value)}" for key, value in kwargs.items())
+    return ", ".join(parts)
+
+def _short(value, limit=60):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+def _explain_statements(statements):
+    queries = []
+    seen = set()
+    for sql in statements:
+        if sql in seen:
+            continue
+        seen.add(sql)
+        plan = []
+        first_word = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        if len(queries) < MAX_EXPLAINED and _explain is not None and \
+                first_word in ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE"):
+            plan = _explain(sql)
+        queries.append({"sql": sql, "plan": plan})
+    return queries
+
+def stats():
+    """Return {function name: counters}; the histogram is a list of counts
+    per BUCKETS bound, the last item counting calls slower than all of them."""
+    with _lock:
+        result = {}
+        for name, counters in _stats.items():
+            counters = dict(counters, histogram=list(counters["histogram"]))
+            counters["mean_seconds"] = counters["seconds"] / counters["calls"]
+            result[name] = counters
+        return result
+
+def slow_queries():
+    """Return the slow-call log, oldest first."""
+    with _lock:
+        return list(_slow_log)
+
+def dump(path=None):
+    """Return the statistics and slow-call log as JSON, also writing it to
+    path if one is given."""
+    import json
+    text = json.dumps({"buckets": BUCKETS, "functions": stats(),
+                       "slow_queries": slow_queries()}, indent=2)
+    if path is not None:
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+    return text
+
+def _dump_at_exit(path, pid):
+    # worker processes inherit the handler; only the process that
+    # enabled instrumentation writes the file
+    if os.getpid() == pid:
+        dump(path)
+
+if os.environ.get("SALES_INSTRUMENT"):
+    _enabled = True
+    atexit.register(_dump_at_exit, os.environ["SALES_INSTRUMENT"], os.getpid())
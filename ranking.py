@@ -0,0 +1,142 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+"""
+This module holds the streaming top-N and quantile structures db builds its
+rankings with. Both take values one at a time in bounded memory and can be
+merged, so partial results over separate slices combine into the result
+for the whole.
+"""
+
+import heapq
+import math
+
+class TopN:
+    """The n largest values seen, each with the item it belongs to.
+
+    A min-heap of at most n (value, item) pairs: a value only gets in by
+    replacing the smallest kept one, so adding costs O(log n) and nothing
+    is ever sorted but the final n. Among equal values the item added first
+    wins and comes first, so days added in date order tie the way the
+    summary's best day does: the earlier day.
+    """
+    def __init__(self, n):
+        self.n = n
+        self.__heap = []          # (value, -order added, item)
+        self.__added = 0
+
+    def __len__(self):
+        return len(self.__heap)
+
+    def add(self, value, item):
+        if self.n <= 0:
+            return
+        entry = (value, -self.__added, item)
+        self.__added += 1
+        if len(self.__heap) < self.n:
+            heapq.heappush(self.__heap, entry)
+        elif entry > self.__heap[0]:
+            heapq.heapreplace(self.__heap, entry)
+
+    def merge(self, other):
+        # in the order other got them, so its ties still break the same way
+        for value, order, item in sorted(other.__heap, key=lambda entry: -entry[1]):
+            self.add(value, item)
+
+    def items(self):
+        """Return the kept (value, item) pairs, largest first."""
+        return [(value, item) for value, order, item in sorted(self.__heap, reverse=True)]
+
+
+class QuantileSketch:
+    """A mergeable quantile sketch in the style of KLL.
+
+    Values are kept in levels, where each value at level h stands for 2**h
+    of the values added. When a level fills up it is sorted and every other
+    value moves up a level, so memory stays about 3k values however many
+    are added. Until the first level fills nothing has been dropped and
+    quantile() is exact; after that a quantile's rank is off by roughly
+    1.7 / k of the count (about 1% for the default k). With k None every
+    value is kept and the quantiles are always exact.
+    """
+    def __init__(self, k=200):
+        self.k = k
+        self.count = 0
+        self.__levels = []
+        self.__offsets = []      # alternates which half of a level moves up
+        self.__capacities = []
+        self.__add_level()
+
+    @property
+    def exact(self):
+        return len(self.__levels) == 1
+
+    def add(self, value):
+        level = self.__levels[0]
+        level.append(value)
+        self.count += 1
+        if len(level) >= self.__capacities[0]:
+            self.__compact()
+
+    def extend(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        for height, values in enumerate(other.__levels):
+            if height == len(self.__levels):
+                self.__add_level()
+            self.__levels[height].extend(values)
+        self.count += other.count
+        self.__compact()
+
+    def quantile(self, q):
+        """Return the value at rank ceil(q * count) (the nearest-rank
+        method), or None when nothing was added."""
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs):
+        """Return quantile(q) for each q in qs from one pass over the sketch."""
+        if not self.count:
+            return [None] * len(qs)
+        weighted = sorted((value, 1 << height)
+                          for height, values in enumerate(self.__levels)
+                          for value in values)
+        ranks = sorted((max(1, math.ceil(q * self.count)), index)
+                       for index, q in enumerate(qs))
+        results = [None] * len(qs)
+        values = iter(weighted)
+        seen = 0
+        for rank, index in ranks:
+            while seen < rank:
+                value, weight = next(values)
+                seen += weight
+            results[index] = value
+        return results
+
+    def __add_level(self):
+        self.__levels.append([])
+        self.__offsets.append(0)
+        if self.k is None:
+            self.__capacities.append(math.inf)
+            return
+        # lower levels get smaller buffers; the top level gets k
+        top = len(self.__levels) - 1
+        self.__capacities = [max(2, math.ceil(self.k * (2 / 3) ** (top - height)))
+                             for height in range(top + 1)]
+
+    def __compact(self):
+        for height in range(len(self.__levels)):
+            values = self.__levels[height]
+            if len(values) < self.__capacities[height]:
+                continue
+            if height + 1 == len(self.__levels):
+                self.__add_level()
+            values.sort()
+            # an odd value out stays behind, so the weights still add up
+            leftover = [values.pop()] if len(values) % 2 else []
+            offset = self.__offsets[height]
+            self.__offsets[height] ^= 1
+            self.__levels[height + 1].extend(values[offset::2])
+            self.__levels[height] = leftover
@@ -0,0 +1,34 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# the modules live at the top of the repo, not in a package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db
+
+@pytest.fixture
+def database(tmp_path):
+    """A fresh sales database in tmp_path, bootstrapped from the SQL dump."""
+    db.connect(str(tmp_path / "sales_db.sqlite"))
+    yield db
+    db.close()
+
+# sales in the synthetic_database fixture: one per region per day, so
+# 1,000 days from 2000-01-01
+SYNTHETIC_ROWS = 4_000
+
+@pytest.fixture
+def synthetic_database(tmp_path):
+    """A database of SYNTHETIC_ROWS sales made by benchmark.generate_database."""
+    import benchmark
+    path = str(tmp_path / "sales_bench.sqlite")
+    benchmark.generate_database(path, SYNTHETIC_ROWS)
+    db.connect(path)
+    yield db
+    db.close()
@@ -0,0 +1,58 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+import os
+import shutil
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import db
+
+REPO_DUMP = Path(db.__file__).resolve().parent / "sales_db.sql"
+
+def test_line_with_two_statements_runs_both(tmp_path):
+    dump = tmp_path / "dump.sql"
+    dump.write_text("CREATE TABLE t (x);\n"
+                    "INSERT INTO t VALUES(1);INSERT INTO t VALUES(2);\n"
+                    "INSERT INTO t VALUES(3);\n"
+                    "INSERT INTO t VALUES('a;b');\n"
+                    "INSERT INTO t VALUES('c');INSERT INTO t VALUES('d;e');\n",
+                    encoding="utf-8")
+    with closing(sqlite3.connect(tmp_path / "t.sqlite")) as connection:
+        db._bootstrap(connection, dump)
+        rows = [row[0] for row in connection.execute("SELECT x FROM t ORDER BY rowid")]
+    assert rows == [1, 2, 3, "a;b", "c", "d;e"]
+
+def sale_dates():
+    return {row["salesDate"] for row in db._connection().execute("SELECT salesDate FROM Sales")}
+
+def test_snapshot_is_used_only_with_its_dump(tmp_path):
+    dump = tmp_path / "sales_db.sql"
+    snapshot = tmp_path / "sales_db.snapshot"
+    shutil.copy(REPO_DUMP, dump)
+
+    db.connect(str(tmp_path / "first.sqlite"), str(dump), str(snapshot))
+    with db.writing() as writer:
+        writer.execute("INSERT INTO Sales (amount, salesDate, region) VALUES (1, '2030-01-01', 'w')")
+    db.export_snapshot(snapshot, str(dump))
+    db.close()
+
+    # the dump is unchanged, so the snapshot is restored
+    db.connect(str(tmp_path / "second.sqlite"), str(dump), str(snapshot))
+    assert "2030-01-01" in sale_dates()
+    db.close()
+
+    # a changed dump wins, even when the snapshot's file time is newer
+    with open(dump, "a", encoding="utf-8") as file:
+        file.write("INSERT INTO Sales VALUES(99,5.0,'2031-01-01','e');\n")
+    later = os.stat(dump).st_mtime + 60
+    os.utime(snapshot, (later, later))
+    db.connect(str(tmp_path / "third.sqlite"), str(dump), str(snapshot))
+    try:
+        dates = sale_dates()
+    finally:
+        db.close()
+    assert "2031-01-01" in dates
+    assert "2030-01-01" not in dates
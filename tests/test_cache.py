@@ -0,0 +1,83 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+from datetime import date
+
+from business import DailySales, SalesList
+from cache import ResultCache
+
+MARCH_W = ("2021-03-01", "2021-03-31", "w")
+
+def test_invalidate_drops_only_overlapping_scopes():
+    cache = ResultCache()
+    scopes = {
+        "everything": (None, None, None),
+        "march w": MARCH_W,
+        "march e": ("2021-03-01", "2021-03-31", "e"),
+        "the day w": ("2021-03-05", "2021-03-05", "w"),
+        "up to the day before": (None, "2021-03-04", "w"),
+        "from april": ("2021-04-01", None, None),
+    }
+    for key, scope in scopes.items():
+        cache.put(key, key, scope, cache.generation)
+    cache.invalidate({("2021-03-05", "w")})
+    kept = {key for key in scopes if cache.get(key)[0]}
+    assert kept == {"march e", "up to the day before", "from april"}
+
+def test_put_after_an_invalidation_is_dropped():
+    cache = ResultCache()
+    generation = cache.generation    # read before the query runs
+    cache.invalidate({("2030-01-01", "e")})   # a write commits meanwhile
+    cache.put("stale", 1, MARCH_W, generation)
+    assert cache.get("stale") == (False, None)
+    cache.put("fresh", 2, MARCH_W, cache.generation)
+    assert cache.get("fresh") == (True, 2)
+
+def test_entries_expire():
+    cache = ResultCache(ttl=-1)
+    cache.put("key", 1, MARCH_W, cache.generation)
+    assert cache.get("key") == (False, None)
+    assert cache.stats()["expired"] == 1
+
+def save(database, amount, day, code):
+    sales = SalesList()
+    data = DailySales()
+    data.amount = amount
+    data.salesDate = date.fromisoformat(day)
+    data.region = database.get_regions().get(code)
+    sales.add(data)
+    database.save_all_sales(sales)
+
+def summary_key(start, end, region):
+    return ("summary", start, end, region, True)
+
+def test_write_drops_only_the_summaries_it_touches(database):
+    slices = [("2021-01-01", "2021-12-31", "w"), ("2021-01-01", "2021-12-31", "e"),
+              ("2022-01-01", None, None), (None, None, None)]
+    for start, end, region in slices:
+        database.get_sales_summary(start, end, region)
+    save(database, 50.0, "2021-06-01", "w")
+    cached = [database._cached(summary_key(*scope))[0] for scope in slices]
+    assert cached == [False, True, True, False]
+    assert database.get_sales_summary("2021-01-01", "2021-12-31", "w")["total"] == \
+        database.get_sales_summary("2021-01-01", "2021-12-31", "w", use_rollup=False)["total"]
+
+def test_stale_result_is_not_cached_after_a_commit(database):
+    key = summary_key(*MARCH_W)
+    generation = database._results.generation
+    save(database, 50.0, "2021-03-10", "w")
+    database._cache(key, {"total": "stale"}, MARCH_W, generation)
+    assert database._cached(key) == (False, None)
+
+def test_cached_results_are_copies(database):
+    summary = database.get_sales_summary()
+    summary["total"] = -1
+    summary["regions"].clear()
+    again = database.get_sales_summary()
+    assert again["total"] != -1 and again["regions"]
+
+    sale = database.get_sales(date(2021, 12, 22), "w")
+    amount = sale.amount
+    sale.amount = 0
+    assert database.get_sales(date(2021, 12, 22), "w").amount == amount
@@ -0,0 +1,68 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+from datetime import date
+
+import pytest
+
+from business import ColumnarSalesList, DailySales, Region, SalesList
+
+WEST = Region.intern("w", "West")
+EAST = Region.intern("e", "East")
+
+def sale(amount, day, region, id):
+    salesDate = date.fromisoformat(day)
+    return DailySales(amount=amount, salesDate=salesDate, region=region,
+                      quarter=(salesDate.month + 2) // 3, id=id)
+
+def sales():
+    return [sale(1200.5, "2021-01-04", WEST, 7), sale(310.0, "2021-05-17", EAST, 8),
+            sale(99.99, "2021-12-31", WEST, 9)]
+
+def both():
+    rows, columnar = SalesList(), ColumnarSalesList()
+    for data in sales():
+        rows.add(data)
+        columnar.add(data)
+    return rows, columnar
+
+def test_get_and_iteration_match_sales_list():
+    rows, columnar = both()
+    assert columnar.count == rows.count == 3
+    assert [columnar.get(i) for i in range(4)] == [rows.get(i) for i in range(4)]
+    assert list(columnar) == list(rows)
+    assert columnar.get(0).region is WEST
+
+def test_set_and_concat_match_sales_list():
+    rows, columnar = both()
+    changed = sale(5.0, "2021-08-02", EAST, 7)
+    rows.set(0, changed)
+    columnar.set(0, changed)
+    extra = SalesList()
+    extra.add(sale(42.0, "2022-02-02", EAST, 10))
+    rows.concat(extra)
+    columnar.concat(extra)
+    assert list(columnar) == list(rows)
+
+def test_add_row_matches_add():
+    columnar = ColumnarSalesList()
+    columnar.addRow(8, 310.0, "2021-05-17", "e", "East")
+    assert list(columnar) == [sales()[1]]
+
+def test_sales_read_back_are_copies():
+    _, columnar = both()
+    data = columnar.get(1)
+    data.amount = 0.0
+    assert columnar.get(1).amount == 310.0
+
+def test_bad_data_is_refused():
+    bad = sale(1.0, "2021-01-04", WEST, 1)
+    bad.amount = "?"
+    with pytest.raises(ValueError):
+        ColumnarSalesList().add(bad)
+
+def test_database_loads_the_same_sales(database):
+    assert list(database.get_all_sales(columnar=True)) == list(database.get_all_sales())
+    pages = database.iter_all_sales(100, columnar=True)
+    assert [data for page in pages for data in page] == list(database.get_all_sales())
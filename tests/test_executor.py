@@ -0,0 +1,135 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+import itertools
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import db
+from executor import QueryExecutor
+
+# a query that runs until it is interrupted
+ENDLESS_QUERY = '''WITH RECURSIVE numbers(n) AS
+                       (SELECT 1 UNION ALL SELECT n + 1 FROM numbers)
+                   SELECT COUNT(*) FROM numbers'''
+
+# how long the slow summary runs, and the longest the UI thread may go
+# without a tick meanwhile; generous, as the worker shares the GIL
+SLOW_SECONDS = 0.5
+MAX_STALL = 0.1
+
+class StubMaster:
+    """Stands in for the Tk root: after() callbacks run synchronously on
+    the test thread when run_until() pumps them, as mainloop would.
+
+    longest_gap is the longest the pump went between ticks, callbacks
+    included: how long a real UI would have stopped responding."""
+    def __init__(self):
+        self.callbacks = {}
+        self.ids = itertools.count(1)
+        self.longest_gap = 0.0
+
+    def after(self, ms, callback):
+        after_id = next(self.ids)
+        self.callbacks[after_id] = callback
+        return after_id
+
+    def after_cancel(self, after_id):
+        self.callbacks.pop(after_id, None)
+
+    def run_until(self, condition, timeout=5):
+        deadline = time.monotonic() + timeout
+        last_tick = time.monotonic()
+        while not condition():
+            assert time.monotonic() < deadline, "timed out waiting for the executor"
+            for after_id in list(self.callbacks):
+                self.callbacks.pop(after_id)()
+            time.sleep(0.001)
+            last_tick = self.__tick(last_tick)
+        self.__tick(last_tick)
+
+    def __tick(self, last_tick):
+        tick = time.monotonic()
+        self.longest_gap = max(self.longest_gap, tick - last_tick)
+        return tick
+
+@pytest.fixture
+def executor(database):
+    master = StubMaster()
+    queries = QueryExecutor(master)
+    yield master, queries
+    queries.shutdown()
+
+def test_superseded_requests_are_dropped(executor):
+    master, queries = executor
+    gate = threading.Event()
+    calls = []
+    done = []
+    # hold the worker so both page requests are still queued
+    queries.submit(None, gate.wait)
+    queries.submit("page", calls.append, 1, on_done=lambda result: done.append(1))
+    queries.submit("page", calls.append, 2, on_done=lambda result: done.append(2))
+    gate.set()
+    master.run_until(lambda: not queries.busy)
+    assert calls == [2]
+    assert done == [2]
+
+def test_running_request_is_interrupted(executor):
+    master, queries = executor
+    started = threading.Event()
+    delivered = []
+
+    def endless():
+        started.set()
+        return db._connection().execute(ENDLESS_QUERY).fetchone()
+
+    queries.submit("page", endless, on_done=delivered.append, on_error=delivered.append)
+    assert started.wait(5)
+    queries.submit("page", lambda: "newest", on_done=delivered.append,
+                   on_error=delivered.append)
+    master.run_until(lambda: not queries.busy)
+    assert delivered == ["newest"]
+
+def test_errors_reach_on_error(executor):
+    master, queries = executor
+    errors = []
+
+    def fail():
+        raise ValueError("no such sale")
+
+    queries.submit(None, fail, on_done=pytest.fail, on_error=errors.append)
+    master.run_until(lambda: not queries.busy)
+    assert len(errors) == 1
+    assert str(errors[0]) == "no such sale"
+
+def test_slow_summary_does_not_stall_the_ui_thread(executor):
+    master, queries = executor
+    results = []
+
+    def slow_summary():
+        # recompute the summary from the Sales table until it has run for
+        # a while, as a large database would
+        start = time.monotonic()
+        while time.monotonic() - start < SLOW_SECONDS:
+            db.clear_cache()
+            summary = db.get_sales_summary(use_rollup=False)
+        return summary
+
+    start = time.monotonic()
+    queries.submit("summary", slow_summary, on_done=results.append)
+    master.run_until(lambda: not queries.busy)
+    assert len(results) == 1
+    assert time.monotonic() - start >= SLOW_SECONDS
+    assert master.longest_gap < MAX_STALL, f"UI stalled {master.longest_gap * 1000:.0f} ms"
+
+def test_connection_failure_reaches_the_constructor(database, monkeypatch):
+    def open_connection():
+        raise sqlite3.OperationalError("unable to open database file")
+
+    monkeypatch.setattr(db, "open_connection", open_connection)
+    with pytest.raises(sqlite3.OperationalError):
+        QueryExecutor(StubMaster())
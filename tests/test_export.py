@@ -0,0 +1,25 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+import csv
+
+import pytest
+
+def test_export_writes_every_row(database, tmp_path):
+    path = tmp_path / "sales.csv"
+    written = database.export_sales_csv(str(path))
+    with open(path, newline="") as file:
+        rows = list(csv.reader(file))
+    assert written == len(rows) - 1   # less the header
+    assert written == database.get_sales_filtered().count
+
+def test_failed_export_removes_the_file(database, tmp_path):
+    path = tmp_path / "sales.csv"
+
+    def progress(written):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        database.export_sales_csv(str(path), progress=progress, chunk_size=1)
+    assert not path.exists()
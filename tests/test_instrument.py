@@ -0,0 +1,47 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+import time
+
+import pytest
+
+import instrument
+from instrument import instrumented
+
+EXPLAIN_SECONDS = 0.05
+
+@pytest.fixture
+def recording(monkeypatch):
+    def explain(sql):
+        # what the db explain does: runs a traced statement, and takes time
+        instrument.trace("EXPLAIN QUERY PLAN " + sql)
+        time.sleep(EXPLAIN_SECONDS)
+        return ["SCAN Sales"]
+
+    monkeypatch.setattr(instrument, "_explain", explain)
+    instrument.reset()
+    instrument.enable(slow_seconds=0)
+    yield
+    instrument.disable()
+    instrument.reset()
+
+@instrumented
+def inner():
+    instrument.trace("SELECT 1")
+
+@instrumented
+def outer():
+    inner()
+    inner()
+
+def test_nested_slow_calls_are_not_charged_for_explain(recording):
+    outer()
+    stats = instrument.stats()
+    assert stats["inner"]["statements"] == 2
+    assert stats["outer"]["statements"] == 2
+    assert stats["outer"]["max_seconds"] < EXPLAIN_SECONDS
+
+    log = instrument.slow_queries()
+    assert [entry["function"] for entry in log] == ["inner", "inner", "outer"]
+    assert log[0]["queries"] == [{"sql": "SELECT 1", "plan": ["SCAN Sales"]}]
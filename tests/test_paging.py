@@ -0,0 +1,39 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+from contextlib import closing
+
+import pytest
+
+# four sales share every date in the synthetic database, so these page
+# sizes put boundaries inside a run of tied dates as well as between them
+PAGE_SIZES = [1, 3, 4, 7]
+SLICES = [(None, "2000-01-10", None), ("2000-01-02", "2000-01-20", None),
+          ("2000-01-02", "2000-01-20", "w")]
+
+def expected_ids(database, start, end, region):
+    where, params = database._build_filters(start, end, region)
+    with closing(database._connection().cursor()) as c:
+        c.execute(f"SELECT ID FROM Sales {where} ORDER BY salesDate, region, ID", params)
+        return [row[0] for row in c.fetchall()]
+
+@pytest.mark.parametrize("start, end, region", SLICES)
+@pytest.mark.parametrize("size", PAGE_SIZES)
+def test_pages_return_every_row_once_in_order(synthetic_database, size, start, end, region):
+    ids, after = [], None
+    while True:
+        rows, after = synthetic_database.get_sales_page(start, end, region, after, size)
+        assert len(rows) <= size
+        ids.extend(row[0] for row in rows)
+        if after is None:
+            break
+    assert ids == expected_ids(synthetic_database, start, end, region)
+
+@pytest.mark.parametrize("columnar", [False, True])
+@pytest.mark.parametrize("size", PAGE_SIZES)
+def test_batches_return_every_row_once_in_order(synthetic_database, size, columnar):
+    batches = synthetic_database.iter_sales_filtered("2000-01-02", "2000-01-20",
+                                                     batch_size=size, columnar=columnar)
+    ids = [data.id for batch in batches for data in batch]
+    assert ids == expected_ids(synthetic_database, "2000-01-02", "2000-01-20", None)
@@ -0,0 +1,56 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+from business import AMOUNT_COLUMN, DATE_COLUMN, parse_sales_chunk, read_sales_chunks
+
+def test_clean_rows():
+    chunk = parse_sales_chunk([("12.5", "2021-01-05"), ("3", "2021-01-06")])
+    assert chunk.errors == []
+    assert chunk.goodRows("w") == [(12.5, "2021-01-05", "w"), (3.0, "2021-01-06", "w")]
+    assert chunk.goodTotal() == 15.5
+
+def test_bad_amount():
+    chunk = parse_sales_chunk([("1", "2021-01-05"), ("ten", "2021-01-06")])
+    assert chunk.errors == [(2, AMOUNT_COLUMN, "'ten' is not a number")]
+    assert chunk.goodRows("w") == [(1.0, "2021-01-05", "w")]
+
+def test_impossible_date():
+    chunk = parse_sales_chunk([("1", "2021-02-30")])
+    assert chunk.errors == [(1, DATE_COLUMN, "'2021-02-30' is not a real date")]
+    assert chunk.goodRows("w") == []
+
+def test_non_iso_date_is_accepted_and_stored_as_iso():
+    chunk = parse_sales_chunk([("1", "2021-1-5"), ("2", "2021-01-06")])
+    assert chunk.errors == []
+    assert chunk.goodRows("w") == [(1.0, "2021-01-05", "w"), (2.0, "2021-01-06", "w")]
+
+def test_malformed_date():
+    chunk = parse_sales_chunk([("1", "05/01/2021"), ("2", "20210105")])
+    assert chunk.errors == [(1, DATE_COLUMN, "'05/01/2021' is not in YYYY-MM-DD format"),
+                            (2, DATE_COLUMN, "'20210105' is not in YYYY-MM-DD format")]
+
+def test_short_and_blank_rows():
+    rows = [["1", "2021-01-05"], ["2"], [], ["3", "2021-01-07"]]
+    chunks = list(read_sales_chunks(iter(rows)))
+    errors = [error for chunk in chunks for error in chunk.errors]
+    assert errors == [(2, None, "expected an amount and a date"),
+                      (3, None, "expected an amount and a date")]
+    assert [row for chunk in chunks for row in chunk.goodRows("w")] == \
+        [(1.0, "2021-01-05", "w"), (3.0, "2021-01-07", "w")]
+
+def test_bad_rows_on_a_chunk_boundary():
+    rows = [[str(day), f"2021-01-{day:02}"] for day in range(1, 11)]
+    rows[3][0] = "x"            # last row of the first chunk
+    rows[4][1] = "2021-13-01"   # first row of the second
+    rows[7] = ["8"]             # last row of the second
+    chunks = list(read_sales_chunks(iter(rows), chunk_size=4))
+    assert [(chunk.firstRow, chunk.count) for chunk in chunks] == [(1, 4), (5, 4), (9, 2)]
+    assert [chunk.errors for chunk in chunks] == [
+        [(4, AMOUNT_COLUMN, "'x' is not a number")],
+        [(5, DATE_COLUMN, "'2021-13-01' is not a real date"),
+         (8, None, "expected an amount and a date")],
+        [],
+    ]
+    good = [row for chunk in chunks for row in chunk.goodRows("w")]
+    assert [amount for amount, sales_date, region in good] == [1, 2, 3, 6, 7, 9, 10]
@@ -0,0 +1,16 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+def test_every_filter_shape_uses_an_index(database):
+    assert database.check_query_plans() == []
+
+def test_a_dropped_index_is_reported(database):
+    # make sure the check can fail: without the region index, filtering a
+    # region alone has to scan
+    with database.writing() as writer:
+        writer.execute("DROP INDEX idx_sales_region_date")
+        writer.execute("DROP INDEX idx_salesdaily_region_date")
+    problems = database.check_query_plans()
+    assert problems
+    assert all(shape["region"] for shape, detail in problems)
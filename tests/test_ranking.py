@@ -0,0 +1,89 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+import math
+import random
+from datetime import date
+
+import pytest
+
+from business import DailySales, SalesList
+from ranking import QuantileSketch, TopN
+
+def nearest_rank(values, q):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(q * len(ordered))) - 1]
+
+def test_top_n_keeps_the_n_largest():
+    rng = random.Random(7)
+    values = [rng.uniform(0, 1000) for _ in range(500)]
+    top = TopN(10)
+    for index, value in enumerate(values):
+        top.add(value, index)
+    assert [value for value, index in top.items()] == sorted(values, reverse=True)[:10]
+    assert all(values[index] == value for value, index in top.items())
+
+def test_top_n_of_zero_keeps_nothing():
+    top = TopN(0)
+    top.add(5.0, "2021-01-01")
+    assert top.items() == []
+
+def test_top_n_ties_keep_the_first_added():
+    top = TopN(2)
+    for day in ("2021-01-01", "2021-01-02", "2021-01-03"):
+        top.add(10.0, day)
+    assert top.items() == [(10.0, "2021-01-01"), (10.0, "2021-01-02")]
+
+def test_top_n_merge_equals_one_pass():
+    rng = random.Random(11)
+    values = [rng.randint(0, 50) for _ in range(300)]
+    whole, first, second = TopN(15), TopN(15), TopN(15)
+    for index, value in enumerate(values):
+        whole.add(value, index)
+        (first if index < 150 else second).add(value, index)
+    first.merge(second)
+    assert first.items() == whole.items()
+
+@pytest.mark.parametrize("count", [1, 2, 10, 999])
+def test_exact_sketch_is_nearest_rank(count):
+    rng = random.Random(count)
+    values = [rng.uniform(-100, 100) for _ in range(count)]
+    sketch = QuantileSketch(k=None)
+    sketch.extend(values)
+    qs = [0.0, 0.01, 0.25, 0.5, 0.9, 0.99, 1.0]
+    assert sketch.exact
+    assert sketch.quantiles(qs) == [nearest_rank(values, q) for q in qs]
+
+def test_sketch_merge_keeps_the_count():
+    rng = random.Random(3)
+    first, second = QuantileSketch(k=50), QuantileSketch(k=50)
+    first.extend(rng.random() for _ in range(5000))
+    second.extend(rng.random() for _ in range(3000))
+    first.merge(second)
+    assert first.count == 8000
+    assert not first.exact
+    # still close: rank error is about 1.7 / k of the count
+    assert abs(first.quantile(0.5) - 0.5) < 0.1
+
+def test_rankings_accept_zero_and_reject_negative(database):
+    rankings = database.get_sales_rankings(top=0, top_per_region=0)
+    assert rankings["top_days"] == []
+    assert all(days == [] for days in rankings["top_by_region"].values())
+    with pytest.raises(ValueError):
+        database.get_sales_rankings(top=-1)
+
+def test_rankings_break_ties_like_the_summary(database):
+    with database.writing() as writer:
+        writer.execute("DELETE FROM Sales")
+        writer.execute("DELETE FROM SalesDaily")
+    sales = SalesList()
+    for day, amount in (("2022-03-02", 100.0), ("2022-03-01", 100.0), ("2022-03-03", 50.0)):
+        data = DailySales()
+        data.amount = amount
+        data.salesDate = date.fromisoformat(day)
+        data.region = database.get_regions().get("w")
+        sales.add(data)
+    database.save_all_sales(sales)
+    best = database.get_sales_rankings(top=1)["top_days"][0]["salesDate"]
+    assert best == database.get_sales_summary()["top_day"]["salesDate"] == "2022-03-01"
@@ -0,0 +1,35 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+import gc
+import threading
+
+import pytest
+
+import db
+
+def read_on_thread():
+    thread = threading.Thread(target=db.get_regions)
+    thread.start()
+    thread.join()
+
+def test_thread_reader_is_released_when_the_thread_exits(database):
+    database.get_regions()
+    before = len(database._readers)
+    for _ in range(20):
+        database.invalidate_regions()   # so each thread really reads
+        read_on_thread()
+    gc.collect()
+    assert len(database._readers) == before
+
+def test_reading_before_connect_says_so():
+    saved = db._db_path
+    db._db_path = None
+    try:
+        with pytest.raises(RuntimeError, match="connect"):
+            db._reader()
+        with pytest.raises(RuntimeError, match="connect"):
+            db.open_connection()
+    finally:
+        db._db_path = saved
@@ -0,0 +1,60 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+import sqlite3
+import threading
+from contextlib import closing
+
+def test_regions_are_loaded_once(database, monkeypatch):
+    regions = database.get_regions()
+
+    def no_query():
+        raise AssertionError("get_regions() queried the database again")
+
+    monkeypatch.setattr(database, "_connection", no_query)
+    monkeypatch.setattr(database, "_data_version", no_query)
+    assert database.get_regions() is regions
+
+def test_own_writes_keep_the_regions(database):
+    regions = database.get_regions()
+    with database.writing() as writer:
+        writer.execute("UPDATE Sales SET amount = amount + 1 WHERE ID = (SELECT MIN(ID) FROM Sales)")
+    database.check_regions()
+    assert database.get_regions() is regions
+
+def test_another_process_edit_is_found_by_check_regions(database, tmp_path):
+    regions = database.get_regions()
+    code = regions.codes[0]
+    with closing(sqlite3.connect(tmp_path / "sales_db.sqlite")) as other:
+        with other:
+            other.execute("UPDATE Region SET name = 'Renamed' WHERE code = ?", (code,))
+    assert database.get_regions() is regions   # only checked on request
+    database.check_regions()
+    assert database.get_regions().get(code).name == "Renamed"
+
+def test_check_regions_waits_for_a_write_in_progress(database):
+    database.get_regions()
+    writing = threading.Event()
+    release = threading.Event()
+    checked = threading.Event()
+
+    def write():
+        with database.writing():
+            writing.set()
+            release.wait(5)
+
+    def check():
+        database.check_regions()
+        checked.set()
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    assert writing.wait(5)
+    checker = threading.Thread(target=check)
+    checker.start()
+    assert not checked.wait(0.2)   # the writer connection is busy
+    release.set()
+    writer.join()
+    assert checked.wait(5)
+    checker.join()
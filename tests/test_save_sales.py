@@ -0,0 +1,92 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+import sqlite3
+from contextlib import closing
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+import db
+from business import DailySales, SalesList
+
+REPO_DUMP = Path(db.__file__).resolve().parent / "sales_db.sql"
+
+def sales(*entries):
+    sales_list = SalesList()
+    regions = db.get_regions()
+    for amount, day, code in entries:
+        data = DailySales()
+        data.amount = amount
+        data.salesDate = date.fromisoformat(day)
+        data.region = regions.get(code)
+        sales_list.add(data)
+    return sales_list
+
+def stored(day, code):
+    rows = db._connection().execute(
+        "SELECT amount FROM Sales WHERE salesDate = ? AND region = ?", (day, code)).fetchall()
+    return [row["amount"] for row in rows]
+
+def test_new_sales_are_inserted(database):
+    stats = database.save_all_sales(sales((10.0, "2030-01-01", "w"), (20.0, "2030-06-01", "e")))
+    assert (stats["inserted"], stats["updated"], stats["rows"]) == (2, 0, 2)
+    assert stored("2030-01-01", "w") == [10.0]
+    assert database.verify_rollup() == []
+
+@pytest.mark.parametrize("mode, expected", [("replace", 5.0), ("accumulate", 15.0)])
+def test_saved_pair_is_replaced_or_added_to(database, mode, expected):
+    database.save_all_sales(sales((10.0, "2030-01-01", "w")))
+    # a sparse list: the other sale is years away
+    stats = database.save_all_sales(sales((5.0, "2030-01-01", "w"), (7.0, "2035-01-01", "w")),
+                                    mode=mode)
+    assert (stats["inserted"], stats["updated"]) == (1, 1)
+    assert stored("2030-01-01", "w") == [expected]
+    assert database.get_sales_summary("2030-01-01", "2030-01-01")["total"] == expected
+    assert database.verify_rollup() == []
+
+@pytest.mark.parametrize("mode, expected", [("replace", 3.0), ("accumulate", 6.0)])
+def test_pair_repeated_in_one_save(database, mode, expected):
+    stats = database.save_all_sales(
+        sales((1.0, "2030-01-01", "w"), (2.0, "2030-01-01", "w"), (3.0, "2030-01-01", "w")),
+        mode=mode)
+    assert (stats["inserted"], stats["updated"]) == (1, 2)
+    assert stored("2030-01-01", "w") == [expected]
+    assert database.verify_rollup() == []
+
+def test_saved_ids_point_at_the_stored_rows(database):
+    database.save_all_sales(sales((10.0, "2030-01-01", "w")))
+    sales_list = sales((1.0, "2030-01-01", "w"), (2.0, "2030-01-02", "w"))
+    database.save_all_sales(sales_list, chunk_size=1)
+    for data in sales_list:
+        row = db._connection().execute("SELECT salesDate FROM Sales WHERE ID = ?",
+                                       (data.id,)).fetchone()
+        assert row["salesDate"] == data.salesDate.isoformat()
+
+def test_migration_merges_duplicate_sales(tmp_path):
+    path = tmp_path / "old.sqlite"
+    with closing(sqlite3.connect(path)) as old:
+        old.executescript(REPO_DUMP.read_text(encoding="utf-8"))
+        with old:
+            old.executemany("INSERT INTO Sales (amount, salesDate, region) VALUES (?, ?, ?)",
+                            [(100.0, "2030-01-01", "w"), (25.5, "2030-01-01", "w"),
+                             (4.5, "2030-01-01", "w"), (9.0, "2030-01-01", "e")])
+        first_id = old.execute("SELECT MIN(ID) FROM Sales WHERE salesDate = '2030-01-01' "
+                               "AND region = 'w'").fetchone()[0]
+        before = old.execute("SELECT SUM(amount), COUNT(DISTINCT salesDate || region) "
+                             "FROM Sales").fetchone()
+
+    db.connect(str(path))
+    try:
+        rows = db._connection().execute(
+            "SELECT ID, amount FROM Sales WHERE salesDate = '2030-01-01' AND region = 'w'"
+        ).fetchall()
+        assert [tuple(row) for row in rows] == [(first_id, 130.0)]
+        assert stored("2030-01-01", "e") == [9.0]
+        after = db._connection().execute("SELECT SUM(amount), COUNT(*) FROM Sales").fetchone()
+        assert tuple(after) == pytest.approx(tuple(before))
+        assert db.verify_rollup() == []
+    finally:
+        db.close()
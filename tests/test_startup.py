@@ -0,0 +1,18 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+import subprocess
+import sys
+from pathlib import Path
+
+# modules the console startup leaves to the commands that need them;
+# `python benchmark.py startup` checks the time budget itself
+DEFERRED = ["tkinter", "argparse", "concurrent.futures", "gzip", "zlib"]
+
+def test_console_startup_defers_heavy_imports():
+    script = ("import sys, db, ui; "
+              f"print(' '.join(name for name in {DEFERRED!r} if name in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True,
+                            text=True, check=True, cwd=Path(__file__).parent.parent)
+    assert result.stdout.split() == []
@@ -0,0 +1,81 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+from datetime import date, timedelta
+
+import pytest
+
+import db
+
+BASE = ("2000-03-01", "2000-08-31")
+
+@pytest.fixture
+def partial_calls(synthetic_database, monkeypatch):
+    """The (start, end) of every slice get_sales_summary reads."""
+    calls = []
+    summary_partial = db._summary_partial
+
+    def spy(start_date, end_date, region, use_rollup):
+        if use_rollup:
+            calls.append((start_date, end_date))
+        return summary_partial(start_date, end_date, region, use_rollup)
+
+    monkeypatch.setattr(db, "_summary_partial", spy)
+    return calls
+
+def assert_matches_full_recompute(start, end, region=None):
+    summary = db.get_sales_summary(start, end, region)
+    expected = db.get_sales_summary(start, end, region, use_rollup=False)
+    assert summary["count"] == expected["count"]
+    assert summary["total"] == pytest.approx(expected["total"])
+    assert [(row["code"], row["count"]) for row in summary["regions"]] == \
+        [(row["code"], row["count"]) for row in expected["regions"]]
+    assert [row["total"] for row in summary["regions"]] == \
+        pytest.approx([row["total"] for row in expected["regions"]])
+    assert [(row["year"], row["quarter"]) for row in summary["quarters"]] == \
+        [(row["year"], row["quarter"]) for row in expected["quarters"]]
+    assert [row["total"] for row in summary["quarters"]] == \
+        pytest.approx([row["total"] for row in expected["quarters"]])
+    assert summary["top_day"]["salesDate"] == expected["top_day"]["salesDate"]
+    assert summary["top_day"]["total"] == pytest.approx(expected["top_day"]["total"])
+
+@pytest.mark.parametrize("start, end, read", [
+    # slid 3 days later: drop 3 days at the start, add 3 at the end
+    ("2000-03-04", "2000-09-03", [("2000-03-01", "2000-03-03"), ("2000-09-01", "2000-09-03")]),
+    # widened on both sides
+    ("2000-02-20", "2000-09-10", [("2000-02-20", "2000-02-29"), ("2000-09-01", "2000-09-10")]),
+    # shrunk at the end only
+    ("2000-03-01", "2000-08-20", [("2000-08-21", "2000-08-31")]),
+])
+def test_nudged_range_reads_only_the_changed_days(partial_calls, start, end, read):
+    top_day = db.get_sales_summary(*BASE)["top_day"]["salesDate"]
+    assert start <= top_day <= end   # else the summary is rightly read in full
+    partial_calls.clear()
+    assert_matches_full_recompute(start, end)
+    assert partial_calls == read
+
+def test_region_filtered_range(partial_calls):
+    db.get_sales_summary(*BASE, region="w")
+    assert_matches_full_recompute("2000-03-02", "2000-09-01", region="w")
+    assert partial_calls[1:] == [("2000-03-01", "2000-03-01"), ("2000-09-01", "2000-09-01")]
+
+def test_write_inside_the_last_range_is_not_missed(partial_calls):
+    db.get_sales_summary(*BASE)
+    sale = db._connection().execute(
+        "SELECT ID FROM Sales WHERE salesDate = '2000-05-05' AND region = 'e'").fetchone()
+    db.update_sales_amounts([(sale["ID"], 1_000_000.0)])
+    partial_calls.clear()
+    assert_matches_full_recompute("2000-03-02", "2000-09-01")
+    # the write dropped the last partial sums, so the range is read in full
+    assert partial_calls == [("2000-03-02", "2000-09-01")]
+    assert db.get_sales_summary("2000-03-02", "2000-09-01")["top_day"]["salesDate"] == "2000-05-05"
+
+def test_best_day_leaving_the_range_recomputes(partial_calls):
+    top_day = db.get_sales_summary(*BASE)["top_day"]["salesDate"]
+    # start the new range the day after the old best day
+    start = date.fromisoformat(top_day) + timedelta(days=1)
+    end = date.fromisoformat(BASE[1]) + timedelta(days=30)
+    partial_calls.clear()
+    assert_matches_full_recompute(start.isoformat(), end.isoformat())
+    assert partial_calls == [(start.isoformat(), end.isoformat())]
@@ -0,0 +1,65 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+import time
+
+import pytest
+
+import benchmark
+import db
+from business import DailySales
+
+ROWS = 10_000
+
+@pytest.fixture
+def sales_db(tmp_path):
+    """A database of ROWS synthetic sales; returns their IDs in order."""
+    path = str(tmp_path / "sales_bench.sqlite")
+    benchmark.generate_database(path, ROWS)
+    db.connect(path)
+    yield [row["ID"] for row in db._connection().execute("SELECT ID FROM Sales ORDER BY ID")]
+    db.close()
+
+def stored_amounts(ids):
+    placeholders = ", ".join("?" * len(ids))
+    rows = db._connection().execute(
+        f"SELECT ID, amount FROM Sales WHERE ID IN ({placeholders})", list(ids))
+    return {row["ID"]: row["amount"] for row in rows}
+
+def test_updates_rows_and_reports_missing(sales_db):
+    first, second = sales_db[:2]
+    unknown = sales_db[-1] + 1
+    stats = db.update_sales_amounts([(first, 5.0), (second, 6.5), (unknown, 7.0)])
+    assert stats["rows"] == 2
+    assert stats["missing"] == [unknown]
+    assert stored_amounts([first, second]) == {first: 5.0, second: 6.5}
+
+def test_last_amount_wins(sales_db):
+    first, second = sales_db[:2]
+    stats = db.update_sales_amounts([(first, 1.0), (second, 2.0), (first, 9.0)])
+    assert stats["rows"] == 2
+    assert stored_amounts([first, second]) == {first: 9.0, second: 2.0}
+
+def test_rollup_matches_sales(sales_db):
+    db.update_sales_amounts([(sales_id, sales_id % 50 + 0.25)
+                             for sales_id in sales_db[::7]])
+    assert db.verify_rollup() == []
+
+def test_batch_is_faster_than_one_at_a_time(sales_db):
+    ids = sales_db
+
+    start = time.perf_counter()
+    for sales_id in ids:
+        data = DailySales()
+        data.id = sales_id
+        data.amount = float(sales_id % 997 + 1)
+        db.update_sales_amount(data)
+    one_at_a_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    db.update_sales_amounts([(sales_id, float(sales_id % 997 + 2)) for sales_id in ids])
+    batch = time.perf_counter() - start
+
+    assert batch < one_at_a_time
+    assert db.verify_rollup() == []
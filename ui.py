@@ -2,9 +2,6 @@
 #12/02/2025
 #Project12
 import os
-# Set current working directory to the script's directory
-script_dir = os.path.dirname(os.path.abspath(__file__))
-os.chdir(script_dir)
 
 import db
 import sales
@@ -13,7 +10,16 @@ from business import File, Regions, DailySales, SalesList, DATE_FORMAT, FileImpo
 from decimal import Decimal, ROUND_HALF_UP
 
 import locale as lc
-lc.setlocale(lc.LC_ALL, "en_US")
+
+# sales shown per page by the view command
+PAGE_SIZE = 20
+
+# what saving or importing a sale does when its date and region already
+# have a saved sale, as described to the user
+MODE_DESCRIPTIONS = {
+    "replace": "replace the saved amount",
+    "accumulate": "add to the saved amount",
+}
 
 def display_title():
     print("SALES DATA IMPORTER")
@@ -24,46 +30,99 @@ def display_menu():
     print("view   - View all sales")
     print("add    - Add sales")
     print("import - Import sales from file")
+    print("batch  - Import all sales files in a folder or pattern")
+    print("mode   - Choose whether sales for a saved date and region replace or add to it")
     print("menu   - Show menu")
     print("exit   - Exit program")
     print()
 
-def view_sales(sales_list):
-    if sales_list.count == 0:
-        print("No sales to view.\n")
+def display_header():
+    print(f"{'':5}{'Date':15}{'Quarter':15}{'Region':10}{'Amount':>15}")
+    print("-" * 60)
+
+def display_sale(num, data):
+    """Print one numbered sale and return its amount as a Decimal."""
+    if data.hasBadData:
+        number = f"{num}.*"  # add period and asterisk to number
     else:
-        total = Decimal("0.0")
-        sales_list.hasBadData = False
+        number = f"{num}."   # just add period
+
+    amount = data.amount
+    value = Decimal("0.0")
+    if not data.hasBadAmount:
+        value = Decimal(amount)
+        amount = lc.currency(amount, grouping=True)
+
+    dt = data.salesDate
+    if not data.hasBadSalesDate:
+        dt = f"{dt:{DATE_FORMAT}}"
+
+    region = data.region.name
+    quarter = f"{data.quarter}"
     
-        print(f"{'':5}{'Date':15}{'Quarter':15}{'Region':10}{'Amount':>15}")
-        print("-" * 60)
-        for num, data in enumerate(sales_list, start=1):
-            if data.hasBadData:
-                sales_list.hasBadData = True
-                number = f"{num}.*"  # add period and asterisk to number
-            else:
-                number = f"{num}."   # just add period
-
-            amount = data.amount
-            if not data.hasBadAmount:
-                total += Decimal(amount)
-                amount = lc.currency(amount, grouping=True)
-
-            dt = data.salesDate
-            if not data.hasBadSalesDate:
-                dt = f"{dt:{DATE_FORMAT}}"
-
-            region = data.region.name
-            quarter = f"{data.quarter}"
-            
-            print(f"{number:5}{dt:15}{quarter:15}{region:10}{amount:>15}")
-
-        total = total.quantize(Decimal("1.00"), ROUND_HALF_UP)
-        total = lc.currency(total, grouping=True)
-        print("-" * 60)
-        print(f"TOTAL:{total:>54}\n")
-
-def add_sales(sales_list, regions):
+    print(f"{number:5}{dt:15}{quarter:15}{region:10}{amount:>15}")
+    return value
+
+def display_total(total):
+    total = Decimal(total).quantize(Decimal("1.00"), ROUND_HALF_UP)
+    total = lc.currency(total, grouping=True)
+    print("-" * 60)
+    print(f"TOTAL:{total:>54}\n")
+
+def view_sales(unsaved_sales, mode):
+    """Page through the saved sales, then list the sales not saved yet."""
+    # the pages are only read, so the compact columnar list will do
+    pages = db.iter_all_sales(PAGE_SIZE, columnar=True)
+    page = next(pages, None)
+    if page is None and unsaved_sales.count == 0:
+        print("No sales to view.\n")
+        return
+
+    num = 0
+    display_header()
+    while page is not None:
+        for data in page:
+            num += 1
+            display_sale(num, data)
+        if page.count < PAGE_SIZE:
+            break
+        more = input("Press Enter for more sales or 'q' to stop: ")
+        if more.strip().lower() == "q":
+            break
+        page = next(pages, None)
+    pages.close()
+
+    for data in unsaved_sales:
+        num += 1
+        display_sale(num, data)
+
+    # the total covers every sale, even pages the user skipped, as it
+    # will be once the unsaved sales are saved in this mode
+    saved_total = db.get_sales_summary()["total"]
+    display_total(Decimal(saved_total) + unsaved_change(unsaved_sales, mode))
+
+def unsaved_change(unsaved_sales, mode):
+    """Return how much saving the unsaved sales in mode will change the total."""
+    change = Decimal("0.0")
+    amounts = {}   # (date, region code) -> amount once the sales before are saved
+    for data in unsaved_sales:
+        if data.hasBadData:
+            continue
+        key = (data.salesDate, data.region.code)
+        if key not in amounts:
+            saved = db.get_sales(data.salesDate, data.region.code)
+            amounts[key] = Decimal(saved.amount) if saved else None
+        amount = Decimal(data.amount)
+        old = amounts[key]
+        if old is None or mode == "accumulate":
+            change += amount
+            amounts[key] = amount if old is None else old + amount
+        else:
+            change += amount - old
+            amounts[key] = amount
+    return change
+
+def add_sales(sales_list, regions, mode):
     # get the sales data
     data = DailySales()
     data.amount = sales.get_amount()
@@ -76,9 +135,32 @@ def add_sales(sales_list, regions):
     sales_list.add(data)
 
     # notify user
-    print(f"Sales for {data.salesDate:{DATE_FORMAT}} added.\n")
+    print(f"Sales for {data.salesDate:{DATE_FORMAT}} added.")
+    saved = db.get_sales(data.salesDate, data.region.code)
+    if saved:
+        amount = lc.currency(saved.amount, grouping=True)
+        print(f"{data.region.name} already has {amount} saved for that date; "
+              f"on exit this sale will {MODE_DESCRIPTIONS[mode]}.")
+    print()
+
+def choose_mode(mode):
+    """Ask for the import mode and return it; Enter keeps the current one."""
+    print(f"Sales for a date and region that already have a saved sale "
+          f"currently {MODE_DESCRIPTIONS[mode]}.")
+    while True:
+        choice = input(f"Enter {' or '.join(db.IMPORT_MODES)} (Enter to keep {mode}): ")
+        choice = choice.strip().lower() or mode
+        if choice in db.IMPORT_MODES:
+            print(f"Sales will {MODE_DESCRIPTIONS[choice]}.\n")
+            return choice
+        print("Invalid mode. Please try again.")
+
+def describe_updates(report, mode):
+    """Return e.g. '3 new, 2 replacing sales already saved' for a report."""
+    verb = "replacing" if mode == "replace" else "added to"
+    return f"{report['inserted']} new, {report['updated']} {verb} sales already saved"
 
-def import_sales(sales_list, regions):
+def import_sales(regions, mode):
     # get file name from user 
     file_name = input("Enter name of file to import: ")
     print()
@@ -87,54 +169,112 @@ def import_sales(sales_list, regions):
     file.region = regions.get(file.getRegionCode())
 
     try:
-        # import sales data from file
-        imported_sales = db.import_sales(file, regions)
+        # stream the file straight into the database
+        result = db.import_sales_streaming(file, regions, mode=mode)
 
-        # display results
-        view_sales(imported_sales)
-
-        # if has bad data, notify user to correct
-        if imported_sales.hasBadData:
+        # if has bad data, report the rows and notify user to correct
+        if result["bad_rows"] > 0:
+            for row, column, reason in result["errors"]:
+                if column:
+                    print(f"Row {row}, {column}: {reason}")
+                else:
+                    print(f"Row {row}: {reason}")
+            # a row can have an error in each column
+            shown_rows = {row for row, column, reason in result["errors"]}
+            hidden = result["bad_rows"] - len(shown_rows)
+            if hidden > 0:
+                print(f"...and {hidden} more bad rows.")
+            print()
             print(f"File '{file.name}' contains bad data.")
             print("Please correct the data in the file and try again.\n")
+        elif result["rows"] == 0:
+            print(f"File '{file.name}' has no sales to import.\n")
         else:
-            # if there are any sales, add to sales list and
-            # store name of imported file
-            if imported_sales.count > 0:
-                sales_list.concat(imported_sales)
-                print("Imported sales added to list.\n")
-                db.add_imported_file(file)
-                    
+            total = lc.currency(result["total"], grouping=True)
+            print(f"{result['rows']} imported sales totaling {total} saved "
+                  f"({describe_updates(result, mode)}).\n")
+
     except FileImportError as e:
         print(e)
 
+def batch_import_sales(regions, mode):
+    # get a folder or a glob pattern such as imports/sales_q1_2025_*.csv
+    pattern = input("Enter folder or file pattern to import: ").strip()
+    print()
+
+    import glob
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "sales_q?_????_?.csv")
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        print(f"No files match '{pattern}'.\n")
+        return
+
+    reports, totals = db.import_sales_batch(paths, regions, mode=mode)
+
+    print(f"{'File':25}{'Rows':>10}{'Updated':>10}{'Bad rows':>10}{'Seconds':>10}  Status")
+    print("-" * 80)
+    for report in sorted(reports, key=lambda report: report["file"]):
+        if "error" in report:
+            status = report["error"]
+        elif report["bad_rows"] > 0:
+            status = "bad data, not imported"
+        elif report["rows"] == 0:
+            status = "no sales"
+        else:
+            status = "imported"
+        print(f"{report['file']:25}{report['rows']:>10,}{report['updated']:>10,}"
+              f"{report['bad_rows']:>10,}{report['seconds']:>10.2f}  {status}")
+    print("-" * 80)
+    print(f"{totals['files']} files, {totals['rows']:,} rows imported "
+          f"({describe_updates(totals, mode)}) in {totals['seconds']:.2f} seconds "
+          f"({totals['rows_per_sec']:,.0f} rows/sec).\n")
+
 def main():
+    # work from the script's folder so the database and sales files are
+    # found however the program was started; done here rather than at
+    # import so importing ui has no side effects
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        lc.setlocale(lc.LC_ALL, "en_US")
+    except lc.Error:
+        lc.setlocale(lc.LC_ALL, "")
+
     display_title()
     display_menu()
 
     db.connect()
 
-    sales_list = db.get_all_sales()
-    if sales_list == None:
-        sales_list = SalesList()
-        
+    # only the regions are loaded up front; saved sales are paged in from
+    # the database by the view command, and this list only holds sales
+    # added during this session
     regions = db.get_regions()
+    sales_list = SalesList()
+    mode = "replace"
 
     # start a loop to handle commands
     while True:
         command = input("Please enter a command: ").lower()
         if command == "view":
-            view_sales(sales_list)
+            view_sales(sales_list, mode)
         elif command == "add":
-            add_sales(sales_list, regions)
+            add_sales(sales_list, regions, mode)
         elif command == "import":
-            import_sales(sales_list, regions)
+            import_sales(regions, mode)
+        elif command == "batch":
+            batch_import_sales(regions, mode)
+        elif command == "mode":
+            print()
+            mode = choose_mode(mode)
         elif command == "menu":
             print()
             display_menu()
         elif command == "exit":
             print()
-            db.save_all_sales(sales_list)
+            stats = db.save_all_sales(sales_list, mode=mode)
+            if stats["rows"] > 0:
+                print(f"Saved {stats['rows']} sales ({describe_updates(stats, mode)}; "
+                      f"{stats['rows_per_sec']:,.0f} rows/sec).\n")
             break
         else:
             print("Invalid command. Please try again.")
@@ -0,0 +1,340 @@
+#Lawkins
+#12/02/2025
+#Project12
+
+"""
+This module holds the Tk widgets the GUI builds its large tables from.
+"""
+
+import tkinter as tk
+from array import array
+from tkinter import ttk
+
+# rows asked for per fetch while scrolling, and per fetch while loading
+# the rest of a slice so it can be sorted
+PAGE_ROWS = 500
+BULK_PAGE_ROWS = 20000
+
+# fetch the next page once the view is this close to the last loaded row
+PREFETCH_ROWS = 100
+
+# shown in the cells of rows that are still being fetched
+LOADING_TEXT = "…"
+
+
+class ColumnStore:
+    """Table rows kept a column at a time.
+
+    A column with a typecode is an array of that type, so numbers cost 8
+    bytes each instead of a Python object; a column with typecode None is
+    a list, where repeated strings such as region codes share one object.
+    sort() orders the rows through an array of row numbers, leaving the
+    columns as loaded.
+    """
+    def __init__(self, typecodes):
+        self.typecodes = list(typecodes)
+        self.clear()
+
+    def clear(self):
+        self.__columns = [array(code) if code else [] for code in self.typecodes]
+        self.__order = None
+
+    def __len__(self):
+        return len(self.__columns[0])
+
+    @property
+    def sorted(self):
+        return self.__order is not None
+
+    def append(self, rows):
+        """Add rows, a list of tuples with a value per column."""
+        if not rows:
+            return
+        for column, values in zip(self.__columns, zip(*rows)):
+            column.extend(values)
+        if self.__order is not None:
+            # new rows go to the end until the next sort
+            self.__order.extend(range(len(self.__order), len(self)))
+
+    def row(self, index):
+        """Return the values of the row shown at index."""
+        if self.__order is not None:
+            index = self.__order[index]
+        return tuple(column[index] for column in self.__columns)
+
+    def sort(self, column, reverse=False):
+        values = self.__columns[column]
+        # a stable sort, so rows with equal values keep their loaded order
+        self.__order = array("q", sorted(range(len(values)),
+                                         key=values.__getitem__, reverse=reverse))
+
+    def unsort(self):
+        self.__order = None
+
+
+class VirtualTable(ttk.Frame):
+    """A read-only table that only builds Tk items for the rows in view.
+
+    columns is a list of (heading, typecode, format) for a ColumnStore,
+    where format turns a stored value into cell text (str if None). The
+    Treeview holds exactly `height` items whose values are replaced as the
+    view scrolls, so drawing costs O(visible rows) however many are loaded.
+
+    Rows come from fetch(limit, done), which must ask for the next `limit`
+    rows of the slice, typically on a QueryExecutor, and later call
+    done(rows, more) on the Tk thread with a list of row tuples and whether
+    any rows remain. The table asks again when the view nears the last
+    loaded row. Clicking a heading sorts by that column in memory; rows not
+    fetched yet are fetched first, and the database is never asked to sort.
+    """
+    def __init__(self, parent, columns, fetch, height=10):
+        super().__init__(parent)
+        self.fetch = fetch
+        self.height = height
+        self.headings = [heading for heading, typecode, fmt in columns]
+        self.formats = [fmt or str for heading, typecode, fmt in columns]
+        self.store = ColumnStore(typecode for heading, typecode, fmt in columns)
+        self.__total = None          # rows in the slice, if known up front
+        self.__more = False          # the slice has rows not fetched yet
+        self.__fetching = None       # token of the outstanding fetch
+        self.__generation = 0        # bumped by reset() to drop stale pages
+        self.__first = 0             # index of the row at the top of the view
+        self.__sort_column = None
+        self.__sort_reverse = False
+        self.__sort_pending = False
+
+        self.tree = ttk.Treeview(self, columns=self.headings, show="headings",
+                                 height=height, selectmode="none")
+        for index, heading in enumerate(self.headings):
+            self.tree.heading(heading, text=heading,
+                              command=lambda index=index: self.sort_by(index))
+            self.tree.column(heading, width=120, anchor="center")
+        self.__items = [self.tree.insert("", tk.END, values=()) for _ in range(height)]
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.__on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        for widget in (self.tree, self.scrollbar):
+            widget.bind("<MouseWheel>", self.__on_wheel)
+            widget.bind("<Button-4>", lambda event: self.scroll(-3))
+            widget.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<Prior>", lambda event: self.scroll(-self.height))
+        self.tree.bind("<Next>", lambda event: self.scroll(self.height))
+        self.__render()
+
+    @property
+    def loaded(self):
+        return len(self.store)
+
+    def reset(self, total=None):
+        """Empty the table and start fetching a new slice; total is its row
+        count when known, which sizes the scrollbar before rows arrive."""
+        self.__generation += 1
+        self.__fetching = None
+        self.store.clear()
+        self.__total = total
+        self.__more = total != 0
+        self.__first = 0
+        self.__sort_column = None
+        self.__sort_pending = False
+        self.__show_sort()
+        self.__render()
+
+    def clear(self):
+        """Empty the table without fetching anything."""
+        self.reset(total=0)
+
+    def scroll(self, rows):
+        self.__first += rows
+        self.__render()
+
+    def sort_by(self, column):
+        """Sort by a column, or reverse the order if it is already sorted by it."""
+        if column == self.__sort_column:
+            self.__sort_reverse = not self.__sort_reverse
+        else:
+            self.__sort_column = column
+            self.__sort_reverse = False
+        self.__show_sort()
+        if self.__more:
+            # every row is needed to sort; load the rest first
+            self.__sort_pending = True
+            self.__fetch_more()
+        else:
+            self.__apply_sort()
+        self.__render()
+
+    def __apply_sort(self):
+        self.__sort_pending = False
+        self.store.sort(self.__sort_column, self.__sort_reverse)
+        self.__first = 0
+
+    def __show_sort(self):
+        for index, heading in enumerate(self.headings):
+            text = heading
+            if index == self.__sort_column:
+                text += " ▼" if self.__sort_reverse else " ▲"
+            self.tree.heading(heading, text=text)
+
+    def __row_count(self):
+        """Rows the scrollbar spans: the known total, else what is loaded
+        plus a page for what may follow."""
+        if self.__total is not None:
+            return max(self.__total, self.loaded)
+        return self.loaded + (PAGE_ROWS if self.__more else 0)
+
+    def __render(self):
+        count = self.__row_count()
+        self.__first = max(0, min(self.__first, count - self.height))
+        showing_rows = not self.__sort_pending
+        for offset, item in enumerate(self.__items):
+            index = self.__first + offset
+            if showing_rows and index < self.loaded:
+                row = self.store.row(index)
+                values = [fmt(value) for fmt, value in zip(self.formats, row)]
+            elif index < count and (self.__more or self.__sort_pending):
+                values = [LOADING_TEXT] * len(self.headings)
+            else:
+                values = [""] * len(self.headings)
+            self.tree.item(item, values=values)
+
+        if count:
+            self.scrollbar.set(self.__first / count,
+                               min(self.__first + self.height, count) / count)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        if self.__more and (self.__sort_pending or
+                            self.__first + self.height + PREFETCH_ROWS > self.loaded):
+            self.__fetch_more()
+
+    def __fetch_more(self):
+        if self.__fetching is not None:
+            return
+        if self.__sort_pending:
+            limit = BULK_PAGE_ROWS
+        else:
+            # enough to reach the view, e.g. after dragging the scrollbar
+            needed = self.__first + self.height + PREFETCH_ROWS - self.loaded
+            limit = min(max(PAGE_ROWS, needed), BULK_PAGE_ROWS)
+        token = self.__fetching = (self.__generation, self.loaded)
+        self.fetch(limit, lambda rows, more: self.__add_page(token, rows, more))
+
+    def __add_page(self, token, rows, more):
+        if token != self.__fetching:
+            return   # the table was reset since this fetch was asked for
+        self.__fetching = None
+        self.store.append(rows)
+        self.__more = more
+        if not more and self.__total is not None and self.__total != self.loaded:
+            self.__total = self.loaded   # rows changed since the count was taken
+        if self.__sort_pending and not more:
+            self.__apply_sort()
+        self.__render()
+
+    def __on_scrollbar(self, action, amount, unit=None):
+        count = self.__row_count()
+        if action == "moveto":
+            self.__first = int(float(amount) * count)
+        elif unit == "pages":
+            self.__first += int(amount) * self.height
+        else:
+            self.__first += int(amount)
+        self.__render()
+
+    def __on_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small steps
+        steps = -event.delta // 120 if abs(event.delta) >= 120 else -event.delta
+        self.scroll(3 * steps)
+
+
+class SeriesChart(tk.Canvas):
+    """A line chart of one or more series over shared x labels.
+
+    show(labels, lines) draws lines, a list of (name, values) with a value
+    per label, on a zero-based y axis; each line gets a colour from COLOURS
+    and a legend entry when there is more than one. The chart redraws itself
+    to fit when the canvas is resized.
+    """
+    COLOURS = ["#1f7a8c", "#e07a5f", "#3d405b", "#81b29a", "#f2cc8f", "#9c6644"]
+    MARGIN_LEFT = 80
+    MARGIN_RIGHT = 16
+    MARGIN_TOP = 16
+    MARGIN_BOTTOM = 36
+    # x labels drawn at most; the rest are skipped evenly
+    MAX_X_LABELS = 8
+
+    def __init__(self, parent, format_value=str, **options):
+        options.setdefault("background", "white")
+        options.setdefault("highlightthickness", 0)
+        super().__init__(parent, **options)
+        self.format_value = format_value
+        self.__labels = []
+        self.__lines = []
+        self.__message = ""
+        self.bind("<Configure>", lambda event: self.__draw())
+
+    def show(self, labels, lines):
+        self.__labels = list(labels)
+        self.__lines = [(name, list(values)) for name, values in lines]
+        self.__message = "" if self.__labels else "No sales in the slice."
+        self.__draw()
+
+    def show_message(self, message):
+        """Clear the chart and show message in its place."""
+        self.__labels = []
+        self.__lines = []
+        self.__message = message
+        self.__draw()
+
+    def __draw(self):
+        self.delete("all")
+        width, height = self.winfo_width(), self.winfo_height()
+        if not self.__labels:
+            self.create_text(width / 2, height / 2, text=self.__message, fill="#666666")
+            return
+
+        left, top = self.MARGIN_LEFT, self.MARGIN_TOP
+        right, bottom = width - self.MARGIN_RIGHT, height - self.MARGIN_BOTTOM
+        if right <= left or bottom <= top:
+            return   # not laid out yet
+        top_value = max((max(values) for name, values in self.__lines if values), default=0)
+        top_value = top_value if top_value > 0 else 1
+        steps = max(len(self.__labels) - 1, 1)
+
+        def x(index):
+            if len(self.__labels) == 1:
+                return (left + right) / 2
+            return left + (right - left) * index / steps
+
+        def y(value):
+            return bottom - (bottom - top) * value / top_value
+
+        self.create_line(left, top, left, bottom, right, bottom, fill="#999999")
+        for fraction in (0, 0.5, 1):
+            value = top_value * fraction
+            self.create_line(left - 4, y(value), left, y(value), fill="#999999")
+            self.create_text(left - 6, y(value), text=self.format_value(value), anchor="e",
+                             font=("Helvetica", 9))
+        stride = -(-len(self.__labels) // self.MAX_X_LABELS)
+        for index in range(0, len(self.__labels), stride):
+            self.create_text(x(index), bottom + 6, text=self.__labels[index], anchor="n",
+                             font=("Helvetica", 9))
+
+        for number, (name, values) in enumerate(self.__lines):
+            colour = self.COLOURS[number % len(self.COLOURS)]
+            points = [coordinate for index, value in enumerate(values)
+                      for coordinate in (x(index), y(value))]
+            if len(values) == 1:
+                self.create_oval(points[0] - 3, points[1] - 3, points[0] + 3, points[1] + 3,
+                                 fill=colour, outline=colour)
+            elif values:
+                self.create_line(*points, fill=colour, width=2)
+            if len(self.__lines) > 1:
+                legend_y = top + 14 * number
+                self.create_line(right - 60, legend_y, right - 44, legend_y, fill=colour, width=2)
+                self.create_text(right - 40, legend_y, text=name, anchor="w",
+                                 font=("Helvetica", 9))